@@ -1,6 +1,5 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext, filedialog
-import threading
 import json
 import os
 import random
@@ -10,8 +9,12 @@ from typing import Dict, List, Any
 
 
 # Imports dos módulos locais (assumindo que estão no mesmo diretório)
-from src.services.database_system import VirtualGirlfriendDB
+from src.services.database_system import VirtualGirlfriendDB, BackupScheduler, ProfileDatabaseManager
 from src.services.ai_personality_system import PersonalityAI
+from src.services.cache_system import ResponseCache
+from src.services.context_system import ContextWindow
+from src.services.memory_system import LongTermMemory
+from src.services.pipeline_system import ResponsePipeline
 from src.services.personal_agent_system import PersonalAgent
 
 class VirtualGirlfriendApp:
@@ -21,20 +24,65 @@ class VirtualGirlfriendApp:
         self.load_config()
         
         # Inicializar sistemas
-        self.db = VirtualGirlfriendDB()
-        self.ai = PersonalityAI(self.config.get('gemini_api_key', ''))
+        # Com um perfil configurado, cada pessoa usa seu próprio arquivo em profiles/
+        profile = self.config.get('profile')
+        if profile:
+            self.db = ProfileDatabaseManager(write_behind=True).get(profile)
+        else:
+            self.db = VirtualGirlfriendDB(write_behind=True)
+        
+        self.backup_scheduler = None
+        if self.config.get('backup_interval_hours'):
+            self.backup_scheduler = BackupScheduler(
+                self.db,
+                backup_dir=os.path.join("backups", profile) if profile else "backups",
+                interval_hours=self.config['backup_interval_hours'],
+                keep=self.config.get('backups_to_keep', 7)
+            )
+            self.backup_scheduler.start()
+        # Cache de respostas compartilhado (sobrevive à troca da chave da API)
+        self.response_cache = ResponseCache(
+            max_entries=self.config['response_cache_size'],
+            ttl_seconds=self.config['response_cache_ttl_seconds'],
+            persist=self.db if self.config.get('persist_response_cache') else None
+        )
+        self.ai = PersonalityAI(self.config.get('gemini_api_key', ''), self.config['context_token_budget'],
+                                response_cache=self.response_cache,
+                                requests_per_minute=self.config['gemini_requests_per_minute'],
+                                request_timeout=self.config['gemini_request_timeout_seconds'],
+                                call_timeout=self.config['response_timeout_seconds'])
+        # Janela de contexto: mensagens recentes dentro do orçamento + resumo das anteriores
+        self.context_window = ContextWindow(
+            self.db,
+            token_budget=self.config['context_token_budget'],
+            summary_token_budget=self.config['context_summary_token_budget']
+        )
         self.agent = PersonalAgent()
+        # Todo o trabalho de IA e do agente passa pelo pipeline (prazo, cancelamento e concorrência limitada)
+        self.pipeline = ResponsePipeline(
+            max_concurrency=self.config['max_concurrent_requests'],
+            default_timeout=self.config['response_timeout_seconds']
+        )
+        # Memória de longo prazo: busca por similaridade nas conversas de dias anteriores
+        self.memory = LongTermMemory(self.db) if self.config.get('long_term_memory') else None
+        if self.memory is not None and self.memory.enabled:
+            # Indexa o histórico antigo em segundo plano (pode demorar na primeira execução)
+            self.pipeline.submit(self.index_memory, key='memory_index', timeout=600, background=True,
+                                 on_error=lambda job, error: print(f"Erro ao indexar memória: {error}"))
         
         # Estado da aplicação
         self.current_personality = self.db.get_current_personality()
         self.current_conversation_id = self.db.get_or_create_today_conversation()
         self.agent_mode = False
         self.is_sending = False
+        self.current_job = None
+        self.streaming_job = None
         
         # Criar interface
         self.create_main_window()
         self.load_conversation_history()
         self.show_initial_message()
+        self.poll_pipeline()
     
     def load_config(self):
         """Carrega configurações do arquivo"""
@@ -42,7 +90,22 @@ class VirtualGirlfriendApp:
             'gemini_api_key': '',
             'theme': 'modern',
             'auto_save': True,
-            'notifications': True
+            'notifications': True,
+            'backup_interval_hours': 0,  # 0 = backups automáticos desligados
+            'backups_to_keep': 7,
+            'profile': '',
+            'context_token_budget': 1200,
+            'context_summary_token_budget': 250,
+            'stream_responses': True,
+            'response_timeout_seconds': 30,
+            'max_concurrent_requests': 2,
+            'response_cache_size': 256,
+            'response_cache_ttl_seconds': 600,
+            'persist_response_cache': True,
+            'gemini_requests_per_minute': 15,
+            'gemini_request_timeout_seconds': 20,
+            'long_term_memory': True,
+            'memory_recall_count': 3
         }
         
         if os.path.exists(self.config_file):
@@ -107,10 +170,11 @@ class VirtualGirlfriendApp:
         menubar.add_cascade(label="Arquivo", menu=file_menu)
         file_menu.add_command(label="Nova Conversa", command=self.new_conversation)
         file_menu.add_command(label="Exportar Conversa", command=self.export_conversation)
+        file_menu.add_command(label="Exportar Todo o Histórico", command=lambda: self.export_conversation(True))
         file_menu.add_separator()
         file_menu.add_command(label="Configurações", command=self.open_settings)
         file_menu.add_separator()
-        file_menu.add_command(label="Sair", command=self.root.quit)
+        file_menu.add_command(label="Sair", command=self.on_closing)
         
         # Menu Personalidade
         personality_menu = tk.Menu(menubar, tearoff=0)
@@ -457,56 +521,159 @@ class VirtualGirlfriendApp:
     
     def send_message(self):
         """Envia mensagem do usuário"""
-        if self.is_sending:
-            return
-        
         message = self.message_input.get("1.0", tk.END).strip()
         if not message:
             return
         
+        # Uma nova mensagem cancela a resposta que ainda estava sendo gerada
+        if self.is_sending and self.current_job is not None:
+            self.current_job.cancel()
+            self.cancel_response(self.current_job)
+        
         self.is_sending = True
-        self.send_button.config(state=tk.DISABLED, text="Enviando...")
+        self.send_button.config(text="Enviando...")
         self.message_input.delete("1.0", tk.END)
         
         # Adicionar mensagem do usuário
         self.add_message(message, 'user')
-        self.db.save_message(self.current_conversation_id, 'user', message)
-        
-        # Processar resposta em thread separada
-        def process_response():
-            try:
-                # Verificar se é comando do agente
-                if self.agent_mode and self.agent.can_execute_command(message):
-                    response, success = self.agent.execute_command(message, self.current_personality)
-                else:
-                    # Gerar resposta da IA
-                    conversation_history = self.db.get_recent_messages(self.current_conversation_id, 10)
-                    response = self.ai.generate_response(
-                        self.current_personality, 
-                        conversation_history, 
-                        message, 
-                        self.agent_mode
-                    )
-                
-                self.root.after(0, lambda: self.display_response(response))
-                
-            except Exception as e:
-                error_msg = f"Ops, tive um probleminha técnico... 😅 Pode tentar de novo?"
-                self.root.after(0, lambda: self.display_response(error_msg))
+        self.db.queue_message(self.current_conversation_id, 'user', message)
+        
+        # Processar resposta no pipeline (loop asyncio em thread própria, com prazo e cancelamento)
+        self.current_job = self.pipeline.submit(
+            self.process_response, message,
+            key='chat',
+            on_done=self.complete_response,
+            on_error=self.fail_response,
+            on_cancel=self.cancel_response
+        )
+    
+    def process_response(self, job, message):
+        """Gera a resposta para a mensagem (roda em uma thread do pipeline)"""
+        # Verificar se é comando do agente
+        if self.agent_mode and self.agent.can_execute_command(message):
+            response, success = self.agent.execute_command(message, self.current_personality)
+            return response
         
-        thread = threading.Thread(target=process_response)
-        thread.daemon = True
-        thread.start()
+        # Gerar resposta da IA
+        conversation_history, context_summary = self.context_window.build(
+            self.current_conversation_id, self.current_personality['name']
+        )
+        memories = self.recall_memories(message)
+        if not self.config.get('stream_responses'):
+            return self.ai.generate_response(
+                self.current_personality, 
+                conversation_history, 
+                message, 
+                self.agent_mode,
+                context_summary,
+                memories
+            )
+        
+        # Streaming: cada pedaço vai para a interface assim que chega
+        job.emit(self.begin_streamed_response, job)
+        parts = []
+        for chunk in self.ai.generate_response_stream(
+            self.current_personality,
+            conversation_history,
+            message,
+            self.agent_mode,
+            context_summary,
+            memories
+        ):
+            if job.cancelled:
+                break  # fechar o gerador encerra o stream da API
+            parts.append(chunk)
+            job.emit(self.append_response_chunk, chunk)
+        
+        return "".join(parts)
+    
+    def index_memory(self, job):
+        """Indexa as mensagens ainda fora da memória de longo prazo (roda no pipeline)"""
+        return self.memory.index_new_messages()
+    
+    def recall_memories(self, message: str) -> List[Dict[str, Any]]:
+        """Lembranças de outras conversas parecidas com a mensagem (a conversa atual já está no contexto)"""
+        if self.memory is None:
+            return []
+        try:
+            return self.memory.recall(message, k=self.config['memory_recall_count'],
+                                      exclude_conversation_id=self.current_conversation_id)
+        except Exception as e:
+            print(f"Erro ao buscar lembranças: {e}")
+            return []
+    
+    def poll_pipeline(self):
+        """Entrega na thread do Tk os resultados do pipeline"""
+        self.pipeline.poll()
+        self.root.after(50, self.poll_pipeline)
+    
+    def complete_response(self, job, response):
+        """Resposta pronta: fecha o stream aberto ou exibe a mensagem inteira"""
+        if self.streaming_job is job:
+            self.finish_streamed_response(response)
+        else:
+            self.display_response(response or "Ops, tive um probleminha técnico... 😅 Pode tentar de novo?")
+    
+    def fail_response(self, job, error):
+        """Erro ou prazo estourado na geração"""
+        if isinstance(error, TimeoutError):
+            error_msg = "Nossa, demorei demais pra pensar... 😅 Manda de novo?"
+        else:
+            print(f"Erro ao gerar resposta: {error}")
+            error_msg = f"Ops, tive um probleminha técnico... 😅 Pode tentar de novo?"
+        
+        if self.streaming_job is job:
+            # O que já apareceu fica na tela, mas a resposta incompleta não é salva
+            self.append_response_chunk(" …\n\n")
+            self.streaming_job = None
+        self.display_response(error_msg)
+    
+    def cancel_response(self, job):
+        """Resposta cancelada: fecha a mensagem parcial sem salvar"""
+        if self.streaming_job is job:
+            self.append_response_chunk(" …\n\n")
+            self.streaming_job = None
+        if job is self.current_job:
+            self.current_job = None
+            self.reset_input_state()
+    
+    def begin_streamed_response(self, job):
+        """Abre a mensagem da IA que vai receber os pedaços do stream"""
+        self.streaming_job = job
+        self.messages_text.config(state=tk.NORMAL)
+        timestamp = datetime.now().strftime("%H:%M")
+        self.messages_text.insert(tk.END, f"[{timestamp}] ", 'timestamp')
+        self.messages_text.insert(tk.END, f"{self.current_personality['name']}: ", 'ai')
+        self.messages_text.config(state=tk.DISABLED)
+        self.messages_text.see(tk.END)
+    
+    def append_response_chunk(self, chunk: str):
+        """Acrescenta um pedaço da resposta ao final do chat"""
+        self.messages_text.config(state=tk.NORMAL)
+        self.messages_text.insert(tk.END, chunk, 'ai')
+        self.messages_text.config(state=tk.DISABLED)
+        self.messages_text.see(tk.END)
+    
+    def finish_streamed_response(self, response: str):
+        """Fecha a mensagem em streaming e grava a resposta completa"""
+        self.streaming_job = None
+        if not response:
+            response = "Ops, tive um probleminha técnico... 😅 Pode tentar de novo?"
+            self.append_response_chunk(response)
+        self.append_response_chunk("\n\n")
+        self.db.queue_message(self.current_conversation_id, 'ai', response)
+        self.reset_input_state()
     
     def display_response(self, response):
         """Exibe resposta da IA"""
         self.add_message(response, 'ai')
-        self.db.save_message(self.current_conversation_id, 'ai', response)
+        self.db.queue_message(self.current_conversation_id, 'ai', response)
         self.reset_input_state()
     
     def reset_input_state(self):
         """Reseta estado da interface de entrada"""
         self.is_sending = False
+        self.current_job = None
         self.send_button.config(state=tk.NORMAL, text="Enviar\n(Ctrl+Enter)")
         self.message_input.focus()
     
@@ -634,7 +801,11 @@ class VirtualGirlfriendApp:
             
             # Reconfigurar AI se necessário
             if api_entry.get().strip():
-                self.ai = PersonalityAI(api_entry.get().strip())
+                self.ai = PersonalityAI(api_entry.get().strip(), self.config['context_token_budget'],
+                                        response_cache=self.response_cache,
+                                        requests_per_minute=self.config['gemini_requests_per_minute'],
+                                        request_timeout=self.config['gemini_request_timeout_seconds'],
+                                        call_timeout=self.config['response_timeout_seconds'])
             
             settings_window.destroy()
             messagebox.showinfo("Sucesso", "Configurações salvas!")
@@ -673,23 +844,30 @@ class VirtualGirlfriendApp:
             self.load_personality_form()
             self.save_personality()
     
-    def export_conversation(self):
-        """Exporta conversa atual"""
+    def export_conversation(self, all_conversations: bool = False):
+        """Exporta conversa atual (ou todo o histórico)"""
         filename = filedialog.asksaveasfilename(
             defaultextension=".txt",
-            filetypes=[("Arquivos de texto", "*.txt"), ("Todos os arquivos", "*.*")]
+            filetypes=[
+                ("Arquivos de texto", "*.txt"),
+                ("JSON Lines", "*.jsonl"),
+                ("CSV", "*.csv"),
+                ("Markdown", "*.md"),
+                ("Compactado (gzip)", "*.gz"),
+                ("Todos os arquivos", "*.*")
+            ]
         )
         
         if filename:
             try:
-                messages = self.db.get_conversation_history(self.current_conversation_id)
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write(f"=== Conversa com {self.current_personality['name']} ===\n\n")
-                    for msg in messages:
-                        sender = "Você" if msg['sender'] == 'user' else self.current_personality['name']
-                        f.write(f"[{msg['timestamp']}] {sender}: {msg['message']}\n\n")
+                conversation_id = None if all_conversations else self.current_conversation_id
+                count = self.db.export_messages(
+                    filename,
+                    conversation_id=conversation_id,
+                    ai_name=self.current_personality['name']
+                )
                 
-                messagebox.showinfo("Sucesso", f"Conversa exportada para {filename}")
+                messagebox.showinfo("Sucesso", f"{count} mensagens exportadas para {filename}")
             except Exception as e:
                 messagebox.showerror("Erro", f"Erro ao exportar: {str(e)}")
     
@@ -752,6 +930,12 @@ Desenvolvido com Python, Tkinter e Gemini AI.
         """Callback para fechamento da aplicação"""
         if messagebox.askokcancel("Sair", "Deseja realmente sair?"):
             self.save_config()
+            self.pipeline.shutdown()
+            if self.memory is not None:
+                self.memory.close()
+            if self.backup_scheduler:
+                self.backup_scheduler.stop(timeout=5)
+            self.db.close()
             self.root.destroy()
 
 # Script principal
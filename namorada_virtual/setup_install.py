@@ -35,7 +35,8 @@ def install_requirements():
         'google-generativeai',
         'psutil',
         'pillow',
-        'requests'
+        'requests',
+        'numpy'
     ]
     
     print("🔧 Instalando dependências...")
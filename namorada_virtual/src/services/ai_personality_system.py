@@ -1,8 +1,27 @@
 import random
 import json
-from datetime import datetime, time
-from typing import Dict, List, Any
-import re
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Any, Tuple, Iterator
+
+try:
+    from .context_system import pack_recent_turns, format_turn, DEFAULT_TOKEN_BUDGET
+    from .cache_system import ResponseCache
+    from .mood_system import MoodEngine
+    from .intent_system import IntentRouter
+    from .postprocess_system import StreamingPostProcessor
+    from .memory_system import format_memories
+    from .gemini_client_system import GeminiClient, CircuitOpenError
+except ImportError:
+    from context_system import pack_recent_turns, format_turn, DEFAULT_TOKEN_BUDGET  # executado como script
+    from cache_system import ResponseCache
+    from mood_system import MoodEngine
+    from intent_system import IntentRouter
+    from postprocess_system import StreamingPostProcessor
+    from memory_system import format_memories
+    from gemini_client_system import GeminiClient, CircuitOpenError
 
 # Import condicional do Google Generative AI
 try:
@@ -11,71 +30,70 @@ try:
 except ImportError:
     GEMINI_AVAILABLE = False
 
-class PersonalityAI:
-    def __init__(self, api_key: str):
-        self.api_key = api_key
-        
-        if GEMINI_AVAILABLE and api_key:
-            try:
-                genai.configure(api_key=api_key)
-                self.model = genai.GenerativeModel('gemini-1.5-flash')
-                
-                # Configurações para respostas realísticas
-                self.generation_config = genai.types.GenerationConfig(
-                    max_output_tokens=250,
-                    temperature=0.85,
-                    top_p=0.9,
-                    top_k=50,
-                    candidate_count=1,
-                )
-                self.use_ai = True
-            except Exception as e:
-                print(f"Erro ao configurar Gemini: {e}")
-                self.use_ai = False
-        else:
-            self.use_ai = False
-            if not GEMINI_AVAILABLE:
-                print("Google Generative AI não está disponível. Usando respostas padrão.")
-            if not api_key:
-                print("API Key não fornecida. Usando respostas padrão.")
+class PromptBuilder:
+    """Compila as seções estáticas do prompt (identidade, diretrizes, instruções) por personalidade.
     
-    def generate_realistic_prompt(self, personality: Dict[str, Any], conversation_history: List[Dict[str, str]], 
-                                user_message: str, agent_mode: bool = False) -> str:
-        """Gera um prompt mais sofisticado para respostas realísticas"""
-        
-        current_time = datetime.now()
-        hour = current_time.hour
-        
-        # Determinar período do dia
-        if 5 <= hour < 12:
-            time_context = "manhã"
-            mood_modifier = "mais energética"
-        elif 12 <= hour < 18:
-            time_context = "tarde"
-            mood_modifier = "relaxada"
-        elif 18 <= hour < 23:
-            time_context = "noite"
-            mood_modifier = "mais íntima e carinhosa"
+    O prompt final é prefixo + contexto situacional + meio + mensagem do usuário + sufixo;
+    só o contexto situacional e a mensagem mudam a cada turno.
+    """
+    
+    def __init__(self, max_cached: int = 8):
+        self.max_cached = max_cached
+        self._sections = OrderedDict()  # (hash da personalidade, agent_mode) -> (prefixo, meio, sufixo)
+        self._last = None  # (cópia da personalidade, agent_mode, seções) do último turno
+        self.stats = {'builds': 0, 'cache_hits': 0, 'cache_misses': 0, 'total_ms': 0.0, 'last_ms': 0.0}
+    
+    @staticmethod
+    def personality_key(personality: Dict[str, Any]) -> str:
+        """Hash estável do dicionário de personalidade"""
+        encoded = json.dumps(personality, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+        return hashlib.sha1(encoded).hexdigest()
+    
+    def get_static_sections(self, personality: Dict[str, Any], agent_mode: bool) -> Tuple[str, str, str]:
+        """Retorna (prefixo, meio, sufixo) do prompt, compilando se a personalidade mudou"""
+        # Caminho rápido: mesma personalidade do turno anterior (comparação de dict, sem serializar)
+        last = self._last
+        if last is not None and last[1] == agent_mode and last[0] == personality:
+            self.stats['cache_hits'] += 1
+            return last[2]
+        
+        key = (self.personality_key(personality), agent_mode)
+        
+        sections = self._sections.get(key)
+        if sections is not None:
+            self._sections.move_to_end(key)
+            self.stats['cache_hits'] += 1
         else:
-            time_context = "madrugada"
-            mood_modifier = "mais sonolenta e carinhosa"
-        
-        # Construir contexto da conversa
-        context_messages = []
-        for msg in conversation_history[-8:]:  # Últimas 8 mensagens para contexto
-            sender = "Você" if msg['sender'] == 'user' else personality['name']
-            context_messages.append(f"{sender}: {msg['message']}")
-        
-        context_text = "\n".join(context_messages) if context_messages else "Primeira interação do dia"
+            self.stats['cache_misses'] += 1
+            sections = self._compile(personality, agent_mode)
+            self._sections[key] = sections
+            if len(self._sections) > self.max_cached:
+                self._sections.popitem(last=False)
+        
+        self._last = (json.loads(json.dumps(personality, default=str)), agent_mode, sections)
+        return sections
+    
+    def record_build_time(self, seconds: float):
+        """Contabiliza o tempo de montagem de um prompt"""
+        elapsed_ms = seconds * 1000
+        self.stats['builds'] += 1
+        self.stats['total_ms'] += elapsed_ms
+        self.stats['last_ms'] = elapsed_ms
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna contadores do cache e tempo médio de montagem"""
+        stats = dict(self.stats)
+        stats['avg_ms'] = stats['total_ms'] / stats['builds'] if stats['builds'] else 0.0
+        return stats
+    
+    def _compile(self, personality: Dict[str, Any], agent_mode: bool) -> Tuple[str, str, str]:
+        """Monta as partes fixas do prompt para uma personalidade"""
         
         # Traços de personalidade formatados
         traits_text = ", ".join(personality['traits']) if personality['traits'] else "carinhosa, inteligente"
         
-        # Sistema de humor baseado no histórico
-        conversation_mood = self._analyze_conversation_mood(conversation_history)
-        
-        # Prompt base mais humanizado
-        base_prompt = f"""IDENTIDADE E CONTEXTO:
+        # Identidade e personalidade, até o início do contexto situacional
+        prefix = f"""IDENTIDADE E CONTEXTO:
 Você é {personality['name']}, {personality['age']} anos. Você é uma pessoa real com personalidade própria, não uma IA.
 
 PERSONALIDADE CORE:
@@ -86,11 +104,9 @@ PERSONALIDADE CORE:
 - Sonhos: {personality.get('dreams', 'ser feliz e ter bons momentos')}
 
 CONTEXTO SITUACIONAL:
-- Período: {time_context} (você está {mood_modifier})
-- Humor da conversa: {conversation_mood}
-- Histórico recente: {context_text}
-
-DIRETRIZES DE COMPORTAMENTO NATURAL:
+"""
+        
+        middle = """DIRETRIZES DE COMPORTAMENTO NATURAL:
 1. SEJA GENUINAMENTE HUMANA - Tenha reações emocionais autênticas, opiniões próprias e vulnerabilidades
 2. USE LINGUAGEM NATURAL - Gírias brasileiras, contrações ("tô", "cê", "né"), expressões locais
 3. VARIE AS RESPOSTAS - Nunca repita padrões, seja imprevisível como uma pessoa real
@@ -113,7 +129,7 @@ PROIBIÇÕES ABSOLUTAS:
         
         # Adicionar contexto específico do modo agente
         if agent_mode:
-            agent_context = """
+            middle += """
 MODO AGENTE PESSOAL ATIVO:
 Você também é uma assistente pessoal inteligente. Quando o usuário pedir ajuda técnica:
 - Mantenha sua personalidade, mas demonstre conhecimento técnico
@@ -121,12 +137,13 @@ Você também é uma assistente pessoal inteligente. Quando o usuário pedir aju
 - Seja proativa em sugerir melhorias ou automações
 - Explique tecnologia de forma simples e carinhosa
             """
-            base_prompt += agent_context
         
-        # Prompt final específico para a mensagem
-        final_prompt = f"""{base_prompt}
+        middle += """
 
-MENSAGEM ATUAL DO USUÁRIO: "{user_message}"
+MENSAGEM ATUAL DO USUÁRIO: \""""
+        
+        # Instruções finais, após a mensagem do usuário
+        suffix = f""""
 
 INSTRUÇÕES PARA RESPOSTA:
 - Responda como {personality['name']} reagiria naturalmente
@@ -137,85 +154,306 @@ INSTRUÇÕES PARA RESPOSTA:
 
 RESPOSTA DE {personality['name'].upper()}:"""
         
+        return prefix, middle, suffix
+
+# Intenções das respostas por padrão, em ordem de prioridade
+PATTERN_INTENTS = [
+    ('greeting', ['oi', 'olá', 'hey', 'e aí', 'eaí']),
+    ('status', ['como', 'tá', 'está', 'vai']),
+    ('thanks', ['obrigado', 'obrigada', 'valeu', 'thanks']),
+    ('goodbye', ['tchau', 'bye', 'até', 'fui']),
+]
+
+PATTERN_RESPONSES = {
+    'greeting': [
+        "Oi! Como você tá? 😊",
+        "Hey! Que bom te ver!",
+        "Olá! Como foi seu dia?",
+        "E aí! Tudo bem contigo?"
+    ],
+    'status': [
+        "Tô bem! E você?",
+        "Tudo ótimo por aqui! Como você tá?",
+        "Bem demais! Me conta como você está",
+        "Tô super bem! E aí, como anda a vida?"
+    ],
+    'thanks': [
+        "De nada! 😊",
+        "Imagina! Tô aqui pra isso",
+        "Sempre às ordens!",
+        "Por nada! Adorei ajudar"
+    ],
+    'goodbye': [
+        "Tchau! Até mais! 💕",
+        "Até logo! Cuida-se!",
+        "Bye! Foi ótimo conversar contigo!",
+        "Até a próxima! 😘"
+    ],
+    'question': [
+        "Interessante pergunta! O que você acha?",
+        "Hmm, deixa eu pensar... e você, o que pensa sobre isso?",
+        "Boa pergunta! Me conta sua opinião primeiro",
+        "Nossa, nunca parei pra pensar nisso... qual sua visão?"
+    ],
+}
+
+# Respostas gerais por traço de personalidade (o primeiro traço presente vence)
+GENERAL_RESPONSES = [
+    ('carinhosa', [
+        "Que interessante! Conta mais 😊",
+        "Adorei saber disso! Me fala mais",
+        "Que legal! Como você se sente sobre isso?",
+        "Nossa, que bacana! E aí, como foi?"
+    ]),
+    ('engracada', [
+        "Haha, sério? Conta mais!",
+        "Que história é essa? 😄",
+        "Eita, que situação! E depois?",
+        "Não acredito! Como assim?"
+    ]),
+    (None, [
+        "Entendi... e como você vê isso?",
+        "Interessante perspectiva. Conta mais",
+        "Hmm, faz sentido. O que mais?",
+        "Compreendo. Como se sente sobre isso?"
+    ]),
+]
+
+class PersonalityAI:
+    def __init__(self, api_key: str, history_token_budget: int = DEFAULT_TOKEN_BUDGET, model=None,
+                 response_cache: ResponseCache = None, requests_per_minute: float = 15,
+                 request_timeout: float = 20, call_timeout: float = None):
+        self.api_key = api_key
+        self.prompt_builder = PromptBuilder()
+        self.history_token_budget = history_token_budget
+        self.response_cache = response_cache if response_cache is not None else ResponseCache()
+        self.mood_engine = MoodEngine()
+        self.intent_router = IntentRouter(PATTERN_INTENTS)
+        
+        if model is not None:
+            # Modelo injetado (ex.: um modelo falso que devolve pedaços fixos)
+            self.model = model
+            self.generation_config = None
+            self.use_ai = True
+        elif GEMINI_AVAILABLE and api_key:
+            try:
+                genai.configure(api_key=api_key)
+                self.model = genai.GenerativeModel('gemini-1.5-flash')
+                
+                # Configurações para respostas realísticas
+                self.generation_config = genai.types.GenerationConfig(
+                    max_output_tokens=250,
+                    temperature=0.85,
+                    top_p=0.9,
+                    top_k=50,
+                    candidate_count=1,
+                )
+                self.use_ai = True
+            except Exception as e:
+                print(f"Erro ao configurar Gemini: {e}")
+                self.use_ai = False
+        else:
+            self.use_ai = False
+        
+        if self.use_ai:
+            # Toda chamada à API passa pelo cliente (limite de taxa, novas tentativas, disjuntor)
+            self.client = GeminiClient(self.model, self.generation_config, requests_per_minute=requests_per_minute,
+                                       request_timeout=request_timeout, call_timeout=call_timeout)
+        else:
+            if not GEMINI_AVAILABLE:
+                print("Google Generative AI não está disponível. Usando respostas padrão.")
+            if not api_key:
+                print("API Key não fornecida. Usando respostas padrão.")
+    
+    def generate_realistic_prompt(self, personality: Dict[str, Any], conversation_history: List[Dict[str, str]], 
+                                user_message: str, agent_mode: bool = False, context_summary: str = None,
+                                memories: List[Dict[str, Any]] = None) -> str:
+        """Gera um prompt mais sofisticado para respostas realísticas"""
+        
+        started = time.perf_counter()
+        
+        # Seções estáticas: compiladas uma vez por personalidade (e modo agente)
+        prefix, middle, suffix = self.prompt_builder.get_static_sections(personality, agent_mode)
+        
+        time_context, mood_modifier = self._get_time_context(datetime.now().hour)
+        
+        # Construir contexto da conversa: mensagens mais recentes que cabem no orçamento de tokens
+        recent = pack_recent_turns(conversation_history, self.history_token_budget, personality['name'])
+        context_messages = [format_turn(msg, personality['name']) for msg in recent]
+        
+        context_text = "\n".join(context_messages) if context_messages else "Primeira interação do dia"
+        
+        # Sistema de humor baseado no histórico
+        conversation_mood = self._analyze_conversation_mood(conversation_history)
+        
+        # Só a parte dinâmica é montada a cada turno
+        situational = (f"- Período: {time_context} (você está {mood_modifier})\n"
+                       f"- Humor da conversa: {conversation_mood}\n")
+        situational += self._prompt_context(personality, context_summary, memories)
+        situational += f"- Histórico recente: {context_text}\n\n"
+        
+        final_prompt = ''.join((prefix, situational, middle, user_message, suffix))
+        
+        self.prompt_builder.record_build_time(time.perf_counter() - started)
         return final_prompt
     
+    def _prompt_context(self, personality: Dict[str, Any], context_summary: str = None,
+                        memories: List[Dict[str, Any]] = None) -> str:
+        """Seções do prompt com o resumo da conversa e as lembranças (também entram na chave do cache)"""
+        sections = ""
+        if context_summary:
+            sections += f"- Resumo do que já conversaram hoje:\n{context_summary}\n"
+        if memories:
+            sections += f"- Lembranças de conversas anteriores:\n{format_memories(memories, personality['name'])}\n"
+        return sections
+    
+    def get_prompt_stats(self) -> Dict[str, Any]:
+        """Estatísticas do construtor de prompts (cache e tempo de montagem)"""
+        return self.prompt_builder.get_stats()
+    
+    def _get_time_context(self, hour: int) -> Tuple[str, str]:
+        """Determina período do dia e o modificador de humor correspondente"""
+        if 5 <= hour < 12:
+            return "manhã", "mais energética"
+        elif 12 <= hour < 18:
+            return "tarde", "relaxada"
+        elif 18 <= hour < 23:
+            return "noite", "mais íntima e carinhosa"
+        else:
+            return "madrugada", "mais sonolenta e carinhosa"
+    
     def _analyze_conversation_mood(self, conversation_history: List[Dict[str, str]]) -> str:
         """Analisa o humor geral da conversa baseado nas últimas mensagens"""
-        if not conversation_history:
-            return "neutro e receptivo"
-        
-        recent_messages = conversation_history[-5:]  # Últimas 5 mensagens
-        
-        # Palavras-chave para análise de sentimento (simplificado)
-        positive_words = ['bom', 'legal', 'ótimo', 'feliz', 'alegre', 'amor', 'gosto', 'adorei', 'incrível']
-        negative_words = ['ruim', 'triste', 'chato', 'difícil', 'problema', 'cansado', 'estresse']
-        intimate_words = ['saudade', 'carinho', 'amor', 'beijo', 'abraço', 'coração']
-        
-        positive_count = 0
-        negative_count = 0
-        intimate_count = 0
-        
-        for msg in recent_messages:
-            text = msg['message'].lower()
-            positive_count += sum(1 for word in positive_words if word in text)
-            negative_count += sum(1 for word in negative_words if word in text)
-            intimate_count += sum(1 for word in intimate_words if word in text)
-        
-        if intimate_count > 0:
-            return "íntimo e carinhoso"
-        elif positive_count > negative_count:
-            return "positivo e animado"
-        elif negative_count > positive_count:
-            return "compreensivo e acolhedor"
-        else:
-            return "equilibrado e natural"
+        # Últimas 5 mensagens; cada texto é pontuado uma única vez pelo motor de humor
+        return self.mood_engine.analyze(conversation_history, window=5)
     
     def generate_response(self, personality: Dict[str, Any], conversation_history: List[Dict[str, str]], 
-                         user_message: str, agent_mode: bool = False) -> str:
+                         user_message: str, agent_mode: bool = False, context_summary: str = None,
+                         memories: List[Dict[str, Any]] = None) -> str:
         """Gera uma resposta da IA baseada na personalidade e contexto"""
         
+        # Turno repetido (mesma personalidade, contexto e mensagem): sem nova chamada
+        cache_key = self._response_cache_key(personality, conversation_history, user_message, agent_mode,
+                                             self._prompt_context(personality, context_summary, memories))
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         if self.use_ai:
             try:
-                prompt = self.generate_realistic_prompt(personality, conversation_history, user_message, agent_mode)
+                prompt = self.generate_realistic_prompt(personality, conversation_history, user_message,
+                                                        agent_mode, context_summary, memories)
                 
-                response = self.model.generate_content(
-                    prompt,
-                    generation_config=self.generation_config
-                )
+                # Prompts idênticos em andamento compartilham a mesma chamada
+                response_text = self.client.generate(prompt)
                 
                 # Processar e limpar a resposta
-                ai_response = response.text.strip()
+                ai_response = response_text.strip()
                 ai_response = self._post_process_response(ai_response, personality['name'])
                 
+                self.response_cache.put(cache_key, ai_response)
                 return ai_response
                 
+            except CircuitOpenError:
+                # API suspensa após falhas seguidas: respostas por padrões até o circuito fechar
+                return self._generate_pattern_response(personality, conversation_history, user_message, agent_mode)
             except Exception as e:
                 print(f"Erro na geração de resposta: {e}")
-                # Fallback para resposta padrão
+                # Fallback para resposta padrão (não vai para o cache)
                 return self._generate_fallback_response(personality, user_message)
         else:
             # Usar sistema de respostas padrão
-            return self._generate_pattern_response(personality, conversation_history, user_message, agent_mode)
+            response = self._generate_pattern_response(personality, conversation_history, user_message, agent_mode)
+            self.response_cache.put(cache_key, response)
+            return response
+    
+    def _response_cache_key(self, personality: Dict[str, Any], conversation_history: List[Dict[str, str]],
+                            user_message: str, agent_mode: bool, prompt_context: str = "") -> str:
+        """Chave do cache de respostas para o turno atual (inclui o período do dia)"""
+        time_bucket, _ = self._get_time_context(datetime.now().hour)
+        return self.response_cache.make_key(
+            self.prompt_builder.personality_key(personality),
+            conversation_history, user_message, agent_mode, time_bucket, prompt_context
+        )
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Métricas do cache de respostas"""
+        return self.response_cache.get_stats()
+    
+    def get_client_stats(self) -> Dict[str, Any]:
+        """Métricas do cliente da API (tentativas, 429, deduplicação e estado do disjuntor)"""
+        return self.client.get_stats() if self.use_ai else {}
+    
+    def generate_response_stream(self, personality: Dict[str, Any], conversation_history: List[Dict[str, str]],
+                                 user_message: str, agent_mode: bool = False,
+                                 context_summary: str = None,
+                                 memories: List[Dict[str, Any]] = None) -> Iterator[str]:
+        """Versão em streaming de generate_response: produz a resposta em pedaços já pós-processados.
+        
+        Um erro antes do primeiro pedaço vira a resposta de fallback; depois dele, o erro sobe
+        para que a resposta parcial não seja tratada como completa.
+        """
+        
+        cache_key = self._response_cache_key(personality, conversation_history, user_message, agent_mode,
+                                             self._prompt_context(personality, context_summary, memories))
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+        
+        if not self.use_ai:
+            response = self._generate_pattern_response(personality, conversation_history, user_message, agent_mode)
+            self.response_cache.put(cache_key, response)
+            yield response
+            return
+        
+        parts = []
+        try:
+            prompt = self.generate_realistic_prompt(personality, conversation_history, user_message,
+                                                    agent_mode, context_summary, memories)
+            
+            response = self.client.stream(prompt)
+            
+            processor = StreamingPostProcessor(personality['name'])
+            for chunk in response:
+                try:
+                    text = chunk.text
+                except ValueError:
+                    continue  # pedaço sem texto (ex.: só metadados de segurança)
+                
+                piece = processor.feed(text)
+                if piece:
+                    parts.append(piece)
+                    yield piece
+            
+            piece = processor.finish()
+            if piece:
+                parts.append(piece)
+                yield piece
+            
+            # Só respostas que chegaram inteiras vão para o cache
+            self.response_cache.put(cache_key, "".join(parts))
+                
+        except CircuitOpenError:
+            # O circuito abre antes do primeiro pedaço; a resposta por padrões não vai para o cache
+            response = self._generate_pattern_response(personality, conversation_history, user_message, agent_mode)
+            parts.append(response)
+            yield response
+        except Exception as e:
+            print(f"Erro na geração de resposta: {e}")
+            if parts:
+                # Parte da resposta já foi entregue: quem consome precisa saber que ela ficou incompleta
+                raise
+        
+        if not parts:
+            # Nada chegou a ser exibido: usa a resposta de fallback inteira
+            yield self._generate_fallback_response(personality, user_message)
     
     def _post_process_response(self, response: str, name: str) -> str:
         """Pós-processa a resposta para torná-la mais natural"""
         
-        # Remove possíveis prefixos indesejados
-        response = re.sub(rf'^{name}:\s*', '', response, flags=re.IGNORECASE)
-        response = re.sub(r'^(Resposta|Response):\s*', '', response, flags=re.IGNORECASE)
-        
-        # Remove asteriscos de ações (manter só o texto)
-        response = re.sub(r'\*[^*]*\*', '', response)
-        
-        # Limita emojis excessivos
-        emoji_count = len(re.findall(r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]', response))
-        if emoji_count > 3:
-            # Remove emojis em excesso, mantendo apenas os primeiros
-            emojis_found = re.findall(r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]', response)
-            for emoji in emojis_found[2:]:  # Remove a partir do terceiro emoji
-                response = response.replace(emoji, '', 1)
-        
-        return response.strip()
+        # Mesmo pipeline de filtros do streaming, com a resposta inteira como um único pedaço
+        return StreamingPostProcessor(name).process(response)
     
     def _generate_fallback_response(self, personality: Dict[str, Any], user_message: str) -> str:
         """Gera uma resposta de fallback quando há erro na API"""
@@ -234,83 +472,21 @@ RESPOSTA DE {personality['name'].upper()}:"""
                                    user_message: str, agent_mode: bool = False) -> str:
         """Gera resposta baseada em padrões quando não há IA disponível"""
         
-        name = personality.get('name', 'Amanda')
         traits = personality.get('traits', ['carinhosa', 'inteligente'])
         
-        message_lower = user_message.lower()
-        
-        # Respostas baseadas em padrões comuns
-        if any(word in message_lower for word in ['oi', 'olá', 'hey', 'e aí']):
-            greetings = [
-                f"Oi! Como você tá? 😊",
-                f"Hey! Que bom te ver!",
-                f"Olá! Como foi seu dia?",
-                f"E aí! Tudo bem contigo?"
-            ]
-            return random.choice(greetings)
-        
-        elif any(word in message_lower for word in ['como', 'tá', 'está', 'vai']):
-            status_responses = [
-                "Tô bem! E você?",
-                "Tudo ótimo por aqui! Como você tá?",
-                "Bem demais! Me conta como você está",
-                "Tô super bem! E aí, como anda a vida?"
-            ]
-            return random.choice(status_responses)
-        
-        elif any(word in message_lower for word in ['obrigado', 'obrigada', 'valeu', 'thanks']):
-            thanks_responses = [
-                "De nada! 😊",
-                "Imagina! Tô aqui pra isso",
-                "Sempre às ordens!",
-                "Por nada! Adorei ajudar"
-            ]
-            return random.choice(thanks_responses)
-        
-        elif any(word in message_lower for word in ['tchau', 'bye', 'até', 'fui']):
-            goodbye_responses = [
-                "Tchau! Até mais! 💕",
-                "Até logo! Cuida-se!",
-                "Bye! Foi ótimo conversar contigo!",
-                "Até a próxima! 😘"
-            ]
-            return random.choice(goodbye_responses)
+        # Respostas baseadas em padrões comuns (uma única passada pelo roteador de intenções)
+        match = self.intent_router.classify(user_message)
+        if match is not None:
+            return random.choice(PATTERN_RESPONSES[match.intent])
         
-        elif '?' in user_message:
+        if '?' in user_message:
             # Resposta para perguntas
-            question_responses = [
-                "Interessante pergunta! O que você acha?",
-                "Hmm, deixa eu pensar... e você, o que pensa sobre isso?",
-                "Boa pergunta! Me conta sua opinião primeiro",
-                "Nossa, nunca parei pra pensar nisso... qual sua visão?"
-            ]
-            return random.choice(question_responses)
+            return random.choice(PATTERN_RESPONSES['question'])
         
-        else:
-            # Respostas gerais baseadas na personalidade
-            if 'carinhosa' in traits:
-                general_responses = [
-                    "Que interessante! Conta mais 😊",
-                    "Adorei saber disso! Me fala mais",
-                    "Que legal! Como você se sente sobre isso?",
-                    "Nossa, que bacana! E aí, como foi?"
-                ]
-            elif 'engracada' in traits:
-                general_responses = [
-                    "Haha, sério? Conta mais!",
-                    "Que história é essa? 😄",
-                    "Eita, que situação! E depois?",
-                    "Não acredito! Como assim?"
-                ]
-            else:
-                general_responses = [
-                    "Entendi... e como você vê isso?",
-                    "Interessante perspectiva. Conta mais",
-                    "Hmm, faz sentido. O que mais?",
-                    "Compreendo. Como se sente sobre isso?"
-                ]
-            
-            return random.choice(general_responses)
+        # Respostas gerais baseadas na personalidade
+        for trait, general_responses in GENERAL_RESPONSES:
+            if trait is None or trait in traits:
+                return random.choice(general_responses)
     
     def generate_initial_message(self, personality: Dict[str, Any]) -> str:
         """Gera uma mensagem inicial personalizada"""
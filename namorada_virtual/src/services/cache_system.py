@@ -0,0 +1,126 @@
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import List, Dict, Any
+
+# Quantas mensagens recentes entram no resumo (digest) do histórico da chave
+HISTORY_DIGEST_TURNS = 4
+
+def normalize_message(text: str) -> str:
+    """Forma canônica de uma mensagem: minúsculas, sem acentos, pontuação ou letras esticadas ("oiii" -> "oi")"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r'[^\w\s]', ' ', text)
+    text = re.sub(r'(\w)\1{2,}', r'\1', text)
+    return " ".join(text.split())
+
+def history_digest(history: List[Dict[str, str]], user_message: str, turns: int = HISTORY_DIGEST_TURNS) -> str:
+    """Hash das últimas mensagens do histórico, já normalizadas"""
+    normalized = normalize_message(user_message)
+    recent = list(history)
+    if recent and recent[-1]['sender'] == 'user' and normalize_message(recent[-1]['message']) == normalized:
+        recent.pop()  # o histórico do app já inclui a mensagem atual
+    
+    digest = hashlib.sha1()
+    for msg in recent[-turns:]:
+        digest.update(f"{msg['sender']}\x1f{normalize_message(msg['message'])}\x1e".encode('utf-8'))
+    return digest.hexdigest()
+
+class ResponseCache:
+    """Cache de respostas com TTL e descarte LRU, opcionalmente persistido no banco.
+    
+    A chave combina personalidade, modo agente, período do dia, o histórico recente, as demais
+    seções dinâmicas do prompt (resumo, lembranças) e a mensagem normalizada; turnos repetidos ou
+    quase idênticos não geram nova chamada à API.
+    `persist` é um VirtualGirlfriendDB (tabela response_cache), consultado nas falhas do cache em memória.
+    """
+    
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 600, persist=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist = persist
+        
+        self._entries = OrderedDict()  # chave -> (resposta, criada_em)
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'persisted_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'expirations': 0}
+        
+        if self.persist is not None:
+            self.persist.prune_response_cache(ttl_seconds, max_entries * 4)
+    
+    def make_key(self, personality_key: str, history: List[Dict[str, str]], user_message: str,
+                 agent_mode: bool = False, time_bucket: str = "", prompt_context: str = "") -> str:
+        """Chave normalizada de um turno (`prompt_context`: texto das seções dinâmicas do prompt)"""
+        payload = json.dumps([
+            personality_key,
+            bool(agent_mode),
+            time_bucket,
+            history_digest(history, user_message),
+            hashlib.sha1(prompt_context.encode('utf-8')).hexdigest(),
+            normalize_message(user_message)
+        ])
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> str:
+        """Retorna a resposta em cache ou None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[1] <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return entry[0]
+                del self._entries[key]
+                self.stats['expirations'] += 1
+        
+        if self.persist is not None:
+            response = self.persist.get_cached_response(key, self.ttl_seconds)
+            if response is not None:
+                self._remember(key, response, now)
+                with self._lock:
+                    self.stats['persisted_hits'] += 1
+                return response
+        
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+    
+    def put(self, key: str, response: str):
+        """Armazena uma resposta (em memória e, se configurado, no banco)"""
+        if not response:
+            return
+        self._remember(key, response, time.time())
+        with self._lock:
+            self.stats['stores'] += 1
+        
+        if self.persist is not None:
+            try:
+                self.persist.save_cached_response(key, response)
+            except Exception as e:
+                print(f"Erro ao persistir cache de respostas: {e}")
+    
+    def _remember(self, key: str, response: str, created_at: float):
+        with self._lock:
+            self._entries[key] = (response, created_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+    
+    def clear(self):
+        """Esvazia o cache em memória"""
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores do cache e taxa de acerto (cada acerto é uma chamada à API economizada)"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['persisted_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['persisted_hits']) / lookups if lookups else 0.0
+        return stats
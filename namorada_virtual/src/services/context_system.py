@@ -0,0 +1,137 @@
+from typing import List, Dict, Any, Callable, Tuple
+
+# Aproximação usada no orçamento: ~4 caracteres por token (bom o bastante para português no Gemini)
+CHARS_PER_TOKEN = 4
+
+# Janela padrão quando ninguém configura um orçamento
+DEFAULT_TOKEN_BUDGET = 1200
+DEFAULT_SUMMARY_TOKEN_BUDGET = 250
+
+# Mensagens lidas na primeira tentativa de montar a janela (dobra se todas couberem)
+TAIL_BATCH = 32
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa barata de tokens de um texto (sem depender do tokenizador do modelo)"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN if text else 0
+
+def format_turn(msg: Dict[str, str], name: str) -> str:
+    """Linha de histórico exatamente como aparece no prompt"""
+    sender = "Você" if msg['sender'] == 'user' else name
+    return f"{sender}: {msg['message']}"
+
+def _clip(text: str, max_chars: int) -> str:
+    """Corta o texto em max_chars, marcando o corte com reticências"""
+    text = " ".join(text.split())
+    return text if len(text) <= max_chars else text[:max_chars - 1].rstrip() + "…"
+
+def pack_recent_turns(history: List[Dict[str, str]], token_budget: int, name: str) -> List[Dict[str, str]]:
+    """Seleciona as mensagens mais recentes que cabem no orçamento (ordem cronológica preservada).
+    
+    A última mensagem sempre entra; se sozinha estourar o orçamento, é cortada.
+    """
+    packed = []
+    used = 0
+    for msg in reversed(history):
+        cost = estimate_tokens(format_turn(msg, name)) + 1  # +1 pela quebra de linha
+        if used + cost > token_budget:
+            if not packed:
+                max_chars = max(token_budget * CHARS_PER_TOKEN - len(name) - 3, 1)
+                packed.append({**msg, 'message': _clip(msg['message'], max_chars)})
+            break
+        packed.append(msg)
+        used += cost
+    
+    packed.reverse()
+    return packed
+
+def summarize_turns(summary: str, turns: List[Dict[str, str]], name: str, token_budget: int) -> str:
+    """Resumo extrativo incremental: acrescenta as mensagens dobradas ao resumo anterior.
+    
+    Falas do usuário são mantidas com mais detalhe (são elas que carregam fatos sobre ele);
+    quando o resumo passa do orçamento, as linhas mais antigas saem primeiro.
+    """
+    lines = summary.split("\n") if summary else []
+    for msg in turns:
+        if msg['sender'] == 'user':
+            lines.append(f"Você disse: {_clip(msg['message'], 120)}")
+        else:
+            lines.append(f"{name} disse: {_clip(msg['message'], 60)}")
+    
+    while lines and estimate_tokens("\n".join(lines)) > token_budget:
+        lines.pop(0)
+    return "\n".join(lines)
+
+class ContextWindow:
+    """Monta o contexto da conversa dentro de um orçamento de tokens.
+    
+    As mensagens mais recentes entram literalmente; as que saem da janela são dobradas em um
+    resumo acumulado, persistido no storage (get/save_context_summary) e atualizado só com o
+    que ainda não foi resumido.
+    """
+    
+    def __init__(self, storage, token_budget: int = DEFAULT_TOKEN_BUDGET,
+                 summary_token_budget: int = DEFAULT_SUMMARY_TOKEN_BUDGET,
+                 summarizer: Callable[[str, List[Dict[str, str]], str, int], str] = None):
+        self.storage = storage
+        self.token_budget = token_budget
+        self.summary_token_budget = min(summary_token_budget, token_budget // 2)
+        self.summarizer = summarizer or summarize_turns
+    
+    def _read_tail(self, conversation_id: int, total: int, folded: int,
+                   name: str) -> Tuple[List[Dict[str, str]], int, List[Dict[str, str]]]:
+        """Lê só o final da conversa: (mensagens lidas, posição da primeira delas, mensagens que cabem).
+        
+        Começa com TAIL_BATCH mensagens e dobra enquanto todas as não resumidas couberem na janela.
+        """
+        window_budget = self.token_budget - self.summary_token_budget
+        limit = TAIL_BATCH
+        while True:
+            tail = self.storage.get_recent_messages(conversation_id, limit)
+            offset = max(total - len(tail), 0) if len(tail) == limit else 0
+            pending = tail[max(folded - offset, 0):]
+            recent = pack_recent_turns(pending, window_budget, name)
+            if len(recent) < len(pending) or offset <= folded:
+                return tail, offset, recent
+            limit *= 2
+    
+    def build(self, conversation_id: int, name: str) -> Tuple[List[Dict[str, str]], str]:
+        """Retorna (mensagens recentes, resumo das anteriores) para a conversa.
+        
+        Só o final da conversa é lido do storage: o custo por turno depende do orçamento de tokens,
+        não do tamanho do histórico.
+        """
+        total = self.storage.get_message_count(conversation_id)
+        
+        state = self.storage.get_context_summary(conversation_id) or {'summary': '', 'folded_count': 0}
+        summary, folded = state['summary'], state['folded_count']
+        if folded > total:
+            # Mensagens foram apagadas (retenção, importação...): o resumo não vale mais
+            summary, folded = '', 0
+        
+        tail, offset, recent = self._read_tail(conversation_id, total, folded, name)
+        start = offset + len(tail) - len(recent)
+        
+        if start > folded:
+            if offset > folded:
+                # Mensagens antigas ainda não resumidas (primeiro turno de uma conversa longa):
+                # cada uma ocupa ao menos um token do resumo, então as anteriores sairiam de qualquer jeito
+                extra = min(offset - folded, self.summary_token_budget)
+                tail = self.storage.get_recent_messages(conversation_id, len(tail) + extra)
+                offset = start + len(recent) - len(tail)
+            summary = self.summarizer(summary, tail[max(folded - offset, 0):start - offset],
+                                      name, self.summary_token_budget)
+            folded = start
+        if (summary, folded) != (state['summary'], state['folded_count']):
+            self.storage.save_context_summary(conversation_id, summary, folded)
+        
+        return recent, summary
+    
+    def get_stats(self, recent: List[Dict[str, str]], summary: str, name: str) -> Dict[str, Any]:
+        """Tokens estimados usados pela janela montada"""
+        history_tokens = sum(estimate_tokens(format_turn(msg, name)) + 1 for msg in recent)
+        return {
+            'turns': len(recent),
+            'history_tokens': history_tokens,
+            'summary_tokens': estimate_tokens(summary),
+            'token_budget': self.token_budget
+        }
@@ -1,21 +1,40 @@
 import sqlite3
 import json
-from datetime import datetime, date
-from typing import List, Dict, Any
+import csv
+import gzip
+import hashlib
+import shutil
+import tempfile
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+import threading
+import time
+from datetime import datetime, date, timedelta, timezone
+from typing import List, Dict, Any, Iterator, Callable
 import os
+import random
+import re
+import unicodedata
 
-class VirtualGirlfriendDB:
-    def __init__(self, db_path: str = "virtual_girlfriend.db"):
-        self.db_path = db_path
-        self.init_database()
-    
-    def init_database(self):
-        """Inicializa o banco de dados com as tabelas necessárias"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Tabela para personalidades
-        cursor.execute('''
+try:
+    from .storage_system import ChatStorage, DEFAULT_PERSONALITY
+except ImportError:
+    from storage_system import ChatStorage, DEFAULT_PERSONALITY  # executado como script
+
+# Import condicional do zstd (compressão melhor para o arquivo morto; zlib é o padrão)
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Migrações do schema. A posição na lista (a partir de 1) é a versão gravada em
+# PRAGMA user_version; cada passo é um comando SQL ou uma função que recebe a conexão.
+# Nunca altere uma migração já publicada: adicione uma nova ao final da lista.
+MIGRATIONS = [
+    ("schema inicial", [
+        '''
             CREATE TABLE IF NOT EXISTS personalities (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 name TEXT NOT NULL,
@@ -28,19 +47,15 @@ class VirtualGirlfriendDB:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
-        ''')
-        
-        # Tabela para conversas
-        cursor.execute('''
+        ''',
+        '''
             CREATE TABLE IF NOT EXISTS conversations (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 date TEXT NOT NULL, -- YYYY-MM-DD format
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
-        ''')
-        
-        # Tabela para mensagens
-        cursor.execute('''
+        ''',
+        '''
             CREATE TABLE IF NOT EXISTS messages (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 conversation_id INTEGER,
@@ -49,23 +64,1108 @@ class VirtualGirlfriendDB:
                 timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (conversation_id) REFERENCES conversations (id)
             )
-        ''')
-        
-        # Tabela para configurações
-        cursor.execute('''
+        ''',
+        '''
             CREATE TABLE IF NOT EXISTS settings (
                 key TEXT PRIMARY KEY,
                 value TEXT NOT NULL,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
-        ''')
+        ''',
+    ]),
+    ("índices das consultas de mensagens e conversas", [
+        # Conversas duplicadas no mesmo dia (condição de corrida antiga) são fundidas
+        # na mais antiga antes de criar o índice único
+        '''
+            UPDATE messages
+            SET conversation_id = (
+                SELECT MIN(c2.id) FROM conversations c2
+                WHERE c2.date = (SELECT c1.date FROM conversations c1 WHERE c1.id = messages.conversation_id)
+            )
+            WHERE conversation_id IN (
+                SELECT id FROM conversations
+                WHERE id NOT IN (SELECT MIN(id) FROM conversations GROUP BY date)
+            )
+        ''',
+        "DELETE FROM conversations WHERE id NOT IN (SELECT MIN(id) FROM conversations GROUP BY date)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_conversations_date ON conversations (date)",
+        "CREATE INDEX IF NOT EXISTS idx_messages_conversation_timestamp ON messages (conversation_id, timestamp)",
+    ]),
+    ("resumo desnormalizado das conversas", [
+        '''
+            CREATE TABLE IF NOT EXISTS conversation_summary (
+                conversation_id INTEGER PRIMARY KEY,
+                date TEXT, -- YYYY-MM-DD format (cópia de conversations.date)
+                created_at TIMESTAMP,
+                last_message TEXT,
+                message_count INTEGER NOT NULL DEFAULT 0,
+                last_activity TIMESTAMP
+            )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_conversation_summary_date ON conversation_summary (date)",
+        '''
+            INSERT OR REPLACE INTO conversation_summary
+                (conversation_id, date, created_at, last_message, message_count, last_activity)
+            SELECT c.id, c.date, c.created_at,
+                   (SELECT message FROM messages WHERE conversation_id = c.id
+                    ORDER BY timestamp DESC, id DESC LIMIT 1),
+                   (SELECT COUNT(*) FROM messages WHERE conversation_id = c.id),
+                   (SELECT MAX(timestamp) FROM messages WHERE conversation_id = c.id)
+            FROM conversations c
+        ''',
+        # Os triggers mantêm o resumo atualizado em qualquer caminho de escrita
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_conversations_insert_summary
+            AFTER INSERT ON conversations
+            BEGIN
+                INSERT OR IGNORE INTO conversation_summary (conversation_id, date, created_at)
+                VALUES (NEW.id, NEW.date, NEW.created_at);
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_conversations_delete_summary
+            AFTER DELETE ON conversations
+            BEGIN
+                DELETE FROM conversation_summary WHERE conversation_id = OLD.id;
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_messages_insert_summary
+            AFTER INSERT ON messages
+            WHEN EXISTS (SELECT 1 FROM conversations WHERE id = NEW.conversation_id)
+            BEGIN
+                INSERT INTO conversation_summary
+                    (conversation_id, date, created_at, last_message, message_count, last_activity)
+                SELECT id, date, created_at, NEW.message, 1, NEW.timestamp
+                FROM conversations WHERE id = NEW.conversation_id
+                ON CONFLICT (conversation_id) DO UPDATE SET
+                    message_count = message_count + 1,
+                    last_message = CASE WHEN last_activity IS NULL OR excluded.last_activity >= last_activity
+                                        THEN excluded.last_message ELSE last_message END,
+                    last_activity = MAX(COALESCE(last_activity, excluded.last_activity), excluded.last_activity);
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_messages_delete_summary
+            AFTER DELETE ON messages
+            BEGIN
+                UPDATE conversation_summary
+                SET message_count = message_count - 1,
+                    last_message = (SELECT message FROM messages WHERE conversation_id = OLD.conversation_id
+                                    ORDER BY timestamp DESC, id DESC LIMIT 1),
+                    last_activity = (SELECT MAX(timestamp) FROM messages WHERE conversation_id = OLD.conversation_id)
+                WHERE conversation_id = OLD.conversation_id;
+            END
+        ''',
+    ]),
+    ("índice de busca textual (FTS5)", [
+        lambda conn: _create_fts_index(conn),
+    ]),
+    ("contadores e histogramas de mensagens mantidos por triggers", [
+        '''
+            CREATE TABLE IF NOT EXISTS table_counters (
+                name TEXT PRIMARY KEY,
+                row_count INTEGER NOT NULL DEFAULT 0
+            )
+        ''',
+        '''
+            CREATE TABLE IF NOT EXISTS message_stats (
+                day TEXT NOT NULL, -- YYYY-MM-DD (UTC, como o timestamp)
+                sender TEXT NOT NULL,
+                message_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, sender)
+            ) WITHOUT ROWID
+        ''',
+        "INSERT OR REPLACE INTO table_counters (name, row_count) SELECT 'conversations', COUNT(*) FROM conversations",
+        "INSERT OR REPLACE INTO table_counters (name, row_count) SELECT 'messages', COUNT(*) FROM messages",
+        '''
+            INSERT OR REPLACE INTO message_stats (day, sender, message_count)
+            SELECT date(timestamp), sender, COUNT(*) FROM messages GROUP BY date(timestamp), sender
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_conversations_insert_counter
+            AFTER INSERT ON conversations
+            BEGIN
+                UPDATE table_counters SET row_count = row_count + 1 WHERE name = 'conversations';
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_conversations_delete_counter
+            AFTER DELETE ON conversations
+            BEGIN
+                UPDATE table_counters SET row_count = row_count - 1 WHERE name = 'conversations';
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_messages_insert_stats
+            AFTER INSERT ON messages
+            BEGIN
+                UPDATE table_counters SET row_count = row_count + 1 WHERE name = 'messages';
+                INSERT INTO message_stats (day, sender, message_count)
+                VALUES (date(NEW.timestamp), NEW.sender, 1)
+                ON CONFLICT (day, sender) DO UPDATE SET message_count = message_count + 1;
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_messages_delete_stats
+            AFTER DELETE ON messages
+            BEGIN
+                UPDATE table_counters SET row_count = row_count - 1 WHERE name = 'messages';
+                UPDATE message_stats SET message_count = message_count - 1
+                WHERE day = date(OLD.timestamp) AND sender = OLD.sender;
+            END
+        ''',
+    ]),
+    ("arquivo morto comprimido de conversas antigas", [
+        '''
+            CREATE TABLE IF NOT EXISTS archived_conversations (
+                conversation_id INTEGER PRIMARY KEY,
+                codec TEXT NOT NULL, -- 'zlib' ou 'zstd'
+                payload BLOB NOT NULL, -- JSON [[id, sender, message, timestamp], ...] comprimido
+                message_count INTEGER NOT NULL,
+                user_messages INTEGER NOT NULL,
+                ai_messages INTEGER NOT NULL,
+                raw_bytes INTEGER NOT NULL,
+                compressed_bytes INTEGER NOT NULL,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_conversations_delete_archive
+            AFTER DELETE ON conversations
+            BEGIN
+                DELETE FROM archived_conversations WHERE conversation_id = OLD.id;
+            END
+        ''',
+    ]),
+    ("resumo acumulado do contexto das conversas", [
+        '''
+            CREATE TABLE IF NOT EXISTS context_summaries (
+                conversation_id INTEGER PRIMARY KEY,
+                summary TEXT NOT NULL,
+                folded_count INTEGER NOT NULL, -- mensagens (em ordem cronológica) já resumidas
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_conversations_delete_context_summary
+            AFTER DELETE ON conversations
+            BEGIN
+                DELETE FROM context_summaries WHERE conversation_id = OLD.id;
+            END
+        ''',
+    ]),
+    ("cache persistente de respostas", [
+        '''
+            CREATE TABLE IF NOT EXISTS response_cache (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL -- epoch em segundos
+            )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_response_cache_created ON response_cache(created_at)",
+    ]),
+    ("busca e estatísticas das mensagens arquivadas", [
+        # Metadados de cada mensagem arquivada; o texto continua só no blob comprimido
+        '''
+            CREATE TABLE IF NOT EXISTS archived_messages (
+                id INTEGER PRIMARY KEY, -- o mesmo id que a mensagem tinha em messages
+                conversation_id INTEGER NOT NULL,
+                sender TEXT NOT NULL,
+                timestamp TIMESTAMP
+            )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_archived_messages_conversation ON archived_messages (conversation_id)",
+        # As estatísticas diárias continuam contando as mensagens depois de arquivadas
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_archived_messages_insert_stats
+            AFTER INSERT ON archived_messages
+            BEGIN
+                INSERT INTO message_stats (day, sender, message_count)
+                VALUES (date(NEW.timestamp), NEW.sender, 1)
+                ON CONFLICT (day, sender) DO UPDATE SET message_count = message_count + 1;
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_archived_messages_delete_stats
+            AFTER DELETE ON archived_messages
+            BEGIN
+                UPDATE message_stats SET message_count = message_count - 1
+                WHERE day = date(OLD.timestamp) AND sender = OLD.sender;
+            END
+        ''',
+        '''
+            CREATE TRIGGER IF NOT EXISTS trg_archived_conversations_delete
+            AFTER DELETE ON archived_conversations
+            BEGIN
+                DELETE FROM archived_messages WHERE conversation_id = OLD.conversation_id;
+                UPDATE conversation_summary
+                SET message_count = message_count - OLD.message_count,
+                    last_message = (SELECT message FROM messages WHERE conversation_id = OLD.conversation_id
+                                    ORDER BY timestamp DESC, id DESC LIMIT 1),
+                    last_activity = (SELECT MAX(timestamp) FROM messages WHERE conversation_id = OLD.conversation_id)
+                WHERE conversation_id = OLD.conversation_id;
+            END
+        ''',
+        lambda conn: _create_archive_fts_index(conn),
+        lambda conn: _index_existing_archives(conn),
+    ]),
+]
+
+def _fts5_available(conn: sqlite3.Connection) -> bool:
+    """Verifica se o SQLite embutido foi compilado com FTS5"""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp._fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp._fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+def _create_fts_index(conn: sqlite3.Connection):
+    """Cria a tabela FTS5 sobre messages.message e os triggers de sincronização"""
+    if not _fts5_available(conn):
+        print("SQLite sem suporte a FTS5. A busca usará LIKE (mais lenta).")
+        return
+    
+    # Tabela de conteúdo externo: o texto fica só em messages, o FTS guarda apenas o índice
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+            message,
+            content='messages',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_messages_insert_fts
+        AFTER INSERT ON messages
+        BEGIN
+            INSERT INTO messages_fts (rowid, message) VALUES (NEW.id, NEW.message);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_messages_delete_fts
+        AFTER DELETE ON messages
+        BEGIN
+            INSERT INTO messages_fts (messages_fts, rowid, message) VALUES ('delete', OLD.id, OLD.message);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_messages_update_fts
+        AFTER UPDATE OF message ON messages
+        BEGIN
+            INSERT INTO messages_fts (messages_fts, rowid, message) VALUES ('delete', OLD.id, OLD.message);
+            INSERT INTO messages_fts (rowid, message) VALUES (NEW.id, NEW.message);
+        END
+    ''')
+    
+    # Indexa o histórico já existente
+    conn.execute("INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')")
+
+def _create_archive_fts_index(conn: sqlite3.Connection):
+    """Cria o índice FTS5 sem conteúdo das mensagens arquivadas (o texto fica só no blob comprimido)"""
+    if not _fts5_available(conn):
+        return
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS archived_messages_fts USING fts5(
+            message,
+            content='',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    ''')
+
+def _index_existing_archives(conn: sqlite3.Connection):
+    """Indexa as conversas arquivadas antes do índice do arquivo morto existir"""
+    archived = conn.execute("SELECT conversation_id, codec, payload FROM archived_conversations").fetchall()
+    for conv_id, codec, payload in archived:
+        try:
+            rows = _decompress_archive(codec, payload)
+        except Exception as e:
+            print(f"⚠️ Conversa arquivada {conv_id} fora da busca e das estatísticas: {e}")
+            continue
+        _index_archived_rows(conn, conv_id, rows)
+
+def _table_exists(conn: sqlite3.Connection, name: str) -> bool:
+    """Verifica se uma tabela (ou tabela virtual) existe no banco"""
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+def _index_archived_rows(conn: sqlite3.Connection, conversation_id: int, rows: List[list]):
+    """Registra mensagens recém-arquivadas ([id, sender, message, timestamp]) na busca e nas estatísticas"""
+    conn.executemany(
+        "INSERT INTO archived_messages (id, conversation_id, sender, timestamp) VALUES (?, ?, ?, ?)",
+        [(r[0], conversation_id, r[1], r[3]) for r in rows]
+    )
+    if _table_exists(conn, 'archived_messages_fts'):
+        conn.executemany("INSERT INTO archived_messages_fts (rowid, message) VALUES (?, ?)",
+                         [(r[0], r[2]) for r in rows])
+
+def _unindex_archived_rows(conn: sqlite3.Connection, conversation_id: int, rows: List[list]):
+    """Tira mensagens arquivadas da busca e das estatísticas (o FTS sem conteúdo precisa do texto original)"""
+    indexed = {r[0] for r in conn.execute(
+        "SELECT id FROM archived_messages WHERE conversation_id = ?", (conversation_id,)
+    )}
+    rows = [r for r in rows if r[0] in indexed]
+    if _table_exists(conn, 'archived_messages_fts'):
+        conn.executemany(
+            "INSERT INTO archived_messages_fts (archived_messages_fts, rowid, message) VALUES ('delete', ?, ?)",
+            [(r[0], r[2]) for r in rows]
+        )
+    conn.executemany("DELETE FROM archived_messages WHERE id = ?", [(r[0],) for r in rows])
+
+def _fold_text(text: str) -> str:
+    """Minúsculas e sem acento, como o tokenizador unicode61 com remove_diacritics"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+def _archived_snippet(text: str, query: str, tokens: int = 12) -> str:
+    """Trecho destacado no formato de snippet() para mensagens arquivadas (o índice não guarda o texto)"""
+    terms = [_fold_text(term) for term in re.findall(r'\w+', query)]
+    spans = [(m.start(), m.end(), _fold_text(m.group())) for m in re.finditer(r'\w+', text)]
+    if not terms or not spans:
+        return text
+    
+    def matches(token: str) -> bool:
+        # Último termo por prefixo, como em _build_fts_query
+        return token in terms[:-1] or token.startswith(terms[-1])
+    
+    first = next((i for i, span in enumerate(spans) if matches(span[2])), 0)
+    start = max(0, min(first - tokens // 4, len(spans) - tokens))
+    window = spans[start:start + tokens]
+    end_of_text = start + tokens >= len(spans)
+    
+    parts = ["…"] if start > 0 else [text[:window[0][0]]]
+    position = window[0][0]
+    for span_start, span_end, token in window:
+        parts.append(text[position:span_start])
+        word = text[span_start:span_end]
+        parts.append(f"[{word}]" if matches(token) else word)
+        position = span_end
+    parts.append(text[position:] if end_of_text else "…")
+    return "".join(parts)
+
+def _build_fts_query(query: str) -> str:
+    """Converte texto livre em uma consulta FTS5 segura (termos entre aspas, prefixo no último)"""
+    terms = re.findall(r'\w+', query, flags=re.UNICODE)
+    if not terms:
+        return ''
+    
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'  # busca enquanto digita: último termo por prefixo
+    return ' '.join(quoted)
+
+# Consultas executadas a cada mensagem ou abertura do histórico. Ficam centralizadas
+# para que find_full_scans() possa conferir o plano de execução de cada uma.
+# O desempate por id (rowid) usa o próprio índice e mantém a ordem estável.
+HOT_QUERIES = {
+    'conversation_by_date': "SELECT id FROM conversations WHERE date = ?",
+    'conversation_history': '''
+        SELECT sender, message, timestamp 
+        FROM messages 
+        WHERE conversation_id = ? 
+        ORDER BY timestamp ASC, id ASC
+    ''',
+    'list_conversations': '''
+        SELECT conversation_id, date, created_at, last_message, message_count, last_activity
+        FROM conversation_summary
+        ORDER BY date DESC
+        LIMIT ? OFFSET ?
+    ''',
+    'recent_messages': '''
+        SELECT sender, message 
+        FROM messages 
+        WHERE conversation_id = ? 
+        ORDER BY timestamp DESC, id DESC 
+        LIMIT ?
+    ''',
+}
+
+class MessageWriteQueue:
+    """Fila write-behind: agrupa mensagens e grava cada lote em uma única transação
+    numa thread dedicada, tirando o commit/fsync da thread da interface"""
+    
+    def __init__(self, db: 'VirtualGirlfriendDB', max_batch: int = 50, flush_interval: float = 0.5):
+        self.db = db
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
         
-        conn.commit()
-        conn.close()
+        self._pending = []
+        self._first_pending_at = 0.0
+        self._enqueued_seq = 0   # total de mensagens já enfileiradas
+        self._flushed_seq = 0    # total de mensagens já gravadas
+        self._flush_requested = False
+        self._closed = False
+        self._cond = threading.Condition()
+        
+        self._thread = threading.Thread(target=self._run, name="db-write-behind", daemon=True)
+        self._thread.start()
+    
+    def put(self, conversation_id: int, sender: str, message: str):
+        """Enfileira uma mensagem (o timestamp é fixado agora, em UTC como CURRENT_TIMESTAMP)"""
+        timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Fila de escrita já foi fechada")
+            if not self._pending:
+                self._first_pending_at = time.monotonic()
+            self._pending.append((conversation_id, sender, message, timestamp))
+            self._enqueued_seq += 1
+            # Acorda o escritor no primeiro item (inicia o timer) e com o lote cheio
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._cond.notify_all()
+    
+    def pending_count(self) -> int:
+        """Retorna quantas mensagens ainda não foram gravadas"""
+        with self._cond:
+            return self._enqueued_seq - self._flushed_seq
+    
+    def flush(self, timeout: float = None) -> bool:
+        """Bloqueia até que tudo o que foi enfileirado antes da chamada esteja gravado"""
+        with self._cond:
+            target = self._enqueued_seq
+            if self._flushed_seq >= target:
+                return True
+            
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._flushed_seq >= target, timeout)
+    
+    def close(self, timeout: float = None):
+        """Grava o que estiver pendente e encerra a thread de escrita"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        
+        self._thread.join(timeout)
+    
+    def _should_write(self) -> bool:
+        """Condição de disparo: lote cheio, tempo esgotado, flush pedido ou fechamento"""
+        if self._closed or self._flush_requested:
+            return True
+        if not self._pending:
+            return False
+        return (len(self._pending) >= self.max_batch or
+                time.monotonic() - self._first_pending_at >= self.flush_interval)
+    
+    def _run(self):
+        """Loop da thread de escrita"""
+        while True:
+            with self._cond:
+                while not self._should_write():
+                    if self._pending:
+                        self._cond.wait(self._first_pending_at + self.flush_interval - time.monotonic())
+                    else:
+                        self._cond.wait()
+                
+                batch = self._pending
+                self._pending = []
+                self._flush_requested = False
+                target = self._enqueued_seq
+                closed = self._closed
+            
+            if batch:
+                try:
+                    self.db.save_messages(batch)
+                except Exception as e:
+                    print(f"Erro ao gravar lote de mensagens: {e}")
+                    with self._cond:
+                        # Devolve o lote para a frente da fila e tenta de novo mais tarde
+                        self._pending = batch + self._pending
+                        self._first_pending_at = time.monotonic()
+                    if closed:
+                        return
+                    time.sleep(self.flush_interval)
+                    continue
+            
+            with self._cond:
+                self._flushed_seq = max(self._flushed_seq, target)
+                self._cond.notify_all()
+                if closed and not self._pending:
+                    return
+
+def _compress_archive(rows: List[tuple]) -> tuple:
+    """Serializa e comprime as mensagens de uma conversa; retorna (codec, payload, bytes originais)"""
+    raw = json.dumps(rows, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    if ZSTD_AVAILABLE:
+        return 'zstd', zstandard.ZstdCompressor(level=19).compress(raw), len(raw)
+    return 'zlib', zlib.compress(raw, 9), len(raw)
+
+def _decompress_archive(codec: str, payload: bytes) -> List[list]:
+    """Descomprime o payload de uma conversa arquivada"""
+    if codec == 'zstd':
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("Conversa arquivada com zstd, mas o pacote zstandard não está instalado")
+        raw = zstandard.ZstdDecompressor().decompress(payload)
+    else:
+        raw = zlib.decompress(payload)
+    return json.loads(raw.decode('utf-8'))
+
+def _sender_label(sender: str, ai_name: str) -> str:
+    """Nome exibido para o remetente nas exportações"""
+    return "Você" if sender == 'user' else ai_name
+
+def _export_txt(f, messages: Iterator[Dict[str, Any]], ai_name: str) -> int:
+    """Exporta no formato de texto original, com separador por data"""
+    f.write(f"=== Conversa com {ai_name} ===\n\n")
+    count = 0
+    current_conversation = None
+    for msg in messages:
+        if msg['conversation_id'] != current_conversation:
+            current_conversation = msg['conversation_id']
+            f.write(f"--- {msg['date']} ---\n\n")
+        f.write(f"[{msg['timestamp']}] {_sender_label(msg['sender'], ai_name)}: {msg['message']}\n\n")
+        count += 1
+    return count
+
+def _export_jsonl(f, messages: Iterator[Dict[str, Any]], ai_name: str) -> int:
+    """Exporta uma mensagem JSON por linha"""
+    count = 0
+    for msg in messages:
+        f.write(json.dumps(msg, ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+def _export_csv(f, messages: Iterator[Dict[str, Any]], ai_name: str) -> int:
+    """Exporta em CSV com cabeçalho"""
+    fields = ['id', 'conversation_id', 'date', 'timestamp', 'sender', 'message']
+    writer = csv.DictWriter(f, fieldnames=fields)
+    writer.writeheader()
+    count = 0
+    for msg in messages:
+        writer.writerow({field: msg[field] for field in fields})
+        count += 1
+    return count
+
+def _export_markdown(f, messages: Iterator[Dict[str, Any]], ai_name: str) -> int:
+    """Exporta em Markdown, com uma seção por conversa"""
+    f.write(f"# Conversa com {ai_name}\n")
+    count = 0
+    current_conversation = None
+    for msg in messages:
+        if msg['conversation_id'] != current_conversation:
+            current_conversation = msg['conversation_id']
+            f.write(f"\n## {msg['date']}\n\n")
+        text = msg['message'].replace('\n', '  \n')
+        f.write(f"**{_sender_label(msg['sender'], ai_name)}** _{msg['timestamp']}_  \n{text}\n\n")
+        count += 1
+    return count
+
+EXPORT_FORMATS = {
+    'txt': _export_txt,
+    'jsonl': _export_jsonl,
+    'csv': _export_csv,
+    'md': _export_markdown,
+}
+
+def _message_hash(sender: str, message: str) -> str:
+    """Hash do conteúdo da mensagem usado na deduplicação de importações"""
+    return hashlib.sha1(f"{sender}\x1f{message}".encode('utf-8')).hexdigest()
+
+def _read_import_rows(source_path: str, fmt: str = None) -> Iterator[Dict[str, Any]]:
+    """Lê mensagens de um export JSONL/CSV (opcionalmente .gz) ou de outro banco SQLite"""
+    path_lower = source_path.lower()
+    compressed = path_lower.endswith('.gz')
+    if fmt is None:
+        base = path_lower[:-3] if compressed else path_lower
+        fmt = os.path.splitext(base)[1].lstrip('.')
+    fmt = {'json': 'jsonl', 'sqlite': 'db', 'sqlite3': 'db'}.get(fmt.lower(), fmt.lower())
+    
+    if fmt == 'db':
+        source = sqlite3.connect(f"file:{source_path}?mode=ro", uri=True)
+        try:
+            cursor = source.execute('''
+                SELECT c.date, m.sender, m.message, m.timestamp
+                FROM messages m
+                LEFT JOIN conversations c ON c.id = m.conversation_id
+            ''')
+            while True:
+                rows = cursor.fetchmany(1000)
+                if not rows:
+                    break
+                for row in rows:
+                    yield {'date': row[0], 'sender': row[1], 'message': row[2], 'timestamp': row[3]}
+            
+            # Conversas que a outra instalação já moveu para o arquivo morto comprimido
+            has_archive = source.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'archived_conversations'"
+            ).fetchone()
+            if has_archive:
+                archived = source.execute('''
+                    SELECT a.conversation_id, c.date, a.codec, a.payload
+                    FROM archived_conversations a
+                    LEFT JOIN conversations c ON c.id = a.conversation_id
+                ''')
+                for conv_id, conv_date, codec, payload in archived:
+                    try:
+                        archived_rows = _decompress_archive(codec, payload)
+                    except Exception as e:
+                        print(f"⚠️ Conversa arquivada {conv_id} ignorada na importação: {e}")
+                        continue
+                    for _, sender, message, timestamp in archived_rows:
+                        yield {'date': conv_date, 'sender': sender, 'message': message, 'timestamp': timestamp}
+        finally:
+            source.close()
+        return
+    
+    opener = gzip.open if compressed else open
+    with opener(source_path, 'rt', encoding='utf-8', newline='') as f:
+        if fmt == 'jsonl':
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        yield {}  # contabilizada como inválida
+        elif fmt == 'csv':
+            yield from csv.DictReader(f)
+        else:
+            raise ValueError(f"Formato de importação não suportado: {fmt}")
+
+def _backup_progress(progress: Callable[[int, int], None]):
+    """Adapta o callback (copiadas, total) para a assinatura da API de backup do sqlite3"""
+    if progress is None:
+        return None
+    return lambda status, remaining, total: progress(total - remaining, total)
+
+class BackupScheduler:
+    """Backups periódicos em segundo plano, com compressão opcional e rotação por quantidade/idade"""
+    
+    PREFIX = "backup_virtual_girlfriend_"
+    
+    def __init__(self, db: 'VirtualGirlfriendDB', backup_dir: str = "backups", interval_hours: float = 24,
+                 keep: int = 7, max_age_days: int = None, compress: bool = True,
+                 progress: Callable[[int, int], None] = None):
+        self.db = db
+        self.backup_dir = backup_dir
+        self.interval = interval_hours * 3600
+        self.keep = keep
+        self.max_age_days = max_age_days
+        self.compress = compress
+        self.progress = progress
+        self.last_error = None
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def list_backups(self) -> List[str]:
+        """Backups existentes no diretório, do mais novo para o mais antigo"""
+        if not os.path.isdir(self.backup_dir):
+            return []
+        paths = [os.path.join(self.backup_dir, name) for name in os.listdir(self.backup_dir)
+                 if name.startswith(self.PREFIX)]
+        return sorted(paths, key=os.path.getmtime, reverse=True)
+    
+    def run_backup(self) -> str:
+        """Cria um backup agora e aplica a rotação"""
+        os.makedirs(self.backup_dir, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(self.backup_dir, f"{self.PREFIX}{timestamp}.db")
+        
+        path = self.db.backup_database(path, progress=self.progress, compress=self.compress)
+        self.rotate()
+        return path
+    
+    def rotate(self) -> List[str]:
+        """Remove backups além de `keep` e mais velhos que `max_age_days`"""
+        backups = self.list_backups()
+        removed = []
+        
+        cutoff = time.time() - self.max_age_days * 86400 if self.max_age_days is not None else None
+        for index, path in enumerate(backups):
+            too_many = self.keep is not None and index >= self.keep
+            too_old = cutoff is not None and index > 0 and os.path.getmtime(path) < cutoff  # preserva o mais novo
+            if too_many or too_old:
+                os.remove(path)
+                removed.append(path)
+        
+        return removed
+    
+    def seconds_until_due(self) -> float:
+        """Tempo até o próximo backup, baseado no backup mais recente em disco"""
+        backups = self.list_backups()
+        if not backups:
+            return 0
+        return max(0, os.path.getmtime(backups[0]) + self.interval - time.time())
+    
+    def start(self):
+        """Inicia o agendamento (faz backup imediatamente se o último estiver vencido)"""
+        if self._thread and self._thread.is_alive():
+            return
+        
+        self._stop_event.clear()
+        
+        def loop():
+            while not self._stop_event.wait(self.seconds_until_due()):
+                try:
+                    self.run_backup()
+                    self.last_error = None
+                except Exception as e:
+                    self.last_error = e
+                    print(f"Erro no backup automático: {e}")
+                    self._stop_event.wait(min(self.interval, 600))  # nova tentativa mais tarde
+        
+        self._thread = threading.Thread(target=loop, name="db-backup-scheduler", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: float = None):
+        """Interrompe o agendamento"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+class RetentionPolicy:
+    """Limites de retenção do histórico (None desativa o critério)"""
+    
+    def __init__(self, max_age_days: int = None, max_messages: int = None,
+                 max_db_size_mb: float = None, batch_size: int = 500):
+        self.max_age_days = max_age_days
+        self.max_messages = max_messages
+        self.max_db_size_mb = max_db_size_mb
+        self.batch_size = batch_size
+
+class RetentionEngine:
+    """Aplica uma RetentionPolicy em lotes pequenos (uma transação curta por lote),
+    para nunca segurar o lock de escrita por muito tempo, e recupera o espaço em disco.
+    
+    Mensagens do arquivo morto contam nos limites e, por serem as mais antigas, saem primeiro;
+    o limite de tamanho nunca apaga a conversa de hoje.
+    """
+    
+    def __init__(self, db: 'VirtualGirlfriendDB', policy: RetentionPolicy):
+        self.db = db
+        self.policy = policy
+        self._uncompacted = True  # remoções no FTS ainda não compactadas (não liberam páginas)
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def run(self, max_batches: int = None, pause: float = 0.0) -> Dict[str, int]:
+        """Executa a política até cumpri-la (ou até max_batches lotes) e faz o vacuum incremental"""
+        stats = {'messages_deleted': 0, 'conversations_deleted': 0, 'pages_reclaimed': 0}
+        batches = 0
+        self._uncompacted = True  # o arquivamento também deixa remoções pendentes no índice de busca
+        
+        while max_batches is None or batches < max_batches:
+            if self._stop_event.is_set():
+                break
+            
+            deleted = self._delete_batch()
+            if not deleted:
+                break
+            
+            stats['messages_deleted'] += deleted
+            self._uncompacted = True
+            batches += 1
+            if pause:
+                time.sleep(pause)  # libera o lock para a interface entre os lotes
+        
+        stats['conversations_deleted'] = self._delete_expired_conversations()
+        if stats['messages_deleted']:
+            self.db.optimize_search_index()
+        stats['pages_reclaimed'] = self.db.incremental_vacuum()
+        return stats
+    
+    def start(self, interval: float = 3600, max_batches_per_run: int = 20, pause: float = 0.05):
+        """Roda a retenção periodicamente numa thread em segundo plano"""
+        if self._thread and self._thread.is_alive():
+            return
+        
+        self._stop_event.clear()
+        
+        def loop():
+            while not self._stop_event.is_set():
+                try:
+                    self.run(max_batches_per_run, pause)
+                except Exception as e:
+                    print(f"Erro na limpeza automática do histórico: {e}")
+                self._stop_event.wait(interval)
+        
+        self._thread = threading.Thread(target=loop, name="db-retention", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: float = None):
+        """Interrompe a thread de retenção"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+    
+    def _cutoff_date(self) -> str:
+        """Data limite (YYYY-MM-DD) da política de idade"""
+        return (date.today() - timedelta(days=self.policy.max_age_days)).strftime('%Y-%m-%d')
+    
+    def _delete_batch(self) -> int:
+        """Remove um lote de mensagens que violam a política; retorna quantas foram removidas"""
+        conn = self.db._get_connection()
+        batch_size = self.policy.batch_size
+        
+        if (self.policy.max_db_size_mb is not None and self._uncompacted
+                and self.db.get_used_size_mb() > self.policy.max_db_size_mb):
+            # Mensagens apagadas só liberam as páginas do FTS depois da compactação: mede de novo antes de apagar mais
+            self.db.optimize_search_index()
+            self._uncompacted = False
+        
+        with conn:
+            if self.policy.max_age_days is not None:
+                cursor = conn.execute('''
+                    DELETE FROM messages WHERE id IN (
+                        SELECT id FROM messages
+                        WHERE conversation_id IN (SELECT id FROM conversations WHERE date < ?)
+                        LIMIT ?
+                    )
+                ''', (self._cutoff_date(), batch_size))
+                if cursor.rowcount:
+                    return cursor.rowcount
+                
+                # Conversas vencidas no arquivo morto saem inteiras, uma por lote
+                oldest = self._oldest_archive(conn)
+                if oldest is not None and oldest[1] < self._cutoff_date():
+                    return self.db._trim_archived_conversation(conn, oldest[0])
+            
+            if self.policy.max_messages is not None:
+                total = conn.execute("SELECT row_count FROM table_counters WHERE name = 'messages'").fetchone()[0]
+                total += conn.execute("SELECT COALESCE(SUM(message_count), 0) FROM archived_conversations").fetchone()[0]
+                excess = total - self.policy.max_messages
+                if excess > 0:
+                    # O arquivo morto sai antes se a conversa dele for mais antiga que a mensagem mais antiga
+                    oldest = self._oldest_archive(conn)
+                    oldest_hot = conn.execute('''
+                        SELECT c.date FROM messages m JOIN conversations c ON c.id = m.conversation_id
+                        ORDER BY m.id LIMIT 1
+                    ''').fetchone()
+                    if oldest is not None and (oldest_hot is None or oldest[1] <= oldest_hot[0]):
+                        return self.db._trim_archived_conversation(conn, oldest[0], min(excess, batch_size))
+                    
+                    # Mais antigas primeiro (id segue a ordem de inserção, sem ordenação extra)
+                    cursor = conn.execute('''
+                        DELETE FROM messages WHERE id IN (
+                            SELECT id FROM messages ORDER BY id LIMIT ?
+                        )
+                    ''', (min(excess, batch_size),))
+                    if cursor.rowcount:
+                        return cursor.rowcount
+            
+            if self.policy.max_db_size_mb is not None:
+                if self.db.get_used_size_mb() > self.policy.max_db_size_mb:
+                    # Os blobs do arquivo morto costumam ocupar mais espaço e são os mais antigos
+                    oldest = self._oldest_archive(conn)
+                    if oldest is not None:
+                        return self.db._trim_archived_conversation(conn, oldest[0])
+                    
+                    cursor = conn.execute('''
+                        DELETE FROM messages WHERE id IN (
+                            SELECT m.id FROM messages m
+                            WHERE NOT EXISTS (SELECT 1 FROM conversations c
+                                              WHERE c.id = m.conversation_id AND c.date >= ?)
+                            ORDER BY m.id LIMIT ?
+                        )
+                    ''', (date.today().strftime('%Y-%m-%d'), batch_size))
+                    if cursor.rowcount:
+                        return cursor.rowcount
+        
+        return 0
+    
+    def _oldest_archive(self, conn: sqlite3.Connection) -> tuple:
+        """(conversation_id, data) da conversa arquivada mais antiga, ou None"""
+        return conn.execute('''
+            SELECT a.conversation_id, c.date FROM archived_conversations a
+            JOIN conversations c ON c.id = a.conversation_id
+            ORDER BY c.date ASC LIMIT 1
+        ''').fetchone()
+    
+    def _delete_expired_conversations(self) -> int:
+        """Remove conversas antigas pela idade e conversas passadas que ficaram vazias"""
+        conn = self.db._get_connection()
+        today = date.today().strftime('%Y-%m-%d')
+        deleted = 0
+        
+        with conn:
+            if self.policy.max_age_days is not None:
+                # Conversas ainda no arquivo morto ficam para os lotes (a busca precisa do texto para removê-las)
+                deleted += conn.execute('''
+                    DELETE FROM conversations
+                    WHERE date < ? AND NOT EXISTS (SELECT 1 FROM messages WHERE conversation_id = conversations.id)
+                      AND NOT EXISTS (SELECT 1 FROM archived_conversations WHERE conversation_id = conversations.id)
+                ''', (self._cutoff_date(),)).rowcount
+            
+            if self.policy.max_messages is not None or self.policy.max_db_size_mb is not None:
+                deleted += conn.execute('''
+                    DELETE FROM conversations WHERE id IN (
+                        SELECT conversation_id FROM conversation_summary
+                        WHERE message_count = 0 AND date < ?
+                    )
+                ''', (today,)).rowcount
+        
+        return deleted
+
+class VirtualGirlfriendDB(ChatStorage):
+    # PRAGMAs aplicados a cada conexão aberta pelo pool
+    DEFAULT_PRAGMAS = {
+        'busy_timeout': 5000,
+        'synchronous': 'NORMAL',        # seguro com WAL, evita fsync a cada commit
+        'mmap_size': 268435456,         # 256 MB de leitura via memory-map
+        'cache_size': -16000,           # ~16 MB de page cache por conexão
+        'temp_store': 'MEMORY',
+    }
+    
+    def __init__(self, db_path: str = "virtual_girlfriend.db", pragmas: Dict[str, Any] = None,
+                 journal_mode: str = "WAL", write_behind: bool = False):
+        self.db_path = db_path
+        self.journal_mode = journal_mode
+        self.pragmas = {**self.DEFAULT_PRAGMAS, **(pragmas or {})}
+        
+        # Pool de conexões: uma conexão persistente por thread
+        self._local = threading.local()
+        self._connections = {}  # thread ident -> (thread, conexão)
+        self._connections_lock = threading.Lock()
+        
+        # Cache em memória de dados estáticos (personalidade e configurações)
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+        self._cache_stats = {'hits': 0, 'misses': 0}
+        
+        self.init_database()
+        
+        # Fila opcional de gravação assíncrona das mensagens
+        self.write_queue = MessageWriteQueue(self) if write_behind else None
+    
+    def _get_connection(self) -> sqlite3.Connection:
+        """Retorna a conexão persistente da thread atual, criando-a se necessário"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+        
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        for pragma, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {pragma}={value}")
+        
+        current = threading.current_thread()
+        with self._connections_lock:
+            self._release_dead_connections()
+            self._connections[current.ident] = (current, conn)
+        
+        self._local.conn = conn
+        return conn
+    
+    def _release_dead_connections(self):
+        """Fecha conexões de threads que já terminaram (chamar com o lock adquirido)"""
+        for ident, (thread, conn) in list(self._connections.items()):
+            if not thread.is_alive():
+                conn.close()
+                del self._connections[ident]
+    
+    def close(self):
+        """Grava mensagens pendentes e fecha todas as conexões abertas pelo pool"""
+        if self.write_queue:
+            self.write_queue.close()
+            self.write_queue = None
+        
+        with self._connections_lock:
+            for thread, conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
+        
+        self._local = threading.local()
+    
+    def init_database(self):
+        """Inicializa o banco de dados e aplica as migrações pendentes"""
+        conn = self._get_connection()
+        
+        # Banco novo: auto_vacuum só vale se definido antes de criar as tabelas
+        if self.get_schema_version() == 0:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        
+        # WAL permite leituras da thread de resposta enquanto a UI grava (persistente no arquivo)
+        conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+        
+        self.run_migrations()
+    
+    def get_schema_version(self) -> int:
+        """Retorna a versão atual do schema (PRAGMA user_version)"""
+        conn = self._get_connection()
+        return conn.execute("PRAGMA user_version").fetchone()[0]
+    
+    def run_migrations(self) -> int:
+        """Aplica, em ordem, as migrações ainda não registradas em user_version"""
+        conn = self._get_connection()
+        
+        for version, (description, steps) in enumerate(MIGRATIONS, start=1):
+            if version <= self.get_schema_version():
+                continue
+            
+            try:
+                # BEGIN IMMEDIATE impede que outra conexão aplique a mesma migração em paralelo
+                conn.execute("BEGIN IMMEDIATE")
+                if version <= self.get_schema_version():
+                    conn.rollback()
+                    continue
+                
+                for step in steps:
+                    if callable(step):
+                        step(conn)
+                    else:
+                        conn.execute(step)
+                
+                conn.execute(f"PRAGMA user_version = {version}")
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                raise Exception(f"Erro ao aplicar migração {version} ({description}): {str(e)}")
+        
+        return self.get_schema_version()
+    
+    def find_full_scans(self) -> Dict[str, List[str]]:
+        """Retorna as consultas quentes cujo plano faz varredura completa de tabela"""
+        conn = self._get_connection()
+        
+        full_scans = {}
+        for name, sql in HOT_QUERIES.items():
+            params = (1,) * sql.count('?')
+            plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+            
+            # "SCAN tabela" sem índice percorre todas as linhas; "SCAN ... USING INDEX" é ordenado pelo índice
+            scans = [step for step in plan
+                     if step.startswith('SCAN') and 'USING' not in step]
+            temp_sorts = [step for step in plan if 'USE TEMP B-TREE' in step]
+            if scans or temp_sorts:
+                full_scans[name] = scans + temp_sorts
+        
+        return full_scans
+    
+    def _cache_get(self, key: str):
+        """Busca no cache contabilizando acertos e falhas; retorna None se ausente"""
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache_stats['hits'] += 1
+                return self._cache[key]
+            self._cache_stats['misses'] += 1
+            return None
+    
+    def _cache_set(self, key: str, value):
+        """Armazena um valor no cache"""
+        with self._cache_lock:
+            self._cache[key] = value
+    
+    def invalidate_cache(self, key: str = None):
+        """Descarta uma entrada do cache (ou todas)"""
+        with self._cache_lock:
+            if key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(key, None)
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Retorna acertos, falhas e taxa de acerto do cache"""
+        with self._cache_lock:
+            stats = dict(self._cache_stats)
+            stats['entries'] = len(self._cache)
+        total = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / total, 3) if total else 0.0
+        return stats
     
     def save_personality(self, personality_data: Dict[str, Any]) -> int:
         """Salva ou atualiza a personalidade"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._get_connection()
         cursor = conn.cursor()
         
         # Primeiro, verifica se já existe uma personalidade
@@ -108,12 +1208,22 @@ class VirtualGirlfriendDB:
             personality_id = cursor.lastrowid
         
         conn.commit()
-        conn.close()
+        self.invalidate_cache('personality')
         return personality_id
     
     def get_current_personality(self) -> Dict[str, Any]:
-        """Retorna a personalidade atual"""
-        conn = sqlite3.connect(self.db_path)
+        """Retorna a personalidade atual (do cache, após a primeira leitura)"""
+        personality = self._cache_get('personality')
+        if personality is None:
+            personality = self._load_current_personality()
+            self._cache_set('personality', personality)
+        
+        # Cópia: quem chama pode alterar o dicionário sem afetar o cache
+        return {**personality, 'traits': list(personality['traits'])}
+    
+    def _load_current_personality(self) -> Dict[str, Any]:
+        """Lê a personalidade atual do banco"""
+        conn = self._get_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -123,7 +1233,6 @@ class VirtualGirlfriendDB:
         ''')
         
         result = cursor.fetchone()
-        conn.close()
         
         if result:
             try:
@@ -142,39 +1251,31 @@ class VirtualGirlfriendDB:
             }
         else:
             # Personalidade padrão
-            return {
-                'name': 'Cortana',
-                'age': 19,
-                'traits': ['carinhosa', 'engracada', 'inteligente', 'curiosa'],
-                'hobbies': 'ler livros de romance, assistir séries, jogar Valorant, ouvir música indie',
-                'foods': 'chocolate, pizza, sorvete de morango',
-                'fears': 'filmes de terror, aranhas',
-                'dreams': 'viajar pelo mundo, ter um café próprio, escrever um livro'
-            }
+            return {**DEFAULT_PERSONALITY, 'traits': list(DEFAULT_PERSONALITY['traits'])}
     
     def get_or_create_today_conversation(self) -> int:
         """Retorna o ID da conversa de hoje, criando uma nova se necessário"""
         today = date.today().strftime('%Y-%m-%d')
         
-        conn = sqlite3.connect(self.db_path)
+        conn = self._get_connection()
         cursor = conn.cursor()
         
-        cursor.execute("SELECT id FROM conversations WHERE date = ?", (today,))
+        cursor.execute(HOT_QUERIES['conversation_by_date'], (today,))
         result = cursor.fetchone()
         
         if result:
-            conversation_id = result[0]
-        else:
-            cursor.execute("INSERT INTO conversations (date) VALUES (?)", (today,))
-            conversation_id = cursor.lastrowid
-            conn.commit()
+            return result[0]
         
-        conn.close()
-        return conversation_id
+        # INSERT OR IGNORE + índice único em date: duas threads nunca criam duas conversas no mesmo dia
+        cursor.execute("INSERT OR IGNORE INTO conversations (date) VALUES (?)", (today,))
+        conn.commit()
+        
+        cursor.execute(HOT_QUERIES['conversation_by_date'], (today,))
+        return cursor.fetchone()[0]
     
     def save_message(self, conversation_id: int, sender: str, message: str):
         """Salva uma mensagem no banco de dados"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._get_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -183,97 +1284,487 @@ class VirtualGirlfriendDB:
         ''', (conversation_id, sender, message))
         
         conn.commit()
-        conn.close()
+    
+    def save_messages(self, messages: List[tuple]):
+        """Grava um lote de (conversation_id, sender, message, timestamp) em uma única transação"""
+        conn = self._get_connection()
+        
+        with conn:
+            conn.executemany('''
+                INSERT INTO messages (conversation_id, sender, message, timestamp)
+                VALUES (?, ?, ?, ?)
+            ''', messages)
+    
+    def queue_message(self, conversation_id: int, sender: str, message: str):
+        """Enfileira a mensagem na fila write-behind (ou grava direto se ela estiver desativada)"""
+        if self.write_queue:
+            self.write_queue.put(conversation_id, sender, message)
+        else:
+            self.save_message(conversation_id, sender, message)
+    
+    def flush(self, timeout: float = None) -> bool:
+        """Garante que as mensagens enfileiradas foram gravadas"""
+        if self.write_queue:
+            return self.write_queue.flush(timeout)
+        return True
     
     def get_conversation_history(self, conversation_id: int) -> List[Dict[str, str]]:
         """Retorna o histórico de mensagens de uma conversa"""
-        conn = sqlite3.connect(self.db_path)
+        self.flush()  # leituras sempre enxergam as mensagens enfileiradas
+        conn = self._get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT sender, message, timestamp 
-            FROM messages 
-            WHERE conversation_id = ? 
-            ORDER BY timestamp ASC
-        ''', (conversation_id,))
+        cursor.execute(HOT_QUERIES['conversation_history'], (conversation_id,))
+        rows = cursor.fetchall()
+        
+        # Conversas no arquivo morto são descomprimidas de forma transparente
+        archived = self._load_archived_rows(conversation_id)
+        if archived:
+            rows = [(r[1], r[2], r[3]) for r in archived] + rows
+            rows.sort(key=lambda r: r[2] or '')
         
         messages = []
-        for row in cursor.fetchall():
+        for row in rows:
             messages.append({
                 'sender': row[0],
                 'message': row[1],
                 'timestamp': row[2]
             })
         
-        conn.close()
         return messages
     
+    def _load_archived_rows(self, conversation_id: int) -> List[list]:
+        """Retorna as mensagens arquivadas de uma conversa ([id, sender, message, timestamp]) ou None"""
+        conn = self._get_connection()
+        row = conn.execute(
+            "SELECT codec, payload FROM archived_conversations WHERE conversation_id = ?", (conversation_id,)
+        ).fetchone()
+        return _decompress_archive(row[0], row[1]) if row else None
+    
+    def archive_old_conversations(self, days: int = 90) -> Dict[str, int]:
+        """Move conversas mais antigas que `days` dias para blobs comprimidos (uma transação por conversa)"""
+        self.flush()
+        conn = self._get_connection()
+        cutoff = (date.today() - timedelta(days=days)).strftime('%Y-%m-%d')
+        
+        report = {'conversations': 0, 'messages': 0, 'raw_bytes': 0, 'compressed_bytes': 0}
+        candidates = conn.execute('''
+            SELECT c.id FROM conversations c
+            WHERE c.date < ? AND EXISTS (SELECT 1 FROM messages WHERE conversation_id = c.id)
+            ORDER BY c.date ASC
+        ''', (cutoff,)).fetchall()
+        
+        for (conv_id,) in candidates:
+            with conn:
+                rows = conn.execute('''
+                    SELECT id, sender, message, timestamp FROM messages
+                    WHERE conversation_id = ? ORDER BY timestamp ASC, id ASC
+                ''', (conv_id,)).fetchall()
+                summary = conn.execute('''
+                    SELECT message_count, last_message, last_activity
+                    FROM conversation_summary WHERE conversation_id = ?
+                ''', (conv_id,)).fetchone()
+                
+                # Uma conversa já arquivada que recebeu mensagens novas é arquivada de novo, por inteiro
+                previous = self._load_archived_rows(conv_id) or []
+                all_rows = [list(r) for r in previous] + [list(r) for r in rows]
+                
+                codec, payload, raw_bytes = _compress_archive(all_rows)
+                user_count = sum(1 for r in all_rows if r[1] == 'user')
+                ai_count = sum(1 for r in all_rows if r[1] == 'ai')
+                conn.execute('''
+                    INSERT OR REPLACE INTO archived_conversations
+                        (conversation_id, codec, payload, message_count, user_messages, ai_messages,
+                         raw_bytes, compressed_bytes)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (conv_id, codec, payload, len(all_rows), user_count, ai_count, raw_bytes, len(payload)))
+                
+                conn.execute("DELETE FROM messages WHERE conversation_id = ?", (conv_id,))
+                # Busca e estatísticas diárias seguem as mensagens para o arquivo morto
+                _index_archived_rows(conn, conv_id, rows)
+                
+                # O trigger de remoção zerou o resumo: a barra lateral continua mostrando a conversa arquivada
+                if summary:
+                    conn.execute('''
+                        UPDATE conversation_summary
+                        SET message_count = ?, last_message = ?, last_activity = ?
+                        WHERE conversation_id = ?
+                    ''', (summary[0], summary[1], summary[2], conv_id))
+            
+            report['conversations'] += 1
+            report['messages'] += len(rows)
+            report['raw_bytes'] += raw_bytes
+            report['compressed_bytes'] += len(payload)
+        
+        report['saved_bytes'] = report['raw_bytes'] - report['compressed_bytes']
+        report['pages_reclaimed'] = self.incremental_vacuum()
+        return report
+    
+    def _trim_archived_conversation(self, conn: sqlite3.Connection, conversation_id: int,
+                                    max_messages: int = None) -> int:
+        """Apaga as `max_messages` mensagens mais antigas de uma conversa arquivada (todas, se None).
+        Roda dentro da transação de quem chama; retorna quantas mensagens saíram."""
+        codec, payload = conn.execute(
+            "SELECT codec, payload FROM archived_conversations WHERE conversation_id = ?", (conversation_id,)
+        ).fetchone()
+        rows = _decompress_archive(codec, payload)
+        
+        if max_messages is None or max_messages >= len(rows):
+            _unindex_archived_rows(conn, conversation_id, rows)
+            # O trigger tira as mensagens do resumo da conversa
+            conn.execute("DELETE FROM archived_conversations WHERE conversation_id = ?", (conversation_id,))
+            return len(rows)
+        
+        removed, kept = rows[:max_messages], rows[max_messages:]
+        _unindex_archived_rows(conn, conversation_id, removed)
+        codec, payload, raw_bytes = _compress_archive(kept)
+        conn.execute('''
+            UPDATE archived_conversations
+            SET codec = ?, payload = ?, message_count = ?, user_messages = ?, ai_messages = ?,
+                raw_bytes = ?, compressed_bytes = ?
+            WHERE conversation_id = ?
+        ''', (codec, payload, len(kept), sum(1 for r in kept if r[1] == 'user'),
+              sum(1 for r in kept if r[1] == 'ai'), raw_bytes, len(payload), conversation_id))
+        conn.execute("UPDATE conversation_summary SET message_count = message_count - ? WHERE conversation_id = ?",
+                     (len(removed), conversation_id))
+        return len(removed)
+    
+    def get_archive_info(self) -> Dict[str, Any]:
+        """Resumo do arquivo morto: conversas, mensagens e espaço economizado"""
+        conn = self._get_connection()
+        row = conn.execute('''
+            SELECT COUNT(*), COALESCE(SUM(message_count), 0),
+                   COALESCE(SUM(raw_bytes), 0), COALESCE(SUM(compressed_bytes), 0)
+            FROM archived_conversations
+        ''').fetchone()
+        
+        return {
+            'conversations': row[0],
+            'messages': row[1],
+            'raw_bytes': row[2],
+            'compressed_bytes': row[3],
+            'saved_bytes': row[2] - row[3],
+            'compression_ratio': round(row[2] / row[3], 2) if row[3] else 0.0
+        }
+    
+    def search_messages(self, query: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+        """Busca textual no histórico (arquivo morto incluído), ordenada por relevância, com trecho destacado.
+        
+        Sem FTS5 a busca cai para LIKE e só enxerga as mensagens fora do arquivo morto.
+        """
+        self.flush()
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        fts_query = _build_fts_query(query)
+        if not fts_query:
+            return []
+        
+        if self._has_table('messages_fts'):
+            # Com o arquivo morto, cada índice traz os offset + limit melhores e a página sai da junção
+            search_archive = self._has_table('archived_messages_fts')
+            window = limit + offset if search_archive else limit
+            cursor.execute('''
+                SELECT m.id, m.conversation_id, c.date, m.sender, m.timestamp,
+                       snippet(messages_fts, 0, '[', ']', '…', 12), messages_fts.rank
+                FROM messages_fts
+                JOIN messages m ON m.id = messages_fts.rowid
+                LEFT JOIN conversations c ON c.id = m.conversation_id
+                WHERE messages_fts MATCH ?
+                ORDER BY messages_fts.rank
+                LIMIT ? OFFSET ?
+            ''', (fts_query, window, 0 if search_archive else offset))
+            
+            if search_archive:
+                rows = cursor.fetchall() + self._search_archive(fts_query, window)
+                rows.sort(key=lambda r: r[6])
+                return self._search_results(self._fill_archived_snippets(rows[offset:offset + limit], query))
+        else:
+            # Fallback sem FTS5: varredura com LIKE, mais recentes primeiro
+            cursor.execute('''
+                SELECT m.id, m.conversation_id, c.date, m.sender, m.timestamp, m.message, 0
+                FROM messages m
+                LEFT JOIN conversations c ON c.id = m.conversation_id
+                WHERE m.message LIKE ?
+                ORDER BY m.timestamp DESC, m.id DESC
+                LIMIT ? OFFSET ?
+            ''', (f"%{query.strip()}%", limit, offset))
+        
+        return self._search_results(cursor.fetchall())
+    
+    def _search_archive(self, fts_query: str, limit: int) -> List[list]:
+        """Melhores resultados do arquivo morto (sem trecho: o índice não guarda o texto)"""
+        conn = self._get_connection()
+        return [list(row) for row in conn.execute('''
+            SELECT a.id, a.conversation_id, c.date, a.sender, a.timestamp, NULL, archived_messages_fts.rank
+            FROM archived_messages_fts
+            JOIN archived_messages a ON a.id = archived_messages_fts.rowid
+            LEFT JOIN conversations c ON c.id = a.conversation_id
+            WHERE archived_messages_fts MATCH ?
+            ORDER BY archived_messages_fts.rank
+            LIMIT ?
+        ''', (fts_query, limit))]
+    
+    def _fill_archived_snippets(self, rows: List[list], query: str) -> List[list]:
+        """Gera os trechos dos resultados arquivados, descomprimindo só as conversas da página"""
+        wanted = [row for row in rows if row[5] is None]
+        messages = self._get_archived_messages([row[0] for row in wanted])
+        for row in wanted:
+            msg = messages.get(row[0])
+            row[5] = _archived_snippet(msg['message'], query) if msg else ''
+        return rows
+    
+    def _search_results(self, rows: List[tuple]) -> List[Dict[str, Any]]:
+        """Linhas (id, conversa, data, remetente, timestamp, trecho, rank) no formato de search_messages"""
+        results = []
+        for row in rows:
+            results.append({
+                'id': row[0],
+                'conversation_id': row[1],
+                'date': row[2],
+                'sender': row[3],
+                'timestamp': row[4],
+                'snippet': row[5],
+                'rank': row[6]
+            })
+        
+        return results
+    
+    def _has_table(self, name: str) -> bool:
+        """Verifica se uma tabela (ou tabela virtual) existe no banco"""
+        conn = self._get_connection()
+        cursor = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+        return cursor.fetchone() is not None
+    
+    def iter_messages(self, conversation_id: int = None, start_date: str = None, end_date: str = None,
+                      chunk_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """Percorre as mensagens em ordem cronológica, lendo em blocos (memória constante)"""
+        self.flush()
+        conn = self._get_connection()
+        
+        filters = []
+        params = []
+        if conversation_id is not None:
+            filters.append("id = ?")
+            params.append(conversation_id)
+        if start_date:
+            filters.append("date >= ?")
+            params.append(start_date)
+        if end_date:
+            filters.append("date <= ?")
+            params.append(end_date)
+        where = f"WHERE {' AND '.join(filters)}" if filters else ""
+        
+        # Conversa a conversa pelo índice de data, depois mensagens pelo índice (conversation_id, timestamp):
+        # evita ordenar o histórico inteiro de uma vez
+        conversations = conn.execute(
+            f"SELECT id, date FROM conversations {where} ORDER BY date ASC", params
+        ).fetchall()
+        
+        for conv_id, conv_date in conversations:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, sender, message, timestamp
+                FROM messages
+                WHERE conversation_id = ?
+                ORDER BY timestamp ASC, id ASC
+            ''', (conv_id,))
+            
+            # Arquivada: a memória fica limitada ao tamanho de uma conversa
+            archived = self._load_archived_rows(conv_id)
+            if archived:
+                merged = [tuple(r) for r in archived] + cursor.fetchall()
+                merged.sort(key=lambda r: (r[3] or '', r[0]))
+                chunks = [merged]
+            else:
+                chunks = iter(lambda: cursor.fetchmany(chunk_size), [])
+            
+            for rows in chunks:
+                for row in rows:
+                    yield {
+                        'id': row[0],
+                        'conversation_id': conv_id,
+                        'date': conv_date,
+                        'sender': row[1],
+                        'message': row[2],
+                        'timestamp': row[3]
+                    }
+    
+    def export_messages(self, output_path: str, fmt: str = None, conversation_id: int = None,
+                        start_date: str = None, end_date: str = None, compress: bool = None,
+                        ai_name: str = None) -> int:
+        """Exporta conversas em TXT, JSONL, CSV ou Markdown, gravando incrementalmente; retorna o total exportado"""
+        path_lower = output_path.lower()
+        if compress is None:
+            compress = path_lower.endswith('.gz')
+        if fmt is None:
+            base = path_lower[:-3] if path_lower.endswith('.gz') else path_lower
+            fmt = os.path.splitext(base)[1].lstrip('.') or 'txt'
+        fmt = {'markdown': 'md', 'json': 'jsonl'}.get(fmt.lower(), fmt.lower())
+        
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Formato de exportação não suportado: {fmt}")
+        
+        ai_name = ai_name or self.get_current_personality()['name']
+        messages = self.iter_messages(conversation_id, start_date, end_date)
+        
+        opener = gzip.open if compress else open
+        with opener(output_path, 'wt', encoding='utf-8', newline='') as f:
+            return EXPORT_FORMATS[fmt](f, messages, ai_name)
+    
+    def import_messages(self, source_path: str, fmt: str = None, batch_size: int = 5000) -> Dict[str, Any]:
+        """Importa mensagens de JSONL/CSV ou de outro banco, em lotes transacionais, sem duplicar"""
+        self.flush()
+        conn = self._get_connection()
+        started = time.perf_counter()
+        
+        stats = {'read': 0, 'imported': 0, 'duplicates': 0, 'invalid': 0}
+        conversation_ids = {}   # date -> id
+        known_messages = {}     # conversation_id -> {(timestamp, hash)}
+        batch = []
+        
+        def conversation_for(conv_date: str) -> int:
+            if conv_date not in conversation_ids:
+                conn.execute("INSERT OR IGNORE INTO conversations (date) VALUES (?)", (conv_date,))
+                conversation_ids[conv_date] = conn.execute(
+                    HOT_QUERIES['conversation_by_date'], (conv_date,)
+                ).fetchone()[0]
+            return conversation_ids[conv_date]
+        
+        def known_for(conv_id: int) -> set:
+            # Carregado uma vez por conversa tocada pela importação
+            if conv_id not in known_messages:
+                known_messages[conv_id] = {
+                    (row[0], _message_hash(row[1], row[2]))
+                    for row in conn.execute(
+                        "SELECT timestamp, sender, message FROM messages WHERE conversation_id = ?", (conv_id,)
+                    )
+                }
+                for row in self._load_archived_rows(conv_id) or []:
+                    known_messages[conv_id].add((row[3], _message_hash(row[1], row[2])))
+            return known_messages[conv_id]
+        
+        def write_batch():
+            if batch:
+                conn.executemany('''
+                    INSERT INTO messages (conversation_id, sender, message, timestamp)
+                    VALUES (?, ?, ?, ?)
+                ''', batch)
+                conn.commit()
+                stats['imported'] += len(batch)
+                batch.clear()
+        
+        try:
+            for row in _read_import_rows(source_path, fmt):
+                stats['read'] += 1
+                
+                sender = row.get('sender')
+                message = row.get('message')
+                if not sender or not message:
+                    stats['invalid'] += 1
+                    continue
+                
+                timestamp = row.get('timestamp') or datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+                conv_date = row.get('date') or timestamp[:10]
+                
+                conv_id = conversation_for(conv_date)
+                key = (timestamp, _message_hash(sender, message))
+                known = known_for(conv_id)
+                if key in known:
+                    stats['duplicates'] += 1
+                    continue
+                
+                known.add(key)
+                batch.append((conv_id, sender, message, timestamp))
+                if len(batch) >= batch_size:
+                    write_batch()
+            
+            write_batch()
+        except Exception:
+            conn.rollback()
+            raise
+        
+        elapsed = time.perf_counter() - started
+        stats['seconds'] = round(elapsed, 3)
+        stats['messages_per_second'] = round(stats['imported'] / elapsed) if elapsed > 0 else stats['imported']
+        return stats
+    
     def get_all_conversations(self) -> List[Dict[str, Any]]:
         """Retorna todas as conversas com preview da última mensagem"""
-        conn = sqlite3.connect(self.db_path)
+        return self.list_conversations(0, -1)  # LIMIT -1 = sem limite no SQLite
+    
+    def list_conversations(self, offset: int = 0, limit: int = 50) -> List[Dict[str, Any]]:
+        """Retorna uma página de conversas a partir da tabela de resumo (sem subconsultas)"""
+        self.flush()  # leituras sempre enxergam as mensagens enfileiradas
+        conn = self._get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT c.id, c.date, c.created_at,
-                   (SELECT message FROM messages WHERE conversation_id = c.id ORDER BY timestamp DESC LIMIT 1) as last_message
-            FROM conversations c
-            ORDER BY c.date DESC
-        ''')
+        cursor.execute(HOT_QUERIES['list_conversations'], (limit, offset))
+        
+        # Datas ISO comparadas como texto: sem parsing por linha
+        today = date.today()
+        today_str = today.strftime('%Y-%m-%d')
+        yesterday_str = date.fromordinal(today.toordinal() - 1).strftime('%Y-%m-%d')
         
         conversations = []
         for row in cursor.fetchall():
-            # Formatar data para exibição
-            try:
-                conv_date = datetime.strptime(row[1], '%Y-%m-%d').date()
-            except ValueError:
-                conv_date = date.today()
-                
-            today = date.today()
+            conv_date = row[1] or today_str
             
-            if conv_date == today:
+            if conv_date == today_str:
                 date_display = "Hoje"
-            elif conv_date == date.fromordinal(today.toordinal() - 1):
+            elif conv_date == yesterday_str:
                 date_display = "Ontem"
             else:
-                date_display = conv_date.strftime('%d/%m/%Y')
+                date_display = f"{conv_date[8:10]}/{conv_date[5:7]}/{conv_date[0:4]}"
             
             conversations.append({
                 'id': row[0],
                 'date': row[1],
                 'date_display': date_display,
                 'last_message': row[3] or "Conversa iniciada",
-                'created_at': row[2]
+                'created_at': row[2],
+                'message_count': row[4],
+                'last_activity': row[5]
             })
         
-        conn.close()
         return conversations
     
     def get_recent_messages(self, conversation_id: int, limit: int = 10) -> List[Dict[str, str]]:
         """Retorna as últimas mensagens para contexto da IA"""
-        conn = sqlite3.connect(self.db_path)
+        self.flush()  # leituras sempre enxergam as mensagens enfileiradas
+        conn = self._get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT sender, message 
-            FROM messages 
-            WHERE conversation_id = ? 
-            ORDER BY timestamp DESC 
-            LIMIT ?
-        ''', (conversation_id, limit))
+        cursor.execute(HOT_QUERIES['recent_messages'], (conversation_id, limit))
+        rows = cursor.fetchall()
+        
+        if len(rows) < limit:
+            archived = self._load_archived_rows(conversation_id)
+            if archived:
+                history = self.get_conversation_history(conversation_id)[-limit:]
+                return [{'sender': m['sender'], 'message': m['message']} for m in history]
         
         messages = []
-        for row in reversed(cursor.fetchall()):  # Reverter para ordem cronológica
+        for row in reversed(rows):  # Reverter para ordem cronológica
             messages.append({
                 'sender': row[0],
                 'message': row[1]
             })
         
-        conn.close()
         return messages
     
+    def get_message_count(self, conversation_id: int) -> int:
+        """Quantidade de mensagens da conversa (arquivadas incluídas), lida da tabela de resumo"""
+        self.flush()
+        conn = self._get_connection()
+        row = conn.execute(
+            "SELECT message_count FROM conversation_summary WHERE conversation_id = ?", (conversation_id,)
+        ).fetchone()
+        return row[0] if row else 0
+    
     def set_setting(self, key: str, value: str):
         """Define uma configuração"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._get_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -282,152 +1773,645 @@ class VirtualGirlfriendDB:
         ''', (key, value))
         
         conn.commit()
-        conn.close()
+        self.invalidate_cache('settings')
     
     def get_setting(self, key: str, default: str = None) -> str:
         """Retorna uma configuração"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        settings = self._cache_get('settings')
+        if settings is None:
+            # A tabela é pequena: carrega todas as configurações de uma vez
+            conn = self._get_connection()
+            settings = dict(conn.execute("SELECT key, value FROM settings").fetchall())
+            self._cache_set('settings', settings)
         
-        cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
-        result = cursor.fetchone()
+        return settings.get(key, default)
+    
+    def get_context_summary(self, conversation_id: int) -> Dict[str, Any]:
+        """Retorna o resumo acumulado da conversa ({'summary', 'folded_count'}) ou None"""
+        conn = self._get_connection()
+        row = conn.execute(
+            "SELECT summary, folded_count FROM context_summaries WHERE conversation_id = ?", (conversation_id,)
+        ).fetchone()
+        return {'summary': row[0], 'folded_count': row[1]} if row else None
+    
+    def save_context_summary(self, conversation_id: int, summary: str, folded_count: int):
+        """Grava o resumo acumulado e quantas mensagens ele já cobre"""
+        conn = self._get_connection()
+        conn.execute('''
+            INSERT OR REPLACE INTO context_summaries (conversation_id, summary, folded_count, updated_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        ''', (conversation_id, summary, folded_count))
+        conn.commit()
+    
+    def get_messages_after(self, message_id: int, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Mensagens com id maior que message_id, em ordem de id (para indexação incremental).
+        Mensagens já arquivadas também entram, descomprimidas."""
+        self.flush()
+        conn = self._get_connection()
+        rows = conn.execute('''
+            SELECT id, conversation_id, sender, message, timestamp FROM messages
+            WHERE id > ? ORDER BY id ASC LIMIT ?
+        ''', (message_id, limit)).fetchall()
+        messages = [{'id': r[0], 'conversation_id': r[1], 'sender': r[2], 'message': r[3], 'timestamp': r[4]}
+                    for r in rows]
+        
+        archived_ids = [r[0] for r in conn.execute(
+            "SELECT id FROM archived_messages WHERE id > ? ORDER BY id ASC LIMIT ?", (message_id, limit)
+        )]
+        if archived_ids:
+            messages += self._get_archived_messages(archived_ids).values()
+            messages.sort(key=lambda m: m['id'])
+            messages = messages[:limit]
+        return messages
+    
+    def get_messages_by_ids(self, message_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Busca mensagens pelo id (arquivadas incluídas); ids apagados simplesmente não aparecem"""
+        conn = self._get_connection()
+        found = {}
+        ids = list(message_ids)
+        for start in range(0, len(ids), 500):  # abaixo do limite de parâmetros do SQLite
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for r in conn.execute(f'''
+                SELECT id, conversation_id, sender, message, timestamp FROM messages
+                WHERE id IN ({placeholders})
+            ''', chunk):
+                found[r[0]] = {'id': r[0], 'conversation_id': r[1], 'sender': r[2], 'message': r[3], 'timestamp': r[4]}
+        
+        missing = [message_id for message_id in ids if message_id not in found]
+        if missing:
+            found.update(self._get_archived_messages(missing))
+        return found
+    
+    def _get_archived_messages(self, message_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Mensagens do arquivo morto pelo id, descomprimindo só as conversas envolvidas"""
+        conn = self._get_connection()
+        wanted = {}  # conversation_id -> ids
+        ids = list(message_ids)
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for message_id, conv_id in conn.execute(
+                f"SELECT id, conversation_id FROM archived_messages WHERE id IN ({placeholders})", chunk
+            ):
+                wanted.setdefault(conv_id, set()).add(message_id)
         
-        conn.close()
-        return result[0] if result else default
+        found = {}
+        for conv_id, conv_ids in wanted.items():
+            for message_id, sender, message, timestamp in self._load_archived_rows(conv_id) or []:
+                if message_id in conv_ids:
+                    found[message_id] = {'id': message_id, 'conversation_id': conv_id, 'sender': sender,
+                                         'message': message, 'timestamp': timestamp}
+        return found
+    
+    def get_cached_response(self, key: str, max_age_seconds: float) -> str:
+        """Retorna a resposta em cache para a chave, se ainda estiver dentro do prazo"""
+        conn = self._get_connection()
+        row = conn.execute(
+            "SELECT response FROM response_cache WHERE key = ? AND created_at >= ?",
+            (key, time.time() - max_age_seconds)
+        ).fetchone()
+        return row[0] if row else None
+    
+    def save_cached_response(self, key: str, response: str):
+        """Grava (ou renova) uma resposta no cache persistente"""
+        conn = self._get_connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO response_cache (key, response, created_at) VALUES (?, ?, ?)",
+            (key, response, time.time())
+        )
+        conn.commit()
+    
+    def prune_response_cache(self, max_age_seconds: float, max_entries: int = None) -> int:
+        """Remove respostas expiradas e, se preciso, as mais antigas além de max_entries"""
+        conn = self._get_connection()
+        with conn:
+            removed = conn.execute(
+                "DELETE FROM response_cache WHERE created_at < ?", (time.time() - max_age_seconds,)
+            ).rowcount
+            if max_entries is not None:
+                removed += conn.execute('''
+                    DELETE FROM response_cache WHERE key IN (
+                        SELECT key FROM response_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                    )
+                ''', (max_entries,)).rowcount
+        return removed
     
     def delete_conversation(self, conversation_id: int):
         """Deleta uma conversa e todas suas mensagens"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._get_connection()
         cursor = conn.cursor()
         
-        cursor.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
+        # O índice de busca do arquivo morto não guarda o texto: a remoção precisa dele descomprimido
+        archived = self._load_archived_rows(conversation_id)
+        if archived:
+            _unindex_archived_rows(conn, conversation_id, archived)
+        
+        # Conversa primeiro: o trigger de resumo das mensagens não tem mais linha para recalcular
         cursor.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
+        cursor.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
         
         conn.commit()
-        conn.close()
     
     def get_conversation_stats(self) -> Dict[str, int]:
-        """Retorna estatísticas das conversas"""
-        conn = sqlite3.connect(self.db_path)
+        """Retorna estatísticas das conversas (contadores mantidos por triggers, uma única consulta)"""
+        self.flush()
+        conn = self._get_connection()
         cursor = conn.cursor()
         
-        # Total de conversas
-        cursor.execute("SELECT COUNT(*) FROM conversations")
-        total_conversations = cursor.fetchone()[0]
-        
-        # Total de mensagens
-        cursor.execute("SELECT COUNT(*) FROM messages")
-        total_messages = cursor.fetchone()[0]
-        
-        # Mensagens do usuário
-        cursor.execute("SELECT COUNT(*) FROM messages WHERE sender = 'user'")
-        user_messages = cursor.fetchone()[0]
-        
-        # Mensagens da IA
-        cursor.execute("SELECT COUNT(*) FROM messages WHERE sender = 'ai'")
-        ai_messages = cursor.fetchone()[0]
+        cursor.execute('''
+            SELECT
+                (SELECT row_count FROM table_counters WHERE name = 'conversations'),
+                (SELECT row_count FROM table_counters WHERE name = 'messages'),
+                COALESCE(SUM(CASE WHEN sender = 'user' THEN message_count END), 0),
+                COALESCE(SUM(CASE WHEN sender = 'ai' THEN message_count END), 0),
+                COUNT(DISTINCT CASE WHEN message_count > 0 THEN day END)
+            FROM message_stats
+        ''')
+        row = cursor.fetchone()
         
-        conn.close()
+        # table_counters só conta a tabela messages; message_stats já inclui o arquivo morto
+        cursor.execute("SELECT COALESCE(SUM(message_count), 0) FROM archived_conversations")
+        archived = cursor.fetchone()[0]
         
         return {
-            'total_conversations': total_conversations,
-            'total_messages': total_messages,
-            'user_messages': user_messages,
-            'ai_messages': ai_messages
+            'total_conversations': row[0] or 0,
+            'total_messages': (row[1] or 0) + archived,
+            'user_messages': row[2],
+            'ai_messages': row[3],
+            'active_days': row[4]
         }
     
-    def cleanup_old_conversations(self, days_to_keep: int = 30):
-        """Remove conversas antigas além do período especificado"""
-        conn = sqlite3.connect(self.db_path)
+    def get_message_histogram(self, days: int = 30) -> List[Dict[str, Any]]:
+        """Mensagens por dia e por remetente nos últimos `days` dias"""
+        self.flush()
+        conn = self._get_connection()
         cursor = conn.cursor()
         
-        cutoff_date = date.today() - datetime.timedelta(days=days_to_keep)
-        cutoff_str = cutoff_date.strftime('%Y-%m-%d')
+        start_day = (datetime.now(timezone.utc).date() - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+        cursor.execute('''
+            SELECT day,
+                   SUM(CASE WHEN sender = 'user' THEN message_count ELSE 0 END),
+                   SUM(CASE WHEN sender = 'ai' THEN message_count ELSE 0 END),
+                   SUM(message_count)
+            FROM message_stats
+            WHERE day >= ?
+            GROUP BY day
+            HAVING SUM(message_count) > 0
+            ORDER BY day ASC
+        ''', (start_day,))
         
-        # Buscar IDs das conversas antigas
-        cursor.execute("SELECT id FROM conversations WHERE date < ?", (cutoff_str,))
-        old_conversations = cursor.fetchall()
+        histogram = []
+        for row in cursor.fetchall():
+            histogram.append({
+                'day': row[0],
+                'user': row[1],
+                'ai': row[2],
+                'total': row[3]
+            })
         
-        # Deletar mensagens das conversas antigas
-        for conv_id in old_conversations:
-            cursor.execute("DELETE FROM messages WHERE conversation_id = ?", (conv_id[0],))
+        return histogram
+    
+    def cleanup_old_conversations(self, days_to_keep: int = 30):
+        """Remove conversas antigas além do período especificado"""
+        stats = RetentionEngine(self, RetentionPolicy(max_age_days=days_to_keep)).run()
+        return stats['conversations_deleted']
+    
+    def apply_retention(self, policy: RetentionPolicy, max_batches: int = None) -> Dict[str, int]:
+        """Aplica uma política de retenção (idade, total de mensagens, tamanho do banco)"""
+        return RetentionEngine(self, policy).run(max_batches)
+    
+    def optimize_search_index(self):
+        """Compacta os índices FTS5: remoções ficam como marcas até os segmentos serem fundidos"""
+        conn = self._get_connection()
+        with conn:
+            for table in ('messages_fts', 'archived_messages_fts'):
+                if self._has_table(table):
+                    conn.execute(f"INSERT INTO {table} ({table}) VALUES ('optimize')")
+    
+    def get_used_size_mb(self) -> float:
+        """Tamanho ocupado por dados (desconsidera páginas livres)"""
+        conn = self._get_connection()
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        freelist_count = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        return (page_count - freelist_count) * page_size / (1024 * 1024)
+    
+    def incremental_vacuum(self, pages_per_step: int = 256) -> int:
+        """Devolve ao sistema as páginas livres, em passos curtos; retorna quantas foram liberadas"""
+        conn = self._get_connection()
         
-        # Deletar conversas antigas
-        cursor.execute("DELETE FROM conversations WHERE date < ?", (cutoff_str,))
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            # Bancos antigos: converter exige um VACUUM completo (só acontece uma vez)
+            if conn.execute("PRAGMA freelist_count").fetchone()[0] == 0:
+                return 0
+            freed = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            return freed
         
-        conn.commit()
-        conn.close()
+        initial_free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        free_pages = initial_free
+        while free_pages > 0:
+            conn.execute(f"PRAGMA incremental_vacuum({min(free_pages, pages_per_step)})").fetchall()
+            remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if remaining >= free_pages:
+                break  # nada pôde ser liberado agora (ex.: transação aberta em outra conexão)
+            free_pages = remaining
         
-        return len(old_conversations)
+        return initial_free - free_pages
     
-    def backup_database(self, backup_path: str = None):
-        """Cria backup do banco de dados"""
+    def backup_database(self, backup_path: str = None, pages: int = 256, sleep: float = 0.005,
+                        progress: Callable[[int, int], None] = None, compress: bool = False):
+        """Cria backup do banco de dados online, copiando em passos de `pages` páginas"""
         if backup_path is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             backup_path = f"backup_virtual_girlfriend_{timestamp}.db"
         
         try:
-            # Conectar ao banco original
-            source = sqlite3.connect(self.db_path)
+            self.flush()
             
-            # Criar backup
-            backup = sqlite3.connect(backup_path)
-            source.backup(backup)
+            # Usar a conexão persistente da thread atual como origem
+            source = self._get_connection()
             
-            backup.close()
-            source.close()
+            # Comprimido: copia primeiro para um arquivo temporário ao lado do destino
+            target_path = backup_path
+            if compress:
+                if not backup_path.endswith('.gz'):
+                    backup_path += '.gz'
+                fd, target_path = tempfile.mkstemp(suffix='.db', dir=os.path.dirname(os.path.abspath(backup_path)))
+                os.close(fd)
+            
+            # Criar backup; entre os passos o lock é liberado e os escritores seguem normalmente
+            backup = sqlite3.connect(target_path)
+            try:
+                source.backup(backup, pages=pages, sleep=sleep, progress=_backup_progress(progress))
+            finally:
+                backup.close()
+            
+            if compress:
+                with open(target_path, 'rb') as raw, gzip.open(backup_path, 'wb') as packed:
+                    shutil.copyfileobj(raw, packed, 1024 * 1024)
+                os.remove(target_path)
             
             return backup_path
         except Exception as e:
             raise Exception(f"Erro ao criar backup: {str(e)}")
     
-    def restore_from_backup(self, backup_path: str):
-        """Restaura banco de dados de um backup"""
+    def backup_database_async(self, backup_path: str = None, on_done: Callable[[str, Exception], None] = None,
+                              **backup_options) -> threading.Thread:
+        """Executa backup_database em uma thread, chamando on_done(caminho, erro) ao terminar"""
+        def run():
+            try:
+                path = self.backup_database(backup_path, **backup_options)
+                error = None
+            except Exception as e:
+                path, error = None, e
+            if on_done:
+                on_done(path, error)
+        
+        thread = threading.Thread(target=run, name="db-backup", daemon=True)
+        thread.start()
+        return thread
+    
+    def restore_from_backup(self, backup_path: str, pages: int = 256,
+                            progress: Callable[[int, int], None] = None):
+        """Restaura banco de dados de um backup (aceita backups .gz)"""
         if not os.path.exists(backup_path):
             raise FileNotFoundError(f"Arquivo de backup não encontrado: {backup_path}")
         
+        unpacked_path = None
         try:
+            # Mensagens ainda na fila são gravadas antes (e entram no backup de segurança)
+            self.flush()
+            
             # Fazer backup do arquivo atual
             current_backup = self.backup_database(f"current_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db")
             
+            if backup_path.endswith('.gz'):
+                fd, unpacked_path = tempfile.mkstemp(suffix='.db')
+                with os.fdopen(fd, 'wb') as raw, gzip.open(backup_path, 'rb') as packed:
+                    shutil.copyfileobj(packed, raw, 1024 * 1024)
+                backup_path = unpacked_path
+            
             # Conectar ao backup
             backup = sqlite3.connect(backup_path)
             
-            # Conectar ao banco atual
-            current = sqlite3.connect(self.db_path)
+            # Conexão persistente com o banco atual
+            current = self._get_connection()
             
             # Restaurar
-            backup.backup(current)
+            try:
+                backup.backup(current, pages=pages, progress=_backup_progress(progress))
+            finally:
+                backup.close()
             
-            current.close()
-            backup.close()
+            # Backups de versões anteriores voltam com user_version antigo: atualiza o schema
+            current.execute(f"PRAGMA journal_mode={self.journal_mode}")
+            self.run_migrations()
+            self.invalidate_cache()
             
             return current_backup
         except Exception as e:
             raise Exception(f"Erro ao restaurar backup: {str(e)}")
+        finally:
+            if unpacked_path and os.path.exists(unpacked_path):
+                os.remove(unpacked_path)
     
     def get_database_info(self) -> Dict[str, Any]:
         """Retorna informações sobre o banco de dados"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._get_connection()
         cursor = conn.cursor()
         
-        # Tamanho do arquivo
-        file_size = os.path.getsize(self.db_path) / (1024 * 1024)  # MB
+        # Tamanho do arquivo (inclui o WAL ainda não aplicado ao arquivo principal)
+        file_size = os.path.getsize(self.db_path)
+        if os.path.exists(f"{self.db_path}-wal"):
+            file_size += os.path.getsize(f"{self.db_path}-wal")
+        file_size /= (1024 * 1024)  # MB
         
-        # Informações das tabelas
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = [row[0] for row in cursor.fetchall()]
+        # Tabelas grandes vêm dos contadores; as demais são pequenas e contadas diretamente
+        cursor.execute("SELECT name, row_count FROM table_counters")
+        table_info = dict(cursor.fetchall())
         
-        table_info = {}
-        for table in tables:
-            cursor.execute(f"SELECT COUNT(*) FROM {table}")
-            table_info[table] = cursor.fetchone()[0]
-        
-        conn.close()
+        cursor.execute('''
+            SELECT name FROM sqlite_master
+            WHERE type = 'table' AND name NOT LIKE 'sqlite_%'
+              AND name NOT LIKE 'messages_fts%' AND sql NOT LIKE 'CREATE VIRTUAL%'
+        ''')
+        for (table,) in cursor.fetchall():
+            if table not in table_info:
+                cursor.execute(f'SELECT COUNT(*) FROM "{table}"')
+                table_info[table] = cursor.fetchone()[0]
         
         return {
             'file_path': self.db_path,
             'file_size_mb': round(file_size, 2),
             'tables': table_info,
             'last_modified': datetime.fromtimestamp(os.path.getmtime(self.db_path))
-        }
\ No newline at end of file
+        }
+
+class ProfileDatabaseManager:
+    """Um arquivo SQLite por perfil, aberto sob demanda e mantido em um LRU de bancos abertos.
+    
+    Cada perfil tem seu próprio arquivo (e portanto seu próprio WAL, cache e locks), então o
+    histórico pesado de um usuário nunca disputa com as consultas de outro. Métodos do
+    VirtualGirlfriendDB podem ser chamados diretamente passando o perfil como primeiro
+    argumento, por exemplo manager.save_message('ana', conversation_id, 'user', 'oi').
+    
+    Quem guarda um banco (get/acquire) o mantém "preso" até chamar release(); o LRU só fecha
+    bancos soltos. Um banco preso que sai do LRU (close_profile/close_all) é fechado no último release.
+    """
+    
+    PROFILE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+    
+    def __init__(self, base_dir: str = "profiles", max_open: int = 8, **db_options):
+        self.base_dir = base_dir
+        self.max_open = max_open
+        self.db_options = db_options
+        self._open = OrderedDict()  # profile_id -> VirtualGirlfriendDB (mais recente no fim)
+        self._pins = {}             # profile_id -> quantidade de usuários segurando o banco
+        self._retired = {}          # profile_id -> banco fora do LRU esperando o último release
+        self._lock = threading.Lock()
+    
+    def profile_path(self, profile_id: str) -> str:
+        """Caminho do arquivo de banco de um perfil"""
+        if not self.PROFILE_ID_PATTERN.match(profile_id or ''):
+            raise ValueError(f"Identificador de perfil inválido: {profile_id!r}")
+        return os.path.join(self.base_dir, f"{profile_id}.db")
+    
+    def acquire(self, profile_id: str) -> 'VirtualGirlfriendDB':
+        """Retorna o banco do perfil preso ao chamador (abrindo-o se necessário); devolva com release()"""
+        path = self.profile_path(profile_id)
+        evicted = None
+        
+        with self._lock:
+            db = self._open.get(profile_id) or self._retired.pop(profile_id, None)
+            if db is None:
+                os.makedirs(self.base_dir, exist_ok=True)
+                db = VirtualGirlfriendDB(path, **self.db_options)
+            self._open[profile_id] = db
+            self._open.move_to_end(profile_id)
+            self._pins[profile_id] = self._pins.get(profile_id, 0) + 1
+            
+            if len(self._open) > self.max_open:
+                # Fecha o menos usado entre os soltos; com todos em uso, o LRU fica acima do limite
+                idle = next((pid for pid in self._open if not self._pins.get(pid)), None)
+                if idle is not None:
+                    evicted = self._open.pop(idle)
+        
+        # Fechar fora do lock: pode esperar a fila de escrita do perfil removido
+        if evicted is not None:
+            evicted.close()
+        return db
+    
+    def get(self, profile_id: str) -> 'VirtualGirlfriendDB':
+        """Banco do perfil para uso prolongado (ex.: a sessão do app): fica preso até release()"""
+        return self.acquire(profile_id)
+    
+    def release(self, profile_id: str):
+        """Solta um banco obtido com get/acquire; fecha-o se já saiu do LRU e ninguém mais o usa"""
+        to_close = None
+        with self._lock:
+            pins = self._pins.get(profile_id, 0) - 1
+            if pins > 0:
+                self._pins[profile_id] = pins
+                return
+            self._pins.pop(profile_id, None)
+            to_close = self._retired.pop(profile_id, None)
+            if to_close is None and len(self._open) > self.max_open:
+                to_close = self._open.pop(profile_id, None)  # LRU estava acima do limite por bancos em uso
+        if to_close is not None:
+            to_close.close()
+    
+    @contextmanager
+    def profile(self, profile_id: str):
+        """with manager.profile('ana') as db: ... (preso só durante o bloco)"""
+        db = self.acquire(profile_id)
+        try:
+            yield db
+        finally:
+            self.release(profile_id)
+    
+    def list_profiles(self) -> List[str]:
+        """Perfis com banco existente em disco"""
+        if not os.path.isdir(self.base_dir):
+            return []
+        return sorted(name[:-3] for name in os.listdir(self.base_dir)
+                      if name.endswith('.db') and self.PROFILE_ID_PATTERN.match(name[:-3]))
+    
+    def open_profiles(self) -> List[str]:
+        """Perfis com banco aberto no momento, do menos para o mais recente"""
+        with self._lock:
+            return list(self._open)
+    
+    def _detach(self, profile_id: str) -> 'VirtualGirlfriendDB':
+        """Tira o perfil do LRU (chamar com o lock); retorna o banco se ele pode ser fechado agora"""
+        db = self._open.pop(profile_id, None)
+        if db is not None and self._pins.get(profile_id):
+            self._retired[profile_id] = db  # ainda em uso: fecha no último release
+            return None
+        return db
+    
+    def close_profile(self, profile_id: str):
+        """Fecha o banco de um perfil (se aberto; se estiver em uso, quando for solto)"""
+        with self._lock:
+            db = self._detach(profile_id)
+        if db is not None:
+            db.close()
+    
+    def close_all(self):
+        """Fecha todos os bancos abertos (os que estiverem em uso, quando forem soltos)"""
+        with self._lock:
+            open_dbs = [self._detach(profile_id) for profile_id in list(self._open)]
+        for db in open_dbs:
+            if db is not None:
+                db.close()
+    
+    def __getattr__(self, name: str):
+        # Encaminha métodos públicos do VirtualGirlfriendDB recebendo o profile_id como primeiro argumento
+        if name.startswith('_') or not callable(getattr(VirtualGirlfriendDB, name, None)):
+            raise AttributeError(name)
+        
+        def call(profile_id: str, *args, **kwargs):
+            with self.profile(profile_id) as db:
+                return getattr(db, name)(*args, **kwargs)
+        
+        call.__name__ = name
+        return call
+
+# ---------------------------------------------------------------------------
+# Benchmark: busca textual (FTS5) com até 1M de mensagens
+# ---------------------------------------------------------------------------
+
+# Palavras comuns das conversas; o resto do vocabulário é sintético e cada vez mais raro
+_BENCHMARK_WORDS = ['oi', 'amor', 'hoje', 'dia', 'trabalho', 'saudade', 'filme', 'comida', 'dormir',
+                    'cansado', 'feliz', 'música', 'viagem', 'praia', 'cinema', 'jantar', 'sonho', 'gato']
+
+def _benchmark_vocabulary(size: int, rng: random.Random) -> List[str]:
+    syllables = ['ba', 'ca', 'da', 'fe', 'go', 'la', 'mi', 'no', 'pa', 'ri', 'sa', 'tu', 've', 'zo']
+    vocabulary = list(_BENCHMARK_WORDS)
+    seen = set(vocabulary)
+    while len(vocabulary) < size:
+        word = "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            vocabulary.append(word)
+    return vocabulary
+
+def benchmark_search(messages: int = 1_000_000, queries: int = 50, vocabulary_size: int = 20_000,
+                     batch_size: int = 50_000, db_path: str = None) -> Dict[str, Any]:
+    """Popula um banco temporário com `messages` mensagens sintéticas e mede search_messages.
+    
+    As palavras seguem uma distribuição de Zipf (poucas muito frequentes, muitas raras), então as
+    consultas cobrem termos seletivos, termos comuns, dois termos e prefixo.
+    """
+    rng = random.Random(42)
+    vocabulary = _benchmark_vocabulary(vocabulary_size, rng)
+    cum_weights = []
+    total = 0.0
+    for rank in range(1, len(vocabulary) + 1):
+        total += 1.0 / rank
+        cum_weights.append(total)
+    
+    temp_dir = None
+    if db_path is None:
+        temp_dir = tempfile.mkdtemp(prefix="search_bench_")
+        db_path = os.path.join(temp_dir, "bench.db")
+    db = VirtualGirlfriendDB(db_path)
+    results = {'messages': messages}
+    
+    try:
+        conn = db._get_connection()
+        per_conversation = 200
+        conversations = (messages + per_conversation - 1) // per_conversation
+        first_day = date(2020, 1, 1)
+        
+        started = time.perf_counter()
+        conn.executemany("INSERT INTO conversations (date) VALUES (?)",
+                         (((first_day + timedelta(days=i)).isoformat(),) for i in range(conversations)))
+        first_id = conn.execute("SELECT MIN(id) FROM conversations").fetchone()[0]
+        for start in range(0, messages, batch_size):
+            rows = []
+            for i in range(start, min(start + batch_size, messages)):
+                words = rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(4, 16))
+                rows.append((first_id + i // per_conversation, 'user' if i % 2 else 'ai', " ".join(words)))
+            conn.executemany("INSERT INTO messages (conversation_id, sender, message) VALUES (?, ?, ?)", rows)
+            conn.commit()
+        results['seed_s'] = time.perf_counter() - started
+        results['fts5'] = db._has_table('messages_fts')
+        
+        cases = {
+            'termo_raro': [vocabulary[rng.randrange(vocabulary_size // 2, vocabulary_size)] for _ in range(queries)],
+            'termo_medio': [vocabulary[rng.randrange(100, 1000)] for _ in range(queries)],
+            'termo_comum': [vocabulary[rng.randrange(0, 10)] for _ in range(queries)],
+            'dois_termos': [f"{vocabulary[rng.randrange(0, 100)]} {vocabulary[rng.randrange(100, 2000)]}"
+                            for _ in range(queries)],
+            'prefixo': [vocabulary[rng.randrange(100, 1000)][:3] for _ in range(queries)],
+        }
+        db.search_messages(cases['termo_medio'][0])  # aquece o cache de páginas
+        for case, terms in cases.items():
+            started = time.perf_counter()
+            for term in terms:
+                db.search_messages(term, limit=20)
+            results[f'{case}_ms'] = (time.perf_counter() - started) * 1000 / len(terms)
+    finally:
+        db.close()
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    return {name: round(value, 3) if isinstance(value, float) else value for name, value in results.items()}
+
+def main(argv: List[str] = None):
+    """Linha de comando para manutenção do banco de dados"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Ferramentas do banco de dados da Virtual Girlfriend AI")
+    parser.add_argument('--db', default="virtual_girlfriend.db", help="caminho do banco de dados")
+    parser.add_argument('--profile', help="usa o banco do perfil em profiles/<perfil>.db")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    import_parser = subparsers.add_parser('import', help="importa mensagens de JSONL, CSV ou outro banco SQLite")
+    import_parser.add_argument('source', help="arquivo de origem (.jsonl, .csv, .db, opcionalmente .gz)")
+    import_parser.add_argument('--format', dest='fmt', choices=['jsonl', 'csv', 'db'], help="força o formato de entrada")
+    import_parser.add_argument('--batch-size', type=int, default=5000, help="mensagens por transação")
+    
+    backup_parser = subparsers.add_parser('backup', help="cria um backup online do banco")
+    backup_parser.add_argument('--dir', default="backups", help="diretório dos backups")
+    backup_parser.add_argument('--keep', type=int, default=7, help="quantidade de backups mantidos")
+    backup_parser.add_argument('--max-age-days', type=int, help="remove backups mais antigos que isso")
+    backup_parser.add_argument('--no-compress', action='store_true', help="não comprimir com gzip")
+    
+    bench_parser = subparsers.add_parser('benchmark-search', help="mede a busca textual em um banco sintético")
+    bench_parser.add_argument('--messages', type=int, default=1_000_000, help="mensagens sintéticas geradas")
+    bench_parser.add_argument('--queries', type=int, default=50, help="consultas por cenário")
+    
+    args = parser.parse_args(argv)
+    if args.command == 'benchmark-search':
+        for name, value in benchmark_search(args.messages, args.queries).items():
+            print(f"  {name}: {value}")
+        return
+    
+    db_path = ProfileDatabaseManager().profile_path(args.profile) if args.profile else args.db
+    if args.profile:
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    db = VirtualGirlfriendDB(db_path)
+    
+    try:
+        if args.command == 'import':
+            stats = db.import_messages(args.source, args.fmt, args.batch_size)
+            print(f"✅ {stats['imported']} mensagens importadas de {stats['read']} lidas "
+                  f"({stats['duplicates']} duplicadas, {stats['invalid']} inválidas) "
+                  f"em {stats['seconds']}s - {stats['messages_per_second']} msg/s")
+        elif args.command == 'backup':
+            def show_progress(copied: int, total: int):
+                print(f"\r💾 {copied}/{total} páginas", end='', flush=True)
+            
+            scheduler = BackupScheduler(db, args.dir, keep=args.keep, max_age_days=args.max_age_days,
+                                        compress=not args.no_compress, progress=show_progress)
+            path = scheduler.run_backup()
+            print(f"\n✅ Backup criado: {path}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
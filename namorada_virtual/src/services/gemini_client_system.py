@@ -0,0 +1,426 @@
+import random
+import threading
+import time
+from typing import Callable, Dict, Any, Iterator, List
+
+# Nomes das exceções da API (google.api_core) que indicam limite de requisições
+RATE_LIMIT_ERRORS = {'ResourceExhausted', 'TooManyRequests'}
+
+# Falhas passageiras que valem uma nova tentativa
+TRANSIENT_ERRORS = RATE_LIMIT_ERRORS | {'ServiceUnavailable', 'InternalServerError', 'DeadlineExceeded',
+                                        'GatewayTimeout', 'ConnectionError', 'TimeoutError',
+                                        'Timeout', 'ReadTimeout', 'ConnectTimeout'}
+
+# Menor timeout usado numa tentativa; uma nova tentativa só começa se couber no prazo total
+MIN_REQUEST_TIMEOUT = 1.0
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True para erros 429 (cota ou limite de requisições estourado), pelo tipo ou pelo status HTTP"""
+    return type(error).__name__ in RATE_LIMIT_ERRORS or getattr(error, 'code', None) == 429
+
+def is_transient_error(error: Exception) -> bool:
+    """True para erros que podem passar sozinhos (429, 5xx, timeouts, conexão)"""
+    if is_rate_limit_error(error) or isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    code = getattr(error, 'code', None)
+    return type(error).__name__ in TRANSIENT_ERRORS or (isinstance(code, int) and code >= 500)
+
+class CircuitOpenError(RuntimeError):
+    """O circuito está aberto: a API falhou demais e as chamadas estão suspensas por um tempo"""
+
+class RateLimitedError(RuntimeError):
+    """Não havia vaga no limite de requisições dentro do tempo de espera permitido"""
+
+class TokenBucket:
+    """Limitador de taxa: `rate` fichas por segundo, acumulando no máximo `capacity` (rajada)"""
+    
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+    
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def try_acquire(self) -> float:
+        """Consome uma ficha se houver; senão retorna quantos segundos faltam para a próxima (0 = conseguiu)"""
+        with self._lock:
+            self._refill(self.clock())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+    
+    def acquire(self, timeout: float = None) -> bool:
+        """Espera por uma ficha; False se ela não viria dentro de `timeout` segundos"""
+        deadline = None if timeout is None else self.clock() + timeout
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return True
+            if deadline is not None and self.clock() + wait > deadline:
+                return False
+            self.sleep(wait)
+
+class CircuitBreaker:
+    """Disjuntor: depois de `failure_threshold` falhas seguidas abre por `reset_timeout` segundos.
+    
+    Aberto, recusa chamadas na hora; passado o tempo, deixa uma chamada de teste passar (meio-aberto):
+    se ela der certo o circuito fecha, se falhar abre de novo.
+    """
+    
+    CLOSED, OPEN, HALF_OPEN = 'fechado', 'aberto', 'meio-aberto'
+    
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+    
+    def _state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+    
+    def allow(self) -> bool:
+        """True se a chamada pode seguir (no meio-aberto, só uma por vez)"""
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+    
+    def release(self):
+        """Libera a chamada de teste sem registrar resultado (ela nem chegou à API)"""
+        with self._lock:
+            self._trial_running = False
+    
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self._trial_running = False
+
+class _InFlight:
+    """Chamada em andamento, compartilhada por quem pedir o mesmo prompt"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class GeminiClient:
+    """Cliente do modelo com limite de taxa, novas tentativas, disjuntor e deduplicação.
+    
+    - Cada tentativa consome uma ficha do TokenBucket (o plano gratuito do Gemini aceita ~15 por minuto).
+      Se a ficha não vier a tempo, RateLimitedError sobe sem contar como falha da API.
+    - Cada requisição tem timeout próprio (`request_timeout`, via request_options) e, com
+      `call_timeout`, novas tentativas só acontecem enquanto couberem nesse prazo total.
+    - Erros passageiros (429, 5xx, timeouts) são repetidos com backoff exponencial e jitter completo;
+      os demais sobem na hora.
+    - Uma chamada que esgota as tentativas conta como falha no CircuitBreaker; com o circuito aberto,
+      `generate`/`stream` levantam CircuitOpenError sem chamar a API.
+    - Prompts idênticos em andamento ao mesmo tempo fazem uma única chamada (só em `generate`).
+    
+    `model` é qualquer objeto com generate_content(prompt, generation_config=..., stream=..., request_options=...),
+    como genai.GenerativeModel ou o FakeModel abaixo; `clock`, `sleep` e `rng` podem ser trocados
+    para simular o tempo.
+    """
+    
+    def __init__(self, model, generation_config=None, requests_per_minute: float = 15, burst: int = 3,
+                 max_retries: int = 3, base_delay: float = 1.0, max_delay: float = 8.0,
+                 max_wait: float = 10.0, failure_threshold: int = 3, reset_timeout: float = 60,
+                 request_timeout: float = 20.0, call_timeout: float = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep,
+                 rng: random.Random = None):
+        self.model = model
+        self.generation_config = generation_config
+        self.request_timeout = request_timeout
+        self.call_timeout = call_timeout
+        self.clock = clock
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_wait = max_wait
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        
+        self.bucket = TokenBucket(requests_per_minute / 60.0, burst, clock, sleep)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout, clock)
+        
+        self._in_flight = {}  # prompt -> _InFlight
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'retries': 0, 'rate_limited': 0, 'throttled': 0, 'deduplicated': 0,
+                      'failures': 0, 'circuit_rejections': 0}
+    
+    @property
+    def circuit_open(self) -> bool:
+        """True enquanto o disjuntor recusa chamadas (não consome a chamada de teste)"""
+        return self.breaker.state == CircuitBreaker.OPEN
+    
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+    
+    def backoff_delay(self, attempt: int) -> float:
+        """Espera antes da tentativa `attempt` (1, 2, ...): jitter completo sobre base * 2^(attempt-1)"""
+        return self.rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+    
+    def _call(self, prompt: str, stream: bool):
+        """Chama o modelo respeitando limite de taxa, novas tentativas e disjuntor"""
+        if not self.breaker.allow():
+            self._count('circuit_rejections')
+            raise CircuitOpenError("API suspensa após falhas seguidas")
+        
+        deadline = None if self.call_timeout is None else self.clock() + self.call_timeout
+        attempt = 0
+        while True:
+            remaining = None if deadline is None else deadline - self.clock()
+            if not self.bucket.acquire(self.max_wait if remaining is None else min(self.max_wait, remaining)):
+                # Limite local, não falha da API: não conta no disjuntor
+                self._count('throttled')
+                self.breaker.release()
+                raise RateLimitedError("Limite de requisições por minuto atingido")
+            
+            timeout = self.request_timeout
+            if deadline is not None:
+                timeout = max(MIN_REQUEST_TIMEOUT, min(timeout, deadline - self.clock()))
+            
+            try:
+                self._count('calls')
+                response = self.model.generate_content(prompt, generation_config=self.generation_config,
+                                                       stream=stream, request_options={'timeout': timeout})
+            except Exception as e:
+                if is_rate_limit_error(e):
+                    self._count('rate_limited')
+                if is_transient_error(e) and attempt < self.max_retries:
+                    delay = self.backoff_delay(attempt + 1)
+                    if deadline is None or self.clock() + delay + MIN_REQUEST_TIMEOUT <= deadline:
+                        attempt += 1
+                        self._count('retries')
+                        self.sleep(delay)
+                        continue
+                self._count('failures')
+                if is_transient_error(e):
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()  # a API respondeu; o erro é da requisição
+                raise
+            
+            self.breaker.record_success()
+            return response
+    
+    def generate(self, prompt: str) -> str:
+        """Texto da resposta; chamadas simultâneas com o mesmo prompt compartilham uma requisição"""
+        with self._lock:
+            flight = self._in_flight.get(prompt)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[prompt] = _InFlight()
+            else:
+                self.stats['deduplicated'] += 1
+        
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        
+        try:
+            flight.result = self._call(prompt, stream=False).text
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[prompt]
+            flight.done.set()
+    
+    def stream(self, prompt: str) -> Iterator[Any]:
+        """Pedaços da resposta em streaming.
+        
+        Só a abertura do stream é repetida: depois que algo foi entregue, repetir duplicaria texto.
+        """
+        response = self._call(prompt, stream=True)
+        try:
+            for chunk in response:
+                yield chunk
+        except Exception as e:
+            if is_transient_error(e):
+                self.breaker.record_failure()
+            raise
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores de chamadas e estado do disjuntor"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['in_flight'] = len(self._in_flight)
+        stats['circuit'] = self.breaker.state
+        return stats
+
+# ---------------------------------------------------------------------------
+# Modelo falso para simular a API localmente (sem rede e sem chave)
+# ---------------------------------------------------------------------------
+
+class ResourceExhausted(Exception):
+    """Imita google.api_core.exceptions.ResourceExhausted (HTTP 429)"""
+    code = 429
+
+class ServiceUnavailable(Exception):
+    """Imita google.api_core.exceptions.ServiceUnavailable (HTTP 503)"""
+    code = 503
+
+class DeadlineExceeded(Exception):
+    """Imita google.api_core.exceptions.DeadlineExceeded (timeout da requisição)"""
+    code = 504
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+    
+    def __iter__(self):
+        # Em streaming, cada palavra vira um pedaço
+        words = self.text.split(' ')
+        for i, word in enumerate(words):
+            yield FakeResponse(word if i == len(words) - 1 else word + ' ')
+
+class FakeModel:
+    """Modelo local com a mesma interface do GenerativeModel.
+    
+    `script` é uma lista consumida a cada chamada: exceções são levantadas e textos devolvidos;
+    esgotada a lista, responde `reply` (com `delay` segundos de latência). Se `delay` passar do
+    timeout de request_options, a chamada falha com DeadlineExceeded depois do timeout.
+    """
+    
+    def __init__(self, script: List[Any] = None, reply: str = "Oi amor! Tudo bem?", delay: float = 0.0):
+        self.script = list(script or [])
+        self.reply = reply
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+    
+    def generate_content(self, prompt, generation_config=None, stream=False, request_options=None):
+        with self._lock:
+            self.calls += 1
+            step = self.script.pop(0) if self.script else self.reply
+        timeout = (request_options or {}).get('timeout')
+        if timeout is not None and self.delay > timeout:
+            time.sleep(timeout)
+            raise DeadlineExceeded(f"Sem resposta em {timeout}s")
+        if self.delay:
+            time.sleep(self.delay)
+        if isinstance(step, Exception):
+            raise step
+        return FakeResponse(step)
+
+def simulate_client() -> Dict[str, Dict[str, Any]]:
+    """Cenários com o FakeModel: 429 passageiro, disjuntor, deduplicação, limite de taxa e timeout"""
+    results = {}
+    
+    class SimulatedClock:
+        def __init__(self):
+            self.now = 0.0
+        
+        def __call__(self) -> float:
+            return self.now
+        
+        def sleep(self, seconds: float):
+            self.now += seconds
+    
+    # 1) Dois 429 seguidos e depois sucesso: a resposta chega após duas esperas
+    clock = SimulatedClock()
+    client = GeminiClient(FakeModel([ResourceExhausted("429 quota"), ResourceExhausted("429 quota")]),
+                          clock=clock, sleep=clock.sleep, rng=random.Random(1))
+    results['retry_429'] = {'reply': client.generate("oi"), 'waited_s': round(clock.now, 2), **client.get_stats()}
+    
+    # 2) Falhas seguidas abrem o circuito; depois do reset_timeout uma chamada de teste o fecha
+    clock = SimulatedClock()
+    client = GeminiClient(FakeModel([ServiceUnavailable("503")] * 6), max_retries=1,
+                          clock=clock, sleep=clock.sleep, rng=random.Random(1))
+    outcomes = []
+    for _ in range(5):
+        try:
+            client.generate("oi")
+            outcomes.append('ok')
+        except CircuitOpenError:
+            outcomes.append('circuito aberto')
+        except ServiceUnavailable:
+            outcomes.append('503')
+    clock.now += client.breaker.reset_timeout
+    outcomes.append(client.generate("oi"))
+    results['circuit_breaker'] = {'outcomes': outcomes, **client.get_stats()}
+    
+    # 3) Oito threads pedindo o mesmo prompt ao mesmo tempo: uma chamada ao modelo
+    model = FakeModel(delay=0.2)
+    client = GeminiClient(model, burst=8)
+    threads = [threading.Thread(target=client.generate, args=("mesmo prompt",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results['dedup'] = {'model_calls': model.calls, **client.get_stats()}
+    
+    # 4) Rajada acima do limite: o balde segura as chamadas em vez de tomar 429
+    clock = SimulatedClock()
+    client = GeminiClient(FakeModel(), requests_per_minute=60, burst=2, clock=clock, sleep=clock.sleep)
+    for i in range(5):
+        client.generate(f"prompt {i}")
+    results['token_bucket'] = {'elapsed_s': round(clock.now, 2), **client.get_stats()}
+    
+    # 5) Modelo travado: cada tentativa para no timeout e as novas tentativas respeitam o prazo total
+    client = GeminiClient(FakeModel(delay=60), request_timeout=1, call_timeout=2.5, base_delay=0.1)
+    started = time.monotonic()
+    try:
+        client.generate("oi")
+    except DeadlineExceeded:
+        pass
+    results['request_timeout'] = {'elapsed_s': round(time.monotonic() - started, 2), **client.get_stats()}
+    
+    # 6) Balde vazio: RateLimitedError sem abrir o circuito
+    clock = SimulatedClock()
+    client = GeminiClient(FakeModel(), requests_per_minute=1, burst=1, max_wait=0, failure_threshold=1,
+                          clock=clock, sleep=clock.sleep)
+    for i in range(4):
+        try:
+            client.generate(f"prompt {i}")
+        except RateLimitedError:
+            pass
+    results['local_throttle'] = client.get_stats()
+    
+    return results
+
+def main():
+    """Roda os cenários simulados do cliente"""
+    for scenario, outcome in simulate_client().items():
+        print(f"  {scenario}: {outcome}")
+
+if __name__ == "__main__":
+    main()
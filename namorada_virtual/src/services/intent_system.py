@@ -0,0 +1,105 @@
+import re
+import unicodedata
+from typing import List, Tuple, Dict, Any
+
+TOKEN_PATTERN = re.compile(r'\w+')
+REPEATED_CHARS = re.compile(r'(.)\1+')
+
+# Marca de fim de frase-chave dentro da trie
+_TERMINAL = '\0'
+
+def normalize_token(token: str) -> str:
+    """Forma canônica de uma palavra: sem acento e sem letras repetidas ("oiii" -> "oi", "memória" -> "memoria")"""
+    decomposed = unicodedata.normalize('NFKD', token.lower())
+    token = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return REPEATED_CHARS.sub(r'\1', token)
+
+def tokenize_with_spans(text: str) -> List[Tuple[str, int, int]]:
+    """Palavras normalizadas da mensagem com a posição (início, fim) de cada uma no texto original"""
+    return [(normalize_token(m.group()), m.start(), m.end()) for m in TOKEN_PATTERN.finditer(text)]
+
+class IntentMatch:
+    """Resultado da classificação: intenção, frase-chave encontrada e o texto que vem depois dela"""
+    
+    def __init__(self, intent: str, keyword: str, start: int, end: int, text: str):
+        self.intent = intent
+        self.keyword = keyword
+        self.start = start
+        self.end = end
+        self.text = text
+    
+    @property
+    def argument(self) -> str:
+        """Texto após a frase-chave (ex.: o termo de "pesquisar gatos fofos")"""
+        return self.text[self.end:].strip()
+    
+    def __repr__(self):
+        return f"IntentMatch({self.intent!r}, keyword={self.keyword!r}, argument={self.argument!r})"
+
+class IntentRouter:
+    """Classificador de intenções dirigido por tabela.
+    
+    Todas as frases-chave (uma ou mais palavras) de todas as intenções são compiladas em uma
+    única trie de palavras normalizadas. A classificação tokeniza a mensagem uma vez e percorre
+    a trie a partir de cada palavra, então o custo depende do tamanho da mensagem, não da
+    quantidade de intenções. Só palavras inteiras casam ("oi" não casa com "noite").
+    Empates são resolvidos pela ordem da tabela (primeira intenção vence) e depois pela posição.
+    """
+    
+    def __init__(self, intents: List[Tuple[str, List[str]]]):
+        self.intents = [name for name, _ in intents]
+        self._trie = {}
+        self._max_phrase = 0
+        
+        for priority, (name, keywords) in enumerate(intents):
+            for keyword in keywords:
+                tokens = [token for token, _, _ in tokenize_with_spans(keyword)]
+                if not tokens:
+                    continue
+                node = self._trie
+                for token in tokens:
+                    node = node.setdefault(token, {})
+                # Se a mesma frase aparece em duas intenções, vale a de maior prioridade
+                node.setdefault(_TERMINAL, (priority, name, keyword))
+                self._max_phrase = max(self._max_phrase, len(tokens))
+    
+    def _candidates(self, text: str):
+        """Gera (prioridade, intenção, frase-chave, início, fim) de cada frase-chave encontrada"""
+        tokens = tokenize_with_spans(text)
+        for i in range(len(tokens)):
+            node = self._trie
+            for j in range(i, min(i + self._max_phrase, len(tokens))):
+                node = node.get(tokens[j][0])
+                if node is None:
+                    break
+                terminal = node.get(_TERMINAL)
+                if terminal is not None:
+                    yield terminal[0], terminal[1], terminal[2], tokens[i][1], tokens[j][2]
+    
+    def classify(self, text: str) -> IntentMatch:
+        """Retorna a intenção de maior prioridade presente na mensagem, ou None"""
+        best = None
+        for candidate in self._candidates(text):
+            if best is None or (candidate[0], candidate[3]) < (best[0], best[3]):
+                best = candidate
+        if best is None:
+            return None
+        _, intent, keyword, start, end = best
+        return IntentMatch(intent, keyword, start, end, text)
+    
+    def matches(self, text: str) -> bool:
+        """True se alguma frase-chave aparece na mensagem"""
+        return next(self._candidates(text), None) is not None
+    
+    def find_all(self, text: str) -> Dict[str, List[IntentMatch]]:
+        """Todas as ocorrências, agrupadas por intenção"""
+        found = {}
+        for _, intent, keyword, start, end in self._candidates(text):
+            found.setdefault(intent, []).append(IntentMatch(intent, keyword, start, end, text))
+        return found
+    
+    def get_info(self) -> Dict[str, Any]:
+        """Tamanho da tabela compilada"""
+        def count_nodes(node):
+            return sum(1 + count_nodes(child) for key, child in node.items() if key != _TERMINAL)
+        return {'intents': len(self.intents), 'trie_nodes': count_nodes(self._trie), 'max_phrase_words': self._max_phrase}
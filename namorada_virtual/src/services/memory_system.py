@@ -0,0 +1,403 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import List, Dict, Any, Tuple
+
+try:
+    from .intent_system import normalize_token
+except ImportError:
+    from intent_system import normalize_token  # executado como script
+
+# Import condicional do NumPy (sem ele a memória de longo prazo fica desativada)
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Dimensão padrão dos vetores (float32: 1 KB por mensagem)
+DEFAULT_DIM = 256
+
+# Versão do vetorizador gravada no índice; mudar invalida os vetores salvos
+VECTORIZER_VERSION = 1
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# Peso de um par de palavras em relação a uma palavra isolada
+BIGRAM_WEIGHT = 0.5
+
+# Palavras muito comuns que não ajudam a achar lembranças relevantes (já normalizadas)
+STOPWORDS = frozenset(normalize_token(word) for word in """
+    a o as os um uma uns umas de do da dos das em no na nos nas por pra pro para com sem e ou
+    que se eu tu voce ele ela nos vos eles elas me te lhe meu minha seu sua teu tua isso isto
+    aquilo esse essa este esta ai la aqui ja nao sim mas mais muito muita bem tao so ta to ne
+    foi ser sou era estar estou esta tem tenho ter vai vou fazer faz como quando onde qual
+""".split())
+
+class HashingVectorizer:
+    """Vetorizador local e sem treino: palavras e pares de palavras viram posições por hash (crc32).
+    
+    Os vetores são normalizados (norma 1), então o produto escalar já é a similaridade de cosseno.
+    O hash é estável entre execuções, o que permite guardar os vetores em disco.
+    """
+    
+    def __init__(self, dim: int = DEFAULT_DIM):
+        self.dim = dim
+    
+    def features(self, text: str) -> List[str]:
+        """Palavras relevantes (normalizadas) e bigramas da mensagem"""
+        words = [normalize_token(m.group()) for m in TOKEN_PATTERN.finditer(text)]
+        words = [word for word in words if word not in STOPWORDS and len(word) > 1]
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    
+    def _hashed(self, text: str):
+        """(coluna, valor) de cada característica; bigramas pesam metade das palavras"""
+        for feature in self.features(text):
+            h = zlib.crc32(feature.encode('utf-8'))
+            weight = BIGRAM_WEIGHT if ' ' in feature else 1.0
+            yield h % self.dim, weight if h & 0x80000000 else -weight  # sinal reduz colisões
+    
+    def embed_batch(self, texts: List[str]) -> 'np.ndarray':
+        """Matriz (len(texts), dim) float32 com um vetor normalizado por texto"""
+        rows, cols, values = [], [], []
+        for row, text in enumerate(texts):
+            for col, value in self._hashed(text):
+                rows.append(row)
+                cols.append(col)
+                values.append(value)
+        
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        if rows:
+            np.add.at(matrix, (rows, cols), values)
+            # Frequência sublinear: repetir uma palavra não domina a mensagem
+            np.copyto(matrix, np.sign(matrix) * np.log1p(np.abs(matrix)))
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix /= norms
+        return matrix
+    
+    def embed(self, text: str) -> 'np.ndarray':
+        """Vetor normalizado de um texto"""
+        return self.embed_batch([text])[0]
+
+class VectorIndex:
+    """Matriz de vetores em disco, mapeada em memória (np.memmap), com o id da mensagem e da conversa
+    de cada linha. Cresce dobrando a capacidade; o arquivo .meta.json só é gravado depois dos dados,
+    então linhas de uma escrita interrompida são ignoradas."""
+    
+    def __init__(self, path_prefix: str, dim: int = DEFAULT_DIM):
+        self.dim = dim
+        self.vectors_path = f"{path_prefix}.vectors.f32"
+        self.ids_path = f"{path_prefix}.ids.i64"
+        self.meta_path = f"{path_prefix}.meta.json"
+        
+        self.count = 0
+        self.capacity = 0
+        self.last_message_id = 0  # maior id já visto (indexado ou ignorado)
+        self._vectors = None
+        self._ids = None
+        
+        meta = self._load_meta()
+        if meta and meta.get('dim') == dim and meta.get('version') == VECTORIZER_VERSION:
+            self.count = meta['count']
+            self.capacity = meta['capacity']
+            self.last_message_id = meta['last_message_id']
+            self._open()
+        else:
+            self.reset()
+    
+    def _load_meta(self) -> Dict[str, Any]:
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _save_meta(self):
+        temp_path = f"{self.meta_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': VECTORIZER_VERSION,
+                'dim': self.dim,
+                'count': self.count,
+                'capacity': self.capacity,
+                'last_message_id': self.last_message_id
+            }, f)
+        os.replace(temp_path, self.meta_path)
+    
+    def _open(self):
+        if self.capacity:
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r+', shape=(self.capacity, self.dim))
+            self._ids = np.memmap(self.ids_path, dtype=np.int64, mode='r+', shape=(self.capacity, 2))
+    
+    def _release(self):
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._ids.flush()
+        self._vectors = None
+        self._ids = None
+    
+    def _ensure_capacity(self, needed: int):
+        if needed <= self.capacity:
+            return
+        new_capacity = max(needed, self.capacity * 2, 1024)
+        
+        # Os mapas precisam ser fechados antes de mudar o tamanho dos arquivos (Windows)
+        self._release()
+        for path, row_bytes in ((self.vectors_path, self.dim * 4), (self.ids_path, 16)):
+            with open(path, 'a+b') as f:
+                f.truncate(new_capacity * row_bytes)
+        self.capacity = new_capacity
+        self._open()
+    
+    def append(self, vectors: 'np.ndarray', message_ids: List[int], conversation_ids: List[int],
+               last_message_id: int = None):
+        """Acrescenta vetores ao final do índice"""
+        n = len(message_ids)
+        if n:
+            self._ensure_capacity(self.count + n)
+            self._vectors[self.count:self.count + n] = vectors
+            self._ids[self.count:self.count + n, 0] = message_ids
+            self._ids[self.count:self.count + n, 1] = conversation_ids
+            self._vectors.flush()
+            self._ids.flush()
+            self.count += n
+        self.last_message_id = int(max(self.last_message_id, last_message_id or 0, max(message_ids, default=0)))
+        self._save_meta()
+    
+    def search(self, query: 'np.ndarray', k: int = 5, exclude_conversation_id: int = None,
+               batch_rows: int = 262144) -> List[Tuple[float, int]]:
+        """Top-k (similaridade, id da mensagem) por cosseno, em blocos de linhas (memória limitada)"""
+        if not self.count or k <= 0:
+            return []
+        
+        best_scores = np.empty(0, dtype=np.float32)
+        best_rows = np.empty(0, dtype=np.int64)
+        for start in range(0, self.count, batch_rows):
+            end = min(start + batch_rows, self.count)
+            scores = self._vectors[start:end] @ query
+            if exclude_conversation_id is not None:
+                scores[self._ids[start:end, 1] == exclude_conversation_id] = -np.inf
+            
+            if len(scores) > k:
+                top = np.argpartition(-scores, k)[:k]
+            else:
+                top = np.arange(len(scores))
+            best_scores = np.concatenate((best_scores, scores[top]))
+            best_rows = np.concatenate((best_rows, top + start))
+            
+            if len(best_scores) > k:
+                keep = np.argpartition(-best_scores, k)[:k]
+                best_scores, best_rows = best_scores[keep], best_rows[keep]
+        
+        order = np.argsort(-best_scores)
+        return [(float(best_scores[i]), int(self._ids[best_rows[i], 0]))
+                for i in order if np.isfinite(best_scores[i])]
+    
+    def reset(self):
+        """Apaga o índice (os vetores serão recalculados)"""
+        self._release()
+        for path in (self.vectors_path, self.ids_path, self.meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.count = 0
+        self.capacity = 0
+        self.last_message_id = 0
+    
+    def get_size_mb(self) -> float:
+        """Espaço ocupado em disco pelos arquivos do índice"""
+        return sum(os.path.getsize(path) for path in (self.vectors_path, self.ids_path)
+                   if os.path.exists(path)) / (1024 * 1024)
+    
+    def close(self):
+        self._release()
+
+class LongTermMemory:
+    """Memória de longo prazo: indexa as mensagens salvas e recupera as mais parecidas com a atual.
+    
+    A indexação é incremental (só mensagens com id maior que o último visto). O histórico antigo
+    é indexado em segundo plano; cada busca só faz uma recuperação pequena (um lote) e pula essa
+    etapa se outra indexação estiver em andamento. Mensagens apagadas depois de indexadas somem
+    da busca ao consultar o banco.
+    """
+    
+    def __init__(self, storage, index_prefix: str = None, dim: int = DEFAULT_DIM,
+                 batch_size: int = 1000, min_features: int = 2, recall_catch_up_batches: int = 1):
+        self.storage = storage
+        self.batch_size = batch_size
+        self.min_features = min_features
+        self.enabled = NUMPY_AVAILABLE
+        self.recall_catch_up_batches = recall_catch_up_batches
+        self.last_search_ms = 0.0
+        self._lock = threading.Lock()           # protege o índice (append, busca, reset), um lote por vez
+        self._indexing = threading.Lock()       # um único indexador por vez
+        
+        if not self.enabled:
+            print("NumPy não está disponível. Memória de longo prazo desativada.")
+            return
+        
+        self.vectorizer = HashingVectorizer(dim)
+        self.index = VectorIndex(index_prefix or f"{storage.db_path}.memory", dim)
+    
+    def index_new_messages(self, max_batches: int = None, blocking: bool = True) -> int:
+        """Vetoriza as mensagens ainda não indexadas; retorna quantas entraram no índice.
+        
+        Com `blocking=False`, retorna 0 na hora se outra indexação estiver rodando. O índice só fica
+        bloqueado durante a gravação de cada lote, então buscas seguem entre um lote e outro.
+        """
+        if not self.enabled or not self._indexing.acquire(blocking):
+            return 0
+        
+        added = 0
+        batches = 0
+        try:
+            while max_batches is None or batches < max_batches:
+                rows = self.storage.get_messages_after(self.index.last_message_id, self.batch_size)
+                if not rows:
+                    break
+                
+                # Mensagens curtas demais ("oi", "kkk") não viram lembranças
+                useful = [r for r in rows if len(self.vectorizer.features(r['message'])) >= self.min_features]
+                vectors = self.vectorizer.embed_batch([r['message'] for r in useful])
+                with self._lock:
+                    self.index.append(vectors, [r['id'] for r in useful], [r['conversation_id'] for r in useful],
+                                      last_message_id=rows[-1]['id'])
+                added += len(useful)
+                batches += 1
+                
+                if len(rows) < self.batch_size:
+                    break
+        finally:
+            self._indexing.release()
+        return added
+    
+    def recall(self, query: str, k: int = 3, exclude_conversation_id: int = None,
+               min_score: float = 0.2) -> List[Dict[str, Any]]:
+        """Até k mensagens passadas mais parecidas com `query` (fora da conversa excluída)"""
+        if not self.enabled or not query.strip():
+            return []
+        
+        # Só as mensagens mais recentes; o resto fica com a indexação em segundo plano
+        self.index_new_messages(self.recall_catch_up_batches, blocking=False)
+        
+        started = time.perf_counter()
+        query_vector = self.vectorizer.embed(query)
+        if not query_vector.any():
+            return []
+        with self._lock:
+            hits = self.index.search(query_vector, k * 3, exclude_conversation_id)
+        self.last_search_ms = (time.perf_counter() - started) * 1000
+        
+        hits = [(score, message_id) for score, message_id in hits if score >= min_score]
+        messages = self.storage.get_messages_by_ids([message_id for _, message_id in hits])
+        
+        memories = []
+        for score, message_id in hits:
+            msg = messages.get(message_id)
+            if msg is not None:
+                memories.append({**msg, 'score': round(score, 3)})
+            if len(memories) == k:
+                break
+        return memories
+    
+    def rebuild(self) -> int:
+        """Recria o índice do zero (descarta vetores de mensagens apagadas)"""
+        if not self.enabled:
+            return 0
+        with self._indexing:
+            with self._lock:
+                self.index.reset()
+        return self.index_new_messages()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Tamanho do índice e latência da última busca"""
+        if not self.enabled:
+            return {'enabled': False}
+        return {
+            'enabled': True,
+            'vectors': self.index.count,
+            'dim': self.index.dim,
+            'size_mb': round(self.index.get_size_mb(), 2),
+            'last_message_id': self.index.last_message_id,
+            'last_search_ms': round(self.last_search_ms, 3)
+        }
+    
+    def close(self):
+        if self.enabled:
+            self.index.close()
+
+def format_memories(memories: List[Dict[str, Any]], name: str, max_chars: int = 150) -> str:
+    """Lembranças no formato usado no prompt: "(12/03) Você: ..." """
+    lines = []
+    for memory in memories:
+        sender = "Você" if memory['sender'] == 'user' else name
+        text = " ".join(memory['message'].split())
+        if len(text) > max_chars:
+            text = text[:max_chars - 1].rstrip() + "…"
+        try:
+            when = datetime.strptime(memory['timestamp'][:10], '%Y-%m-%d').strftime('%d/%m')
+        except (TypeError, ValueError):
+            when = "?"
+        lines.append(f"({when}) {sender}: {text}")
+    return "\n".join(lines)
+
+# ---------------------------------------------------------------------------
+# Benchmark: indexação e busca com até 1M de vetores
+# ---------------------------------------------------------------------------
+
+def benchmark_memory(vectors: int = 1_000_000, dim: int = DEFAULT_DIM, queries: int = 20,
+                     k: int = 5, batch: int = 50_000) -> Dict[str, float]:
+    """Mede vetorização, escrita no memmap e latência de busca top-k em um índice temporário.
+    
+    O índice é preenchido com vetores aleatórios normalizados (o custo da busca não depende do
+    conteúdo); a vetorização é medida à parte com mensagens sintéticas.
+    """
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("NumPy é necessário para o benchmark da memória")
+    
+    results = {'vectors': vectors, 'dim': dim}
+    vectorizer = HashingVectorizer(dim)
+    
+    sample = [f"ontem fui no cinema assistir um filme de terror com a minha irmã {i}" for i in range(5000)]
+    started = time.perf_counter()
+    vectorizer.embed_batch(sample)
+    results['embed_per_message_us'] = (time.perf_counter() - started) * 1e6 / len(sample)
+    
+    temp_dir = tempfile.mkdtemp(prefix="memory_bench_")
+    index = VectorIndex(os.path.join(temp_dir, "bench"), dim)
+    rng = np.random.default_rng(42)
+    try:
+        started = time.perf_counter()
+        for start in range(0, vectors, batch):
+            n = min(batch, vectors - start)
+            block = rng.standard_normal((n, dim), dtype=np.float32)
+            block /= np.linalg.norm(block, axis=1, keepdims=True)
+            ids = np.arange(start + 1, start + n + 1)
+            index.append(block, ids, ids // 100)
+        results['append_s'] = time.perf_counter() - started
+        results['size_mb'] = index.get_size_mb()
+        
+        query_vectors = [vectorizer.embed(f"filme de terror no cinema {i}") for i in range(queries)]
+        index.search(query_vectors[0], k)  # aquece o cache de páginas
+        started = time.perf_counter()
+        for query in query_vectors:
+            index.search(query, k, exclude_conversation_id=7)
+        results['search_ms'] = (time.perf_counter() - started) * 1000 / queries
+    finally:
+        index.reset()
+        os.rmdir(temp_dir)
+    
+    return {name: round(value, 3) if isinstance(value, float) else value for name, value in results.items()}
+
+def main():
+    """Roda o benchmark da memória de longo prazo"""
+    for name, value in benchmark_memory().items():
+        print(f"  {name}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import random
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import List, Dict, Tuple
+
+# Léxico de humor: categoria -> palavras (comparadas como palavras inteiras, com ou sem acento)
+MOOD_LEXICON = {
+    'positive': ['bom', 'legal', 'ótimo', 'feliz', 'alegre', 'amor', 'gosto', 'adorei', 'incrível'],
+    'negative': ['ruim', 'triste', 'chato', 'difícil', 'problema', 'cansado', 'estresse'],
+    'intimate': ['saudade', 'carinho', 'amor', 'beijo', 'abraço', 'coração'],
+}
+
+MOOD_CATEGORIES = ('positive', 'negative', 'intimate')
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+def _strip_accents(text: str) -> str:
+    """Remove acentos para que "otimo" e "ótimo" contem igual"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+class MoodEngine:
+    """Analisador de humor compilado: tokenizador + léxico pré-calculado.
+    
+    A mensagem vira um conjunto de palavras (regex \\w+ sobre o texto em minúsculas) que é
+    intersectado com o léxico; só palavras inteiras contam. Cada forma do léxico (com e sem acento)
+    aponta para um vetor (positivo, negativo, íntimo) e o vetor da mensagem soma as palavras
+    distintas encontradas. É calculado uma vez por texto e guardado em um LRU.
+    """
+    
+    def __init__(self, lexicon: Dict[str, List[str]] = None, cache_size: int = 4096):
+        self.cache_size = cache_size
+        self._forms, self._vectors = self._compile(lexicon or MOOD_LEXICON)
+        self._lexicon_words = frozenset(self._forms)
+        self._scores = OrderedDict()  # texto -> vetor
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+    
+    @staticmethod
+    def _compile(lexicon: Dict[str, List[str]]) -> Tuple[Dict[str, str], Dict[str, Tuple[int, int, int]]]:
+        """Retorna (forma com/sem acento -> palavra canônica, palavra canônica -> vetor de categorias)"""
+        forms = {}
+        vectors = {}
+        for position, category in enumerate(MOOD_CATEGORIES):
+            for word in lexicon.get(category, []):
+                canonical = _strip_accents(word.lower())
+                forms[word.lower()] = forms[canonical] = canonical
+                vector = list(vectors.get(canonical, (0, 0, 0)))
+                vector[position] = 1  # uma palavra pode estar em mais de uma categoria
+                vectors[canonical] = tuple(vector)
+        return forms, vectors
+    
+    def score_uncached(self, text: str) -> Tuple[int, int, int]:
+        """Vetor (positivo, negativo, íntimo) da mensagem, sem passar pelo cache"""
+        found = self._lexicon_words.intersection(TOKEN_PATTERN.findall(text.lower()))
+        if not found:
+            return (0, 0, 0)
+        
+        positive = negative = intimate = 0
+        forms, vectors = self._forms, self._vectors
+        for word in {forms[form] for form in found}:
+            vector = vectors[word]
+            positive += vector[0]
+            negative += vector[1]
+            intimate += vector[2]
+        return positive, negative, intimate
+    
+    def score(self, text: str) -> Tuple[int, int, int]:
+        """Vetor da mensagem, calculado uma única vez por texto"""
+        with self._lock:
+            vector = self._scores.get(text)
+            if vector is not None:
+                self._scores.move_to_end(text)
+                self.stats['hits'] += 1
+                return vector
+            self.stats['misses'] += 1
+        
+        vector = self.score_uncached(text)
+        with self._lock:
+            self._scores[text] = vector
+            if len(self._scores) > self.cache_size:
+                self._scores.popitem(last=False)
+        return vector
+    
+    def analyze(self, conversation_history: List[Dict[str, str]], window: int = 5) -> str:
+        """Humor geral das últimas `window` mensagens"""
+        if not conversation_history:
+            return "neutro e receptivo"
+        
+        positive = negative = intimate = 0
+        for msg in conversation_history[-window:]:
+            vector = self.score(msg['message'])
+            positive += vector[0]
+            negative += vector[1]
+            intimate += vector[2]
+        
+        if intimate > 0:
+            return "íntimo e carinhoso"
+        elif positive > negative:
+            return "positivo e animado"
+        elif negative > positive:
+            return "compreensivo e acolhedor"
+        else:
+            return "equilibrado e natural"
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Acertos e falhas do cache de pontuações"""
+        with self._lock:
+            return {**self.stats, 'entries': len(self._scores)}
+
+# ---------------------------------------------------------------------------
+# Benchmark: motor compilado x varredura por substring da versão anterior
+# ---------------------------------------------------------------------------
+
+def _substring_scores(text: str, lexicon: Dict[str, List[str]]) -> Tuple[int, int, int]:
+    """Pontuação da implementação anterior (`word in text` para cada palavra do léxico)"""
+    text = text.lower()
+    return tuple(sum(1 for word in lexicon[category] if word in text) for category in MOOD_CATEGORIES)
+
+def _sample_messages(count: int, seed: int = 42) -> List[str]:
+    """Mensagens sintéticas com palavras do léxico, variações e palavras que só contêm uma delas"""
+    vocabulary = [
+        'oi', 'tudo', 'bem', 'hoje', 'foi', 'um', 'dia', 'muito', 'você', 'eu', 'tô', 'com', 'de', 'que',
+        'bom', 'legal', 'otimo', 'ótimo', 'feliz', 'amor', 'amora', 'gosto', 'gostoso', 'adorei',
+        'ruim', 'triste', 'chato', 'chatice', 'problema', 'cansado', 'estresse',
+        'saudade', 'saudades', 'carinho', 'beijo', 'abraço', 'coração', 'bombom', 'legalmente',
+    ]
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(vocabulary) for _ in range(rng.randint(3, 25))) for _ in range(count)]
+
+def benchmark_mood_engine(messages: int = 100_000, repeat_ratio: float = 0.3) -> Dict[str, float]:
+    """Compara o motor compilado com a varredura por substring em `messages` mensagens.
+    
+    Uma fração `repeat_ratio` das mensagens é repetida, como acontece quando a mesma janela do
+    histórico é reanalisada a cada turno.
+    """
+    unique = _sample_messages(int(messages * (1 - repeat_ratio)) or 1)
+    corpus = unique + unique[:messages - len(unique)]
+    
+    results = {'messages': len(corpus)}
+    
+    started = time.perf_counter()
+    legacy = [_substring_scores(text, MOOD_LEXICON) for text in corpus]
+    results['substring_s'] = time.perf_counter() - started
+    
+    engine = MoodEngine(cache_size=len(corpus))
+    started = time.perf_counter()
+    compiled = [engine.score_uncached(text) for text in corpus]
+    results['compiled_s'] = time.perf_counter() - started
+    
+    # Primeira passada pelo cache (só as repetições acertam) e depois com o cache já quente
+    for label in ('compiled_cached_s', 'compiled_warm_s'):
+        started = time.perf_counter()
+        for text in corpus:
+            engine.score(text)
+        results[label] = time.perf_counter() - started
+    
+    # Substring contando o que não é palavra inteira ("amor" em "amora") e palavras sem acento que ela perdia
+    results['substring_false_matches'] = sum(
+        1 for old, new in zip(legacy, compiled) if any(o > n for o, n in zip(old, new))
+    )
+    results['accent_free_matches'] = sum(
+        1 for old, new in zip(legacy, compiled) if any(o < n for o, n in zip(old, new))
+    )
+    results['speedup'] = results['substring_s'] / results['compiled_s'] if results['compiled_s'] else 0.0
+    results['speedup_cached'] = (results['substring_s'] / results['compiled_cached_s']
+                                 if results['compiled_cached_s'] else 0.0)
+    results['speedup_warm'] = (results['substring_s'] / results['compiled_warm_s']
+                               if results['compiled_warm_s'] else 0.0)
+    
+    return {name: round(value, 4) if isinstance(value, float) else value for name, value in results.items()}
+
+def main():
+    """Roda o benchmark do analisador de humor"""
+    for name, value in benchmark_mood_engine().items():
+        print(f"  {name}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ import subprocess
 import platform
 import psutil
 import json
+import random
 import requests
 from typing import Dict, List, Any, Tuple
 import re
@@ -12,11 +13,49 @@ from PIL import ImageGrab
 import cv2
 import numpy as np
 
+try:
+    from .intent_system import IntentRouter
+except ImportError:
+    from intent_system import IntentRouter  # executado como script
+
+# Comandos do agente, em ordem de prioridade (a primeira intenção presente na mensagem vence)
+AGENT_INTENTS = [
+    ('open', ['abrir', 'abra', 'executar', 'iniciar']),
+    ('system_status', ['sistema', 'processador', 'memória', 'ram', 'disco']),
+    ('screenshot', ['screenshot', 'capturar', 'foto da tela', 'print']),
+    ('volume', ['volume', 'som']),
+    ('search', ['pesquisar', 'buscar', 'google', 'youtube']),
+    ('weather', ['clima', 'tempo', 'previsão']),
+    ('processes', ['processos', 'apps', 'aplicativos', 'programas']),
+    ('close', ['fechar', 'feche', 'matar', 'terminar']),
+    # Palavras que indicam um pedido ao agente, mas sem tratamento específico
+    ('unhandled', ['execute', 'rodar', 'parar', 'mostrar', 'listar', 'ver', 'verificar', 'checar',
+                   'música', 'tocar', 'pausar', 'parar música', 'aumentar', 'diminuir', 'mutar']),
+]
+
+# Aplicações conhecidas e como o usuário costuma chamá-las (a primeira que casar vence)
+APP_INTENTS = [
+    ('brave', ['brave', 'google chrome', 'navegador', 'chorme']),
+    ('firefox', ['firefox', 'mozilla']),
+    ('notepad', ['bloco de notas', 'notepad', 'editor']),
+    ('calculator', ['calculadora', 'calc']),
+    ('cmd', ['cmd', 'prompt', 'terminal']),
+    ('explorer', ['explorer', 'pasta', 'arquivos']),
+    ('spotify', ['spotify', 'música']),
+    ('discord', ['discord']),
+    ('steam', ['steam', 'jogos']),
+    ('code', ['vscode', 'visual studio code', 'vs code', 'code']),
+]
+
 class PersonalAgent:
     def __init__(self):
         self.system_info = self._get_system_info()
         self.commands_history = []
         
+        # Tabelas de palavras-chave compiladas uma vez (uma passada por mensagem)
+        self.command_router = IntentRouter(AGENT_INTENTS)
+        self.app_router = IntentRouter(APP_INTENTS)
+        
     def _get_system_info(self) -> Dict[str, Any]:
         """Coleta informações básicas do sistema"""
         return {
@@ -30,20 +69,7 @@ class PersonalAgent:
     
     def can_execute_command(self, user_message: str) -> bool:
         """Verifica se a mensagem contém um comando executável"""
-        command_keywords = [
-            'abrir', 'abra', 'executar', 'execute', 'rodar', 'iniciar',
-            'fechar', 'feche', 'parar', 'matar', 'terminar',
-            'mostrar', 'listar', 'ver', 'verificar', 'checar',
-            'screenshot', 'capturar', 'foto da tela',
-            'música', 'tocar', 'pausar', 'parar música',
-            'volume', 'aumentar', 'diminuir', 'mutar',
-            'sistema', 'processador', 'memória', 'disco',
-            'clima', 'tempo', 'previsão',
-            'pesquisar', 'buscar', 'google', 'youtube'
-        ]
-        
-        message_lower = user_message.lower()
-        return any(keyword in message_lower for keyword in command_keywords)
+        return self.command_router.matches(user_message)
     
     def execute_command(self, user_message: str, personality: Dict[str, Any]) -> Tuple[str, bool]:
         """Executa comandos do sistema e retorna resposta personalizada"""
@@ -51,39 +77,23 @@ class PersonalAgent:
         message_lower = user_message.lower()
         success = True
         
+        handlers = {
+            'open': lambda match: self._handle_open_command(message_lower, match),
+            'system_status': lambda match: self._get_system_status(),
+            'screenshot': lambda match: self._take_screenshot(),
+            'volume': lambda match: self._handle_volume_control(message_lower),
+            'search': lambda match: self._handle_search(message_lower, match),
+            'weather': lambda match: self._get_weather_info(),
+            'processes': lambda match: self._list_running_processes(),
+            'close': lambda match: self._handle_close_command(message_lower),
+        }
+        
         try:
-            # Comandos de aplicações
-            if any(word in message_lower for word in ['abrir', 'abra', 'executar', 'iniciar']):
-                result = self._handle_open_command(message_lower)
-            
-            # Comandos de informações do sistema
-            elif any(word in message_lower for word in ['sistema', 'processador', 'memória', 'ram', 'disco']):
-                result = self._get_system_status()
-            
-            # Screenshots
-            elif any(word in message_lower for word in ['screenshot', 'capturar', 'foto da tela', 'print']):
-                result = self._take_screenshot()
-            
-            # Controle de volume
-            elif any(word in message_lower for word in ['volume', 'som']):
-                result = self._handle_volume_control(message_lower)
-            
-            # Pesquisas
-            elif any(word in message_lower for word in ['pesquisar', 'buscar', 'google', 'youtube']):
-                result = self._handle_search(message_lower)
-            
-            # Clima
-            elif any(word in message_lower for word in ['clima', 'tempo', 'previsão']):
-                result = self._get_weather_info()
-            
-            # Listar processos
-            elif any(word in message_lower for word in ['processos', 'apps', 'aplicativos', 'programas']):
-                result = self._list_running_processes()
-            
-            # Fechar aplicações
-            elif any(word in message_lower for word in ['fechar', 'feche', 'matar', 'terminar']):
-                result = self._handle_close_command(message_lower)
+            match = self.command_router.classify(message_lower)
+            handler = handlers.get(match.intent) if match is not None else None
             
+            if handler is not None:
+                result = handler(match)
             else:
                 result = "Não consegui identificar o comando específico. Pode me explicar melhor o que você quer que eu faça?"
                 success = False
@@ -105,33 +115,17 @@ class PersonalAgent:
         
         return personalized_response, success
     
-    def _handle_open_command(self, message: str) -> str:
+    def _handle_open_command(self, message: str, match=None) -> str:
         """Lida com comandos para abrir aplicações"""
         
-        apps_map = {
-            'brave': ['brave', 'google chrome', 'navegador', 'chorme'],
-            'chorme': ['brave', 'google chrome', 'navegador', 'chorme'],
-            'firefox': ['firefox', 'mozilla'],
-            'notepad': ['bloco de notas', 'notepad', 'editor'],
-            'calculator': ['calculadora', 'calc'],
-            'cmd': ['cmd', 'prompt', 'terminal'],
-            'explorer': ['explorer', 'pasta', 'arquivos'],
-            'spotify': ['spotify', 'música'],
-            'discord': ['discord'],
-            'steam': ['steam', 'jogos'],
-            'code': ['vscode', 'visual studio code', 'vs code', 'code'],
-        }
-        
-        for app, keywords in apps_map.items():
-            if any(keyword in message for keyword in keywords):
-                return self._open_application(app)
+        app = self.app_router.classify(message)
+        if app is not None:
+            return self._open_application(app.intent)
         
-        # Tentar extrair nome da aplicação da mensagem
-        words = message.split()
-        for i, word in enumerate(words):
-            if word in ['abrir', 'abra', 'executar', 'iniciar'] and i + 1 < len(words):
-                app_name = words[i + 1]
-                return self._open_application(app_name)
+        # Tentar extrair nome da aplicação da mensagem (a palavra depois de "abrir")
+        if match is not None and match.argument:
+            app_name = match.argument.split()[0]
+            return self._open_application(app_name)
         
         return "Não consegui identificar qual aplicação você quer abrir. Pode me dizer o nome específico?"
     
@@ -217,19 +211,11 @@ class PersonalAgent:
         
         return "Não entendi o comando de volume. Quer aumentar, diminuir ou mutar?"
     
-    def _handle_search(self, message: str) -> str:
+    def _handle_search(self, message: str, match=None) -> str:
         """Realiza pesquisas na web"""
         try:
-            # Extrair termo de pesquisa
-            search_terms = ['pesquisar', 'buscar', 'google', 'youtube']
-            search_term = None
-            
-            for term in search_terms:
-                if term in message:
-                    parts = message.split(term, 1)
-                    if len(parts) > 1:
-                        search_term = parts[1].strip()
-                        break
+            # Termo de pesquisa: o que vem depois da palavra-chave ("pesquisar", "google"...)
+            search_term = match.argument if match is not None else None
             
             if not search_term:
                 return "O que você quer pesquisar?"
@@ -0,0 +1,210 @@
+import asyncio
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any
+
+class PipelineJob:
+    """Uma requisição em andamento no pipeline.
+    
+    O trabalho roda em uma thread do executor e recebe o job como primeiro argumento: use
+    `emit` para mandar resultados parciais para a interface e `cancelled` para parar cedo.
+    """
+    
+    def __init__(self, pipeline: 'ResponsePipeline', key: str, timeout: float,
+                 on_done: Callable = None, on_error: Callable = None, on_cancel: Callable = None,
+                 background: bool = False):
+        self.pipeline = pipeline
+        self.key = key
+        self.timeout = timeout
+        self.background = background
+        self.state = 'pending'  # pending -> done | error | timeout | cancelled
+        self._callbacks = {'done': on_done, 'error': on_error, 'timeout': on_error, 'cancelled': on_cancel}
+        self._lock = threading.Lock()
+        self._future = None
+        self._slot = key
+    
+    @property
+    def cancelled(self) -> bool:
+        """True se o job foi cancelado ou estourou o prazo (o trabalho deve parar)"""
+        return self.state in ('cancelled', 'timeout')
+    
+    def emit(self, callback: Callable, *args):
+        """Agenda callback(*args) na thread da interface, enquanto o job estiver ativo"""
+        if self.state == 'pending':
+            self.pipeline.ui_queue.put((self, False, callback, args))
+    
+    def cancel(self):
+        """Cancela o job; o trabalho em execução é descartado quando terminar"""
+        if self._finish('cancelled') and self._future is not None:
+            self._future.cancel()
+    
+    def _finish(self, state: str, *args) -> bool:
+        """Transição única para um estado final; só a primeira agenda o callback correspondente"""
+        with self._lock:
+            if self.state != 'pending':
+                return False
+            self.state = state
+        
+        self.pipeline._forget(self)
+        callback = self._callbacks.get(state)
+        if callback:
+            self.pipeline.ui_queue.put((self, True, callback, (self,) + args))
+        return True
+
+class ResponsePipeline:
+    """Loop asyncio em uma thread dedicada que executa todo o trabalho de IA e do agente.
+    
+    Cada requisição tem prazo próprio e pode ser cancelada; no máximo `max_concurrency` rodam ao
+    mesmo tempo (as chamadas bloqueantes do SDK vão para um executor do mesmo tamanho). Os
+    resultados voltam para o Tk por uma única fila, drenada com `poll` pela thread da interface.
+    Submeter com uma `key` já em uso cancela a requisição anterior com a mesma chave.
+    
+    Trabalhos longos de manutenção (ex.: indexação) são submetidos com `background=True` e rodam
+    em um executor separado, sem ocupar as vagas das respostas do chat. O prazo de um job não
+    interrompe a thread que o executa: chamadas bloqueantes precisam de timeout próprio.
+    """
+    
+    def __init__(self, max_concurrency: int = 2, default_timeout: float = 30.0, background_workers: int = 1):
+        self.max_concurrency = max_concurrency
+        self.default_timeout = default_timeout
+        self.ui_queue = queue.Queue()
+        
+        self._jobs = {}  # chave (ou id do job) -> job ativo
+        self._jobs_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='ai-worker')
+        self._background_executor = ThreadPoolExecutor(max_workers=background_workers, thread_name_prefix='bg-worker')
+        self._busy = {'chat': 0, 'background': 0}  # threads executando trabalho (inclusive de jobs já encerrados)
+        self._loop = asyncio.new_event_loop()
+        self._semaphore = None
+        self._closed = False
+        
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, args=(ready,), name='response-pipeline', daemon=True)
+        self._thread.start()
+        ready.wait()
+    
+    def _run_loop(self, ready: threading.Event):
+        asyncio.set_event_loop(self._loop)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._loop.call_soon(ready.set)
+        self._loop.run_forever()
+        
+        # Parada: cancela o que sobrou antes de fechar o loop
+        pending = asyncio.all_tasks(self._loop)
+        for task in pending:
+            task.cancel()
+        self._loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        self._loop.close()
+    
+    def submit(self, func: Callable, *args, key: str = None, timeout: float = None,
+               on_done: Callable = None, on_error: Callable = None, on_cancel: Callable = None,
+               background: bool = False) -> PipelineJob:
+        """Agenda func(job, *args) no pipeline.
+        
+        Os callbacks rodam na thread da interface (via `poll`): on_done(job, resultado),
+        on_error(job, exceção) — TimeoutError quando o prazo estoura — e on_cancel(job).
+        """
+        if self._closed:
+            raise RuntimeError("Pipeline já foi encerrado")
+        
+        job = PipelineJob(self, key, timeout or self.default_timeout, on_done, on_error, on_cancel, background)
+        
+        # Jobs sem chave também ficam registrados, para o shutdown conseguir cancelá-los
+        job._slot = key if key is not None else id(job)
+        with self._jobs_lock:
+            previous = self._jobs.get(job._slot)
+            self._jobs[job._slot] = job
+        if previous is not None:
+            previous.cancel()
+        
+        job._future = asyncio.run_coroutine_threadsafe(self._run(job, func, args), self._loop)
+        return job
+    
+    async def _run(self, job: PipelineJob, func: Callable, args: tuple):
+        try:
+            result = await asyncio.wait_for(self._execute(job, func, args), job.timeout)
+        except asyncio.CancelledError:
+            job._finish('cancelled')
+        except asyncio.TimeoutError:
+            job._finish('timeout', TimeoutError(f"Sem resposta em {job.timeout:g}s"))
+        except Exception as e:
+            job._finish('error', e)
+        else:
+            job._finish('done', result)
+    
+    async def _execute(self, job: PipelineJob, func: Callable, args: tuple):
+        if job.background:
+            return await self._loop.run_in_executor(self._background_executor, self._work, 'background',
+                                                    func, job, args)
+        # O prazo conta desde o envio, inclusive o tempo esperando vaga
+        async with self._semaphore:
+            return await self._loop.run_in_executor(self._executor, self._work, 'chat', func, job, args)
+    
+    def _work(self, pool: str, func: Callable, job: PipelineJob, args: tuple):
+        """Roda na thread do executor, contando as threads ocupadas"""
+        with self._jobs_lock:
+            self._busy[pool] += 1
+        try:
+            return func(job, *args)
+        finally:
+            with self._jobs_lock:
+                self._busy[pool] -= 1
+    
+    def _forget(self, job: PipelineJob):
+        with self._jobs_lock:
+            if self._jobs.get(job._slot) is job:
+                del self._jobs[job._slot]
+    
+    def cancel(self, key: str) -> bool:
+        """Cancela o job ativo com a chave informada"""
+        with self._jobs_lock:
+            job = self._jobs.get(key)
+        if job is None:
+            return False
+        job.cancel()
+        return True
+    
+    def poll(self, max_items: int = 100) -> int:
+        """Executa os callbacks pendentes; deve ser chamado pela thread da interface"""
+        handled = 0
+        while handled < max_items:
+            try:
+                job, final, callback, args = self.ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            
+            handled += 1
+            if not final and job.cancelled:
+                continue  # resultado parcial de um job cancelado: descarta
+            
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"Erro em callback do pipeline: {e}")
+        return handled
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Jobs ativos, threads ocupadas e callbacks aguardando a interface"""
+        with self._jobs_lock:
+            active = len(self._jobs)
+            busy = dict(self._busy)
+        return {'active_jobs': active, 'queued_callbacks': self.ui_queue.qsize(),
+                'max_concurrency': self.max_concurrency,
+                'busy_workers': busy['chat'], 'busy_background_workers': busy['background']}
+    
+    def shutdown(self, timeout: float = 2.0):
+        """Cancela tudo, para o loop e libera o executor"""
+        if self._closed:
+            return
+        self._closed = True
+        
+        with self._jobs_lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.cancel()
+        
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._background_executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,263 @@
+import re
+import time
+from typing import List, Dict
+
+# Faixas de emoji limitadas no pós-processamento
+EMOJI_PATTERN = re.compile(r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]')
+
+# Ações de roleplay entre asteriscos ("*sorri*")
+ACTION_PATTERN = re.compile(r'\*[^*]*\*')
+
+# Prefixos genéricos que o modelo às vezes coloca antes da resposta
+ANSWER_PREFIXES = ["resposta:", "response:"]
+
+class PrefixFilter:
+    """Remove prefixos do início da resposta, um por grupo e na ordem dos grupos
+    (ex.: "Cortana:" e depois "Resposta:"). Segura só o começo, enquanto ainda pode ser um prefixo.
+    
+    Como na implementação anterior, o primeiro prefixo precisa estar logo no início do texto
+    ("  Cortana: oi" fica como está); os espaços só são ignorados depois de um prefixo removido.
+    """
+    
+    def __init__(self, groups: List[List[str]]):
+        self.groups = [[prefix.lower() for prefix in group] for group in groups]
+        self._head = ""
+        self._group = 0
+        self._matched = False
+        self._done = False
+    
+    def feed(self, text: str) -> str:
+        if self._done:
+            return text
+        self._head += text
+        return self._strip(final=False)
+    
+    def finish(self) -> str:
+        return "" if self._done else self._strip(final=True)
+    
+    def _strip(self, final: bool) -> str:
+        while self._group < len(self.groups):
+            head = self._head.lstrip() if self._matched else self._head
+            lowered = head[:max(map(len, self.groups[self._group]))].lower()
+            
+            prefix = next((p for p in self.groups[self._group] if lowered.startswith(p)), None)
+            if prefix is not None:
+                self._head = head[len(prefix):]
+                self._matched = True
+            elif not final and any(p.startswith(lowered) for p in self.groups[self._group]):
+                return ""  # ainda pode ser um prefixo deste grupo: espera mais texto
+            self._group += 1
+        
+        self._done = True
+        head, self._head = self._head, ""
+        return head
+
+class ActionFilter:
+    """Descarta trechos *entre asteriscos*; um asterisco sem par volta como texto no final"""
+    
+    def __init__(self):
+        self._open = None  # pedaços da ação ainda não fechada (a partir do "*")
+    
+    def feed(self, text: str) -> str:
+        if self._open is not None:
+            close = text.find('*')
+            if close == -1:
+                self._open.append(text)
+                return ""
+            self._open = None
+            text = text[close + 1:]
+        
+        # Depois de remover os pares, sobra no máximo um "*" (uma ação que continua no próximo pedaço)
+        text = ACTION_PATTERN.sub('', text)
+        star = text.find('*')
+        if star != -1:
+            self._open = [text[star:]]
+            text = text[:star]
+        return text
+    
+    def finish(self) -> str:
+        pending, self._open = self._open, None
+        return "".join(pending) if pending else ""
+
+class EmojiCapFilter:
+    """Se a resposta tiver mais de `max_emojis`, mantém só os `keep_emojis` primeiros.
+    
+    O texto a partir do primeiro emoji que pode ser excedente fica retido (em uma lista de pedaços,
+    juntada só na liberação) até se saber se o limite estoura (aí os retidos somem) ou se a
+    resposta termina dentro dele.
+    
+    Diferente do antigo `replace(emoji, '', 1)`, que removia a primeira ocorrência de cada emoji
+    excedente, aqui sempre saem os emojis a partir do terceiro: com emojis repetidos o resultado
+    pode diferir da implementação anterior.
+    """
+    
+    def __init__(self, max_emojis: int = 3, keep_emojis: int = 2):
+        self.max_emojis = max_emojis
+        self.keep_emojis = keep_emojis
+        self._count = 0
+        self._hold = None
+    
+    def feed(self, text: str) -> str:
+        out = []
+        position = 0
+        for match in EMOJI_PATTERN.finditer(text):
+            segment = text[position:match.start()]
+            position = match.end()
+            self._count += 1
+            
+            if self._count > self.max_emojis:
+                if self._hold is not None:
+                    # Estourou: os emojis retidos saem, o texto entre eles fica
+                    out.append(EMOJI_PATTERN.sub('', "".join(self._hold)))
+                    self._hold = None
+                out.append(segment)
+            elif self._count > self.keep_emojis:
+                if self._hold is None:
+                    out.append(segment)
+                    self._hold = [match.group()]
+                else:
+                    self._hold.append(segment)
+                    self._hold.append(match.group())
+            else:
+                out.append(segment)
+                out.append(match.group())
+        
+        rest = text[position:]
+        if self._hold is not None:
+            self._hold.append(rest)
+        else:
+            out.append(rest)
+        return "".join(out)
+    
+    def finish(self) -> str:
+        pending, self._hold = self._hold, None
+        return "".join(pending) if pending else ""
+
+class WhitespaceFilter:
+    """Remove espaços do início e segura os do fim até saber se a resposta continua"""
+    
+    def __init__(self):
+        self._started = False
+        self._pending = ""
+    
+    def feed(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self._started = True
+        
+        stripped = text.rstrip()
+        if not stripped:
+            self._pending += text
+            return ""
+        out = self._pending + stripped
+        self._pending = text[len(stripped):]
+        return out
+    
+    def finish(self) -> str:
+        self._pending = ""
+        return ""
+
+class FilterPipeline:
+    """Encadeia filtros incrementais: cada pedaço passa uma vez por cada filtro, em ordem.
+    
+    Um filtro é qualquer objeto com feed(texto) -> texto liberado e finish() -> texto retido.
+    """
+    
+    def __init__(self, filters: list):
+        self.filters = filters
+    
+    def feed(self, chunk: str) -> str:
+        for stage in self.filters:
+            if not chunk:
+                return ""
+            chunk = stage.feed(chunk)
+        return chunk
+    
+    def finish(self) -> str:
+        # O que cada filtro ainda retinha passa pelos filtros seguintes antes de eles fecharem
+        text = ""
+        for stage in self.filters:
+            text = (stage.feed(text) if text else "") + stage.finish()
+        return text
+    
+    def process(self, text: str) -> str:
+        """Processa uma resposta inteira de uma vez"""
+        return self.feed(text) + self.finish()
+
+class StreamingPostProcessor(FilterPipeline):
+    """Pós-processamento da resposta: prefixos ("Nome:", "Resposta:"), ações entre asteriscos,
+    limite de emojis e espaços nas pontas. Serve tanto para o stream quanto para a resposta inteira."""
+    
+    def __init__(self, name: str, max_emojis: int = 3, keep_emojis: int = 2):
+        super().__init__([
+            PrefixFilter([[f"{name}:"], ANSWER_PREFIXES]),
+            ActionFilter(),
+            EmojiCapFilter(max_emojis, keep_emojis),
+            WhitespaceFilter(),
+        ])
+
+# ---------------------------------------------------------------------------
+# Micro-benchmark: pipeline x implementação anterior com regex por chamada
+# ---------------------------------------------------------------------------
+
+def _legacy_post_process(response: str, name: str) -> str:
+    """Implementação anterior de _post_process_response, mantida só para comparação"""
+    response = re.sub(rf'^{name}:\s*', '', response, flags=re.IGNORECASE)
+    response = re.sub(r'^(Resposta|Response):\s*', '', response, flags=re.IGNORECASE)
+    response = re.sub(r'\*[^*]*\*', '', response)
+    emoji_count = len(re.findall(EMOJI_PATTERN.pattern, response))
+    if emoji_count > 3:
+        emojis_found = re.findall(EMOJI_PATTERN.pattern, response)
+        for emoji in emojis_found[2:]:
+            response = response.replace(emoji, '', 1)
+    return response.strip()
+
+def _benchmark_cases() -> Dict[str, str]:
+    """Respostas típicas e patológicas (longas, cheias de emoji ou de ações)"""
+    emojis = ['😊', '💕', '🚀', '😂', '🌟']
+    return {
+        'curta': "Cortana: Oi amor! *sorri* Tudo bem contigo? 😊",
+        'longa_100k': "Resposta: " + ("Hoje foi um dia bem corrido, mas pensei em você. " * 2000),
+        'emojis_5k': "".join(f"oi {emojis[i % len(emojis)]} " for i in range(5000)),
+        'acoes_5k': "".join(f"*ação {i}* texto {i} " for i in range(5000)),
+        'asterisco_aberto': "*" + ("texto sem fechar a ação " * 2000),
+        'apos_3_emojis_200k': "Oi 😊 tudo 💕 bem 🚀 " + ("texto depois do terceiro emoji " * 6500),
+    }
+
+def benchmark_post_processing(repeat: int = 3, chunk_size: int = 16) -> Dict[str, Dict[str, float]]:
+    """Mede ms por resposta: implementação anterior, pipeline inteiro e pipeline em pedaços (stream)"""
+    results = {}
+    for case, text in _benchmark_cases().items():
+        timings = {}
+        
+        started = time.perf_counter()
+        for _ in range(repeat):
+            _legacy_post_process(text, 'Cortana')
+        timings['legacy_ms'] = (time.perf_counter() - started) * 1000 / repeat
+        
+        started = time.perf_counter()
+        for _ in range(repeat):
+            StreamingPostProcessor('Cortana').process(text)
+        timings['pipeline_ms'] = (time.perf_counter() - started) * 1000 / repeat
+        
+        chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+        started = time.perf_counter()
+        for _ in range(repeat):
+            processor = StreamingPostProcessor('Cortana')
+            for chunk in chunks:
+                processor.feed(chunk)
+            processor.finish()
+        timings['streaming_ms'] = (time.perf_counter() - started) * 1000 / repeat
+        
+        results[case] = {name: round(ms, 3) for name, ms in timings.items()}
+    return results
+
+def main():
+    """Roda o micro-benchmark do pós-processamento"""
+    for case, timings in benchmark_post_processing().items():
+        print(f"  {case}: " + ", ".join(f"{name}={ms}" for name, ms in timings.items()))
+
+if __name__ == "__main__":
+    main()
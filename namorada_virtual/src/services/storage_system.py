@@ -0,0 +1,436 @@
+import os
+import re
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, date, timezone
+from typing import List, Dict, Any, Callable
+
+# Personalidade usada quando nenhuma foi salva ainda
+DEFAULT_PERSONALITY = {
+    'name': 'Cortana',
+    'age': 19,
+    'traits': ['carinhosa', 'engracada', 'inteligente', 'curiosa'],
+    'hobbies': 'ler livros de romance, assistir séries, jogar Valorant, ouvir música indie',
+    'foods': 'chocolate, pizza, sorvete de morango',
+    'fears': 'filmes de terror, aranhas',
+    'dreams': 'viajar pelo mundo, ter um café próprio, escrever um livro'
+}
+
+class ChatStorage(ABC):
+    """Contrato de persistência usado pela aplicação (personalidade, conversas, mensagens e configurações)"""
+    
+    @abstractmethod
+    def save_personality(self, personality_data: Dict[str, Any]) -> int:
+        """Salva ou atualiza a personalidade"""
+    
+    @abstractmethod
+    def get_current_personality(self) -> Dict[str, Any]:
+        """Retorna a personalidade atual"""
+    
+    @abstractmethod
+    def get_or_create_today_conversation(self) -> int:
+        """Retorna o ID da conversa de hoje, criando uma nova se necessário"""
+    
+    @abstractmethod
+    def save_message(self, conversation_id: int, sender: str, message: str):
+        """Salva uma mensagem"""
+    
+    @abstractmethod
+    def save_messages(self, messages: List[tuple]):
+        """Salva um lote de (conversation_id, sender, message, timestamp)"""
+    
+    def queue_message(self, conversation_id: int, sender: str, message: str):
+        """Enfileira uma mensagem para gravação (por padrão grava direto)"""
+        self.save_message(conversation_id, sender, message)
+    
+    def flush(self, timeout: float = None) -> bool:
+        """Garante que as mensagens enfileiradas foram gravadas"""
+        return True
+    
+    @abstractmethod
+    def get_conversation_history(self, conversation_id: int) -> List[Dict[str, str]]:
+        """Retorna o histórico de mensagens de uma conversa"""
+    
+    @abstractmethod
+    def get_recent_messages(self, conversation_id: int, limit: int = 10) -> List[Dict[str, str]]:
+        """Retorna as últimas mensagens, em ordem cronológica"""
+    
+    @abstractmethod
+    def get_message_count(self, conversation_id: int) -> int:
+        """Retorna quantas mensagens a conversa tem"""
+    
+    @abstractmethod
+    def list_conversations(self, offset: int = 0, limit: int = 50) -> List[Dict[str, Any]]:
+        """Retorna uma página de conversas, das mais recentes para as mais antigas"""
+    
+    def get_all_conversations(self) -> List[Dict[str, Any]]:
+        """Retorna todas as conversas com preview da última mensagem"""
+        return self.list_conversations(0, -1)
+    
+    @abstractmethod
+    def delete_conversation(self, conversation_id: int):
+        """Deleta uma conversa e todas suas mensagens"""
+    
+    @abstractmethod
+    def search_messages(self, query: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+        """Busca textual no histórico"""
+    
+    @abstractmethod
+    def set_setting(self, key: str, value: str):
+        """Define uma configuração"""
+    
+    @abstractmethod
+    def get_setting(self, key: str, default: str = None) -> str:
+        """Retorna uma configuração"""
+    
+    @abstractmethod
+    def get_conversation_stats(self) -> Dict[str, int]:
+        """Retorna estatísticas das conversas"""
+    
+    @abstractmethod
+    def get_context_summary(self, conversation_id: int) -> Dict[str, Any]:
+        """Retorna o resumo acumulado da conversa ({'summary', 'folded_count'}) ou None"""
+    
+    @abstractmethod
+    def save_context_summary(self, conversation_id: int, summary: str, folded_count: int):
+        """Grava o resumo acumulado e quantas mensagens (em ordem cronológica) ele já cobre"""
+    
+    def close(self):
+        """Libera os recursos do backend"""
+
+def _utc_timestamp() -> str:
+    """Timestamp no mesmo formato do CURRENT_TIMESTAMP do SQLite"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+def _date_display(conv_date: str) -> str:
+    """Rótulo da barra lateral: Hoje, Ontem ou DD/MM/AAAA"""
+    today = date.today()
+    if conv_date == today.strftime('%Y-%m-%d'):
+        return "Hoje"
+    if conv_date == date.fromordinal(today.toordinal() - 1).strftime('%Y-%m-%d'):
+        return "Ontem"
+    return f"{conv_date[8:10]}/{conv_date[5:7]}/{conv_date[0:4]}"
+
+class MemoryChatStorage(ChatStorage):
+    """Backend puramente em memória, para testes e sessões efêmeras (nada é gravado em disco)"""
+    
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._personality = None
+        self._settings = {}
+        self._conversations = {}   # id -> {'date', 'created_at'}
+        self._by_date = {}         # date -> id
+        self._messages = {}        # conversation_id -> [{'id', 'sender', 'message', 'timestamp'}]
+        self._summaries = {}       # conversation_id -> {'summary', 'folded_count'}
+        self._next_conversation_id = 1
+        self._next_message_id = 1
+    
+    def save_personality(self, personality_data: Dict[str, Any]) -> int:
+        with self._lock:
+            self._personality = {**personality_data, 'traits': list(personality_data.get('traits', []))}
+            return 1
+    
+    def get_current_personality(self) -> Dict[str, Any]:
+        with self._lock:
+            personality = self._personality or DEFAULT_PERSONALITY
+            return {**personality, 'traits': list(personality['traits'])}
+    
+    def _conversation_for_date(self, conv_date: str) -> int:
+        """Retorna (criando se necessário) a conversa de uma data"""
+        if conv_date not in self._by_date:
+            conv_id = self._next_conversation_id
+            self._next_conversation_id += 1
+            self._conversations[conv_id] = {'date': conv_date, 'created_at': _utc_timestamp()}
+            self._by_date[conv_date] = conv_id
+            self._messages[conv_id] = []
+        return self._by_date[conv_date]
+    
+    def get_or_create_today_conversation(self) -> int:
+        with self._lock:
+            return self._conversation_for_date(date.today().strftime('%Y-%m-%d'))
+    
+    def save_message(self, conversation_id: int, sender: str, message: str):
+        self.save_messages([(conversation_id, sender, message, _utc_timestamp())])
+    
+    def save_messages(self, messages: List[tuple]):
+        with self._lock:
+            for conversation_id, sender, message, timestamp in messages:
+                conversation = self._messages.setdefault(conversation_id, [])
+                conversation.append({
+                    'id': self._next_message_id,
+                    'sender': sender,
+                    'message': message,
+                    'timestamp': timestamp
+                })
+                self._next_message_id += 1
+                
+                # Mantém a lista na ordem do SQLite (timestamp, id); só reordena se chegar fora de ordem
+                if len(conversation) > 1 and conversation[-2]['timestamp'] > timestamp:
+                    conversation.sort(key=lambda m: (m['timestamp'], m['id']))
+    
+    def _sorted_messages(self, conversation_id: int) -> List[Dict[str, Any]]:
+        """Mensagens da conversa, já ordenadas por (timestamp, id)"""
+        return self._messages.get(conversation_id, [])
+    
+    def get_conversation_history(self, conversation_id: int) -> List[Dict[str, str]]:
+        with self._lock:
+            return [{'sender': m['sender'], 'message': m['message'], 'timestamp': m['timestamp']}
+                    for m in self._sorted_messages(conversation_id)]
+    
+    def get_recent_messages(self, conversation_id: int, limit: int = 10) -> List[Dict[str, str]]:
+        with self._lock:
+            recent = self._sorted_messages(conversation_id)[-limit:] if limit > 0 else []
+            return [{'sender': m['sender'], 'message': m['message']} for m in recent]
+    
+    def get_message_count(self, conversation_id: int) -> int:
+        with self._lock:
+            return len(self._messages.get(conversation_id, []))
+    
+    def list_conversations(self, offset: int = 0, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            ordered = sorted(self._conversations.items(), key=lambda item: item[1]['date'], reverse=True)
+            page = ordered[offset:] if limit < 0 else ordered[offset:offset + limit]
+            
+            conversations = []
+            for conv_id, conv in page:
+                messages = self._sorted_messages(conv_id)
+                conversations.append({
+                    'id': conv_id,
+                    'date': conv['date'],
+                    'date_display': _date_display(conv['date']),
+                    'last_message': messages[-1]['message'] if messages else "Conversa iniciada",
+                    'created_at': conv['created_at'],
+                    'message_count': len(messages),
+                    'last_activity': messages[-1]['timestamp'] if messages else None
+                })
+            return conversations
+    
+    def delete_conversation(self, conversation_id: int):
+        with self._lock:
+            conv = self._conversations.pop(conversation_id, None)
+            if conv:
+                self._by_date.pop(conv['date'], None)
+            self._messages.pop(conversation_id, None)
+            self._summaries.pop(conversation_id, None)
+    
+    def search_messages(self, query: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+        terms = [term.lower() for term in re.findall(r'\w+', query, flags=re.UNICODE)]
+        if not terms:
+            return []
+        
+        with self._lock:
+            results = []
+            for conv_id, messages in self._messages.items():
+                conv_date = self._conversations.get(conv_id, {}).get('date')
+                for m in messages:
+                    text = m['message'].lower()
+                    if all(term in text for term in terms):
+                        results.append({
+                            'id': m['id'],
+                            'conversation_id': conv_id,
+                            'date': conv_date,
+                            'sender': m['sender'],
+                            'timestamp': m['timestamp'],
+                            'snippet': m['message'],
+                            'rank': 0
+                        })
+            
+            results.sort(key=lambda r: (r['timestamp'], r['id']), reverse=True)
+            return results[offset:offset + limit]
+    
+    def set_setting(self, key: str, value: str):
+        with self._lock:
+            self._settings[key] = value
+    
+    def get_setting(self, key: str, default: str = None) -> str:
+        with self._lock:
+            return self._settings.get(key, default)
+    
+    def get_conversation_stats(self) -> Dict[str, int]:
+        with self._lock:
+            all_messages = [m for messages in self._messages.values() for m in messages]
+            return {
+                'total_conversations': len(self._conversations),
+                'total_messages': len(all_messages),
+                'user_messages': sum(1 for m in all_messages if m['sender'] == 'user'),
+                'ai_messages': sum(1 for m in all_messages if m['sender'] == 'ai'),
+                'active_days': len({m['timestamp'][:10] for m in all_messages})
+            }
+    
+    def get_context_summary(self, conversation_id: int) -> Dict[str, Any]:
+        with self._lock:
+            state = self._summaries.get(conversation_id)
+            return dict(state) if state else None
+    
+    def save_context_summary(self, conversation_id: int, summary: str, folded_count: int):
+        with self._lock:
+            self._summaries[conversation_id] = {'summary': summary, 'folded_count': folded_count}
+
+# ---------------------------------------------------------------------------
+# Conformidade e benchmark: a mesma carga roda contra qualquer ChatStorage
+# ---------------------------------------------------------------------------
+
+def _check_personality(storage: ChatStorage):
+    default = storage.get_current_personality()
+    assert default['name'], "personalidade padrão sem nome"
+    
+    custom = {**DEFAULT_PERSONALITY, 'name': 'Ana', 'traits': ['timida']}
+    storage.save_personality(custom)
+    current = storage.get_current_personality()
+    assert current['name'] == 'Ana' and current['traits'] == ['timida'], "personalidade não foi salva"
+    
+    current['traits'].append('alterada')
+    assert storage.get_current_personality()['traits'] == ['timida'], "retorno compartilha estado interno"
+
+def _check_messages(storage: ChatStorage):
+    conv_id = storage.get_or_create_today_conversation()
+    assert storage.get_or_create_today_conversation() == conv_id, "conversa do dia duplicada"
+    
+    storage.save_message(conv_id, 'user', 'oi, tudo bem?')
+    storage.queue_message(conv_id, 'ai', 'tudo ótimo!')
+    storage.flush()
+    
+    history = storage.get_conversation_history(conv_id)
+    assert [m['message'] for m in history[-2:]] == ['oi, tudo bem?', 'tudo ótimo!'], "histórico fora de ordem"
+    
+    recent = storage.get_recent_messages(conv_id, 1)
+    assert recent == [{'sender': 'ai', 'message': 'tudo ótimo!'}], "mensagens recentes incorretas"
+    assert storage.get_message_count(conv_id) == len(history), "contagem de mensagens incorreta"
+
+def _check_listing(storage: ChatStorage):
+    conv_id = storage.get_or_create_today_conversation()
+    storage.save_message(conv_id, 'user', 'última mensagem')
+    
+    first = storage.list_conversations(0, 1)[0]
+    assert first['id'] == conv_id and first['date_display'] == "Hoje", "conversa de hoje não é a primeira"
+    assert first['last_message'] == 'última mensagem', "preview da última mensagem incorreto"
+    assert len(storage.get_all_conversations()) >= 1
+
+def _check_search(storage: ChatStorage):
+    conv_id = storage.get_or_create_today_conversation()
+    storage.save_message(conv_id, 'user', 'adoro sorvete de morango')
+    
+    results = storage.search_messages('sorvete morango')
+    assert results and results[0]['conversation_id'] == conv_id, "busca não encontrou a mensagem"
+    assert storage.search_messages('palavrainexistente') == [], "busca retornou falso positivo"
+
+def _check_settings(storage: ChatStorage):
+    assert storage.get_setting('tema', 'claro') == 'claro', "valor padrão ignorado"
+    storage.set_setting('tema', 'escuro')
+    assert storage.get_setting('tema') == 'escuro', "configuração não foi salva"
+
+def _check_stats_and_delete(storage: ChatStorage):
+    conv_id = storage.get_or_create_today_conversation()
+    storage.save_messages([(conv_id, 'user', 'a', _utc_timestamp()), (conv_id, 'ai', 'b', _utc_timestamp())])
+    stats = storage.get_conversation_stats()
+    assert stats['total_messages'] == stats['user_messages'] + stats['ai_messages'], "estatísticas inconsistentes"
+    
+    storage.delete_conversation(conv_id)
+    assert storage.get_conversation_history(conv_id) == [], "mensagens sobreviveram à exclusão"
+    assert all(c['id'] != conv_id for c in storage.get_all_conversations()), "conversa sobreviveu à exclusão"
+
+def _check_context_summary(storage: ChatStorage):
+    conv_id = storage.get_or_create_today_conversation()
+    assert storage.get_context_summary(conv_id) is None, "resumo inexistente deveria ser None"
+    
+    storage.save_context_summary(conv_id, 'resumo 1', 4)
+    storage.save_context_summary(conv_id, 'resumo 2', 6)
+    assert storage.get_context_summary(conv_id) == {'summary': 'resumo 2', 'folded_count': 6}, "resumo não foi atualizado"
+    
+    storage.delete_conversation(conv_id)
+    assert storage.get_context_summary(conv_id) is None, "resumo sobreviveu à exclusão"
+
+CONFORMANCE_CHECKS = [
+    _check_personality,
+    _check_messages,
+    _check_listing,
+    _check_search,
+    _check_settings,
+    _check_stats_and_delete,
+    _check_context_summary,
+]
+
+def run_conformance_checks(factory: Callable[[], ChatStorage]) -> Dict[str, str]:
+    """Roda cada verificação em um storage novo; retorna nome -> 'ok' ou a falha encontrada"""
+    results = {}
+    for check in CONFORMANCE_CHECKS:
+        storage = factory()
+        try:
+            check(storage)
+            results[check.__name__[len('_check_'):]] = 'ok'
+        except Exception as e:
+            results[check.__name__[len('_check_'):]] = f"FALHOU: {e}"
+        finally:
+            storage.close()
+    return results
+
+def benchmark_storage(storage: ChatStorage, messages: int = 2000, reads: int = 500) -> Dict[str, float]:
+    """Mede a latência média (ms por operação) de uma carga típica de chat"""
+    conv_id = storage.get_or_create_today_conversation()
+    results = {}
+    
+    started = time.perf_counter()
+    for i in range(messages):
+        storage.save_message(conv_id, 'user' if i % 2 == 0 else 'ai', f"mensagem de teste número {i} sobre pizza")
+    storage.flush()
+    results['save_message'] = (time.perf_counter() - started) * 1000 / messages
+    
+    started = time.perf_counter()
+    for _ in range(reads):
+        storage.get_recent_messages(conv_id, 10)
+    results['get_recent_messages'] = (time.perf_counter() - started) * 1000 / reads
+    
+    started = time.perf_counter()
+    for _ in range(reads):
+        storage.get_current_personality()
+        storage.get_setting('tema')
+    results['personality_and_setting'] = (time.perf_counter() - started) * 1000 / reads
+    
+    started = time.perf_counter()
+    for _ in range(reads):
+        storage.list_conversations(0, 20)
+    results['list_conversations'] = (time.perf_counter() - started) * 1000 / reads
+    
+    search_runs = max(1, reads // 10)
+    started = time.perf_counter()
+    for _ in range(search_runs):
+        storage.search_messages('pizza 1999')
+    results['search_messages'] = (time.perf_counter() - started) * 1000 / search_runs
+    
+    return {name: round(ms, 4) for name, ms in results.items()}
+
+def main():
+    """Roda conformidade e benchmark contra os backends SQLite e em memória"""
+    try:
+        from .database_system import VirtualGirlfriendDB
+    except ImportError:
+        from database_system import VirtualGirlfriendDB  # executado como script
+    
+    temp_dir = tempfile.mkdtemp(prefix="storage_bench_")
+    counter = [0]
+    
+    def sqlite_factory() -> ChatStorage:
+        counter[0] += 1
+        return VirtualGirlfriendDB(os.path.join(temp_dir, f"bench_{counter[0]}.db"))
+    
+    backends = {
+        'sqlite': sqlite_factory,
+        'memória': MemoryChatStorage,
+    }
+    
+    for name, factory in backends.items():
+        print(f"\n=== {name} ===")
+        for check, result in run_conformance_checks(factory).items():
+            print(f"  {check}: {result}")
+        
+        storage = factory()
+        try:
+            for operation, ms in benchmark_storage(storage).items():
+                print(f"  {operation}: {ms} ms/op")
+        finally:
+            storage.close()
+
+if __name__ == "__main__":
+    main()
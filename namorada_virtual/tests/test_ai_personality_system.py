@@ -0,0 +1,40 @@
+import pytest
+
+from src.services.ai_personality_system import PersonalityAI
+from src.services.gemini_client_system import FakeResponse, ServiceUnavailable
+from src.services.storage_system import DEFAULT_PERSONALITY
+
+
+class BrokenStreamModel:
+    """Entrega alguns pedaços e depois falha no meio do stream"""
+    
+    def __init__(self, chunks, error):
+        self.chunks = chunks
+        self.error = error
+    
+    def generate_content(self, prompt, generation_config=None, stream=False, request_options=None):
+        def chunks():
+            for text in self.chunks:
+                yield FakeResponse(text)
+            raise self.error
+        return chunks()
+
+
+def test_stream_failure_after_first_chunk_raises():
+    ai = PersonalityAI('', model=BrokenStreamModel(["Oi amor, ", "hoje eu "], ServiceUnavailable("503")))
+    
+    received = []
+    with pytest.raises(ServiceUnavailable):
+        for piece in ai.generate_response_stream(DEFAULT_PERSONALITY, [], "oi"):
+            received.append(piece)
+    
+    assert "".join(received).startswith("Oi amor")
+    assert ai.get_cache_stats()['entries'] == 0  # resposta incompleta não vai para o cache
+
+
+def test_stream_failure_before_first_chunk_falls_back():
+    ai = PersonalityAI('', model=BrokenStreamModel([], ValueError("prompt bloqueado")))
+    
+    pieces = list(ai.generate_response_stream(DEFAULT_PERSONALITY, [], "oi"))
+    
+    assert len(pieces) == 1 and pieces[0]
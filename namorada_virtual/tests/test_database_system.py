@@ -0,0 +1,82 @@
+from datetime import date, timedelta
+
+from src.services.database_system import VirtualGirlfriendDB, RetentionPolicy
+
+
+def make_old_conversations(db, days=3, messages=10, age=200):
+    conn = db._get_connection()
+    for d in range(days):
+        day = (date.today() - timedelta(days=age + d)).strftime('%Y-%m-%d')
+        conv_id = conn.execute("INSERT INTO conversations (date) VALUES (?)", (day,)).lastrowid
+        conn.commit()
+        db.save_messages([(conv_id, 'user' if i % 2 == 0 else 'ai', f"adoro sorvete de morango {i}",
+                           f"{day} 10:{i // 60:02d}:{i % 60:02d}") for i in range(messages)])
+
+
+def test_search_and_stats_include_archived_conversations(tmp_path):
+    db = VirtualGirlfriendDB(str(tmp_path / "chat.db"))
+    make_old_conversations(db)
+    before = db.get_conversation_stats()
+    
+    report = db.archive_old_conversations(days=90)
+    
+    assert report['messages'] == 30
+    assert db.get_conversation_stats() == before
+    assert before['active_days'] == 3
+    assert len(db.get_message_histogram(days=400)) == 3
+    
+    results = db.search_messages('morango', limit=50)
+    assert len(results) == 30
+    assert all('[morango]' in r['snippet'] for r in results)
+    assert len(db.search_messages('morango', limit=10, offset=25)) == 5
+    
+    ids = [r['id'] for r in results[:3]]
+    assert sorted(db.get_messages_by_ids(ids)) == sorted(ids)
+    db.close()
+
+
+def test_deleting_archived_conversation_updates_search_and_stats(tmp_path):
+    db = VirtualGirlfriendDB(str(tmp_path / "chat.db"))
+    make_old_conversations(db)
+    db.archive_old_conversations(days=90)
+    
+    db.delete_conversation(db.search_messages('morango')[0]['conversation_id'])
+    
+    assert len(db.search_messages('morango', limit=50)) == 20
+    stats = db.get_conversation_stats()
+    assert stats['total_messages'] == stats['user_messages'] + stats['ai_messages'] == 20
+    assert stats['active_days'] == 2
+    db.close()
+
+
+def test_size_retention_drops_archives_first_and_keeps_today(tmp_path):
+    db = VirtualGirlfriendDB(str(tmp_path / "chat.db"))
+    make_old_conversations(db, days=20, messages=100)
+    db.archive_old_conversations(days=90)
+    today = db.get_or_create_today_conversation()
+    for i in range(50):
+        db.save_message(today, 'user', f"mensagem de hoje {i}")
+    
+    stats = db.apply_retention(RetentionPolicy(max_db_size_mb=0.01))
+    
+    assert stats['messages_deleted'] == 2000
+    assert db.get_archive_info()['conversations'] == 0
+    assert len(db.get_conversation_history(today)) == 50
+    db.close()
+
+
+def test_message_retention_counts_archived_messages(tmp_path):
+    db = VirtualGirlfriendDB(str(tmp_path / "chat.db"))
+    make_old_conversations(db, days=3, messages=10)
+    db.archive_old_conversations(days=90)
+    today = db.get_or_create_today_conversation()
+    for i in range(5):
+        db.save_message(today, 'user', f"mensagem de hoje {i}")
+    
+    stats = db.apply_retention(RetentionPolicy(max_messages=20))
+    
+    assert stats['messages_deleted'] == 15
+    assert db.get_conversation_stats()['total_messages'] == 20
+    assert len(db.get_conversation_history(today)) == 5
+    assert len(db.search_messages('morango', limit=50)) == 15
+    db.close()
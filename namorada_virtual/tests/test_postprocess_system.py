@@ -0,0 +1,40 @@
+import random
+
+from src.services.postprocess_system import StreamingPostProcessor, _legacy_post_process
+
+
+def process(text, chunk_size=None):
+    processor = StreamingPostProcessor('Cortana')
+    if chunk_size is None:
+        return processor.process(text)
+    out = "".join(processor.feed(text[i:i + chunk_size]) for i in range(0, len(text), chunk_size))
+    return out + processor.finish()
+
+
+def test_prefixes_are_stripped_in_order():
+    text = "Cortana: Resposta: Oi amor! *sorri* 😊"
+    assert process(text) == process(text, 3) == _legacy_post_process(text, 'Cortana') == "Oi amor!  😊"
+
+
+def test_prefix_after_leading_whitespace_is_kept_like_legacy():
+    for text in ["  Cortana: oi", "\nResposta: oi", " cortana: Resposta: oi"]:
+        assert process(text) == process(text, 2) == _legacy_post_process(text, 'Cortana')
+
+
+def test_repeated_emojis_keep_the_first_two():
+    # Diferença documentada: o replace antigo removia a primeira ocorrência de cada emoji excedente
+    text = "😊 a 😊 b 😊 c 😊"
+    assert process(text) == process(text, 1) == "😊 a 😊 b  c"
+    assert _legacy_post_process(text, 'Cortana') == "a  b 😊 c 😊"
+
+
+def test_matches_legacy_without_repeated_emojis():
+    rng = random.Random(7)
+    atoms = ['Cortana:', 'Resposta: ', ' ', '\n', '*', '*sorri*', 'oi', ' amor', '😊', '💕', '🚀', '😂', '🌟']
+    for _ in range(2000):
+        tokens = [rng.choice(atoms) for _ in range(rng.randint(0, 10))]
+        emojis = [t for t in tokens if t in ('😊', '💕', '🚀', '😂', '🌟')]
+        if len(emojis) != len(set(emojis)):
+            continue
+        text = "".join(tokens)
+        assert process(text) == process(text, rng.randint(1, 4)) == _legacy_post_process(text, 'Cortana')